@@ -11,6 +11,7 @@ import threading
 import json
 import pyttsx3
 import random
+from conversation_log import ConversationLogger
 
 # Set to your ChromeDriver path if not in PATH; '' if in PATH
 CHROMEDRIVER_PATH = ''  # e.g., r'./chromedriver/chromedriver.exe' for Windows
@@ -19,6 +20,7 @@ class AIVoiceAssistant:
     def __init__(self):
         self.status_file = "sunday_status.json"
         self.conv_log_file = "conversation_log.txt"
+        self.conv_log = ConversationLogger(self.conv_log_file)
         self.listening = True
         self.wake_word = "sunday"
         self.consecutive_failures = 0
@@ -115,11 +117,7 @@ class AIVoiceAssistant:
             self.log_conversation("System", f"Microphone calibration failed: {e}")
 
     def log_conversation(self, speaker, message):
-        timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
-        log_entry = f"[{timestamp}] {speaker}: {message}\n"
-        with open(self.conv_log_file, 'a', encoding='utf-8') as f:
-            f.write(log_entry)
-        print(log_entry.strip())
+        self.conv_log.log(speaker, message)
 
     def write_status(self, action, user_command='', ai_response=''):
         try:
@@ -129,8 +127,11 @@ class AIVoiceAssistant:
                 'user_command': user_command,
                 'ai_response': ai_response
             }
-            with open(self.status_file, 'w') as f:
+            # Write-then-rename so a polling reader never sees a partial file
+            tmp = self.status_file + '.tmp'
+            with open(tmp, 'w') as f:
                 json.dump(data, f)
+            os.replace(tmp, self.status_file)
         except Exception as e:
             self.log_conversation("System", f"Status write error: {e}")
 
@@ -327,6 +328,7 @@ class AIVoiceAssistant:
             except:
                 pass
         self.log_conversation("System", "Sunday AI stopped")
+        self.conv_log.close()  # os._exit skips atexit handlers
         os._exit(0)
 
 if __name__ == "__main__":
@@ -0,0 +1,282 @@
+"""Always-on microphone capture with voice-activity segmentation.
+
+One sounddevice InputStream stays open for the whole session. It writes
+16 kHz mono int16 blocks into a ring buffer that holds RING_SECONDS of
+audio, so the assistant is never deaf.
+
+A segmenter thread walks the buffer one frame at a time and tracks the
+background noise floor. It cuts each utterance, plus PRE_ROLL of lead-in so
+first syllables aren't clipped, and puts it on a queue. The listen loop
+consumes that queue at its own pace, so speech that starts while Sunday is
+recognising or navigating is still there when the loop comes back.
+
+While Sunday herself is talking, a frame has to be PLAYBACK_GAIN times
+louder to count as speech, and the noise floor stops adapting to her voice.
+Utterances that still start then are delivered, marked during_playback, so
+"Sunday, stop" spoken over her reaches barge-in. The listen loop drops the
+ones whose words are only an echo of what she was saying.
+"""
+import collections
+import queue
+import threading
+import time
+
+import numpy as np
+
+try:
+    import sounddevice as sd
+except (ImportError, OSError):  # OSError: PortAudio missing
+    sd = None
+
+SAMPLE_RATE = 16000
+FRAME_MS = 30
+RING_SECONDS = 60
+PRE_ROLL = 0.3  # Seconds of audio kept before the detected speech onset
+PAUSE_THRESHOLD = 1.0  # Seconds of silence that end an utterance (like recognizer.pause_threshold)
+MIN_SPEECH = 0.15  # Seconds of consecutive speech frames that open an utterance
+MAX_PHRASE = 15.0  # Utterances are cut here even if the speaker keeps going
+SPEECH_RATIO = 3.0  # A frame is speech when its RMS exceeds noise floor x this...
+MIN_ENERGY = 200.0  # ...and this absolute RMS (int16 units)
+NOISE_ADAPT = 0.05  # Noise-floor moving-average weight per non-speech frame
+ECHO_TAIL = 0.3  # Seconds after playback ends that still count as playback
+PLAYBACK_GAIN = 2.0  # While Sunday talks, speech must be this much louder (crude echo suppression)
+
+def frame_rms(frame):
+    return float(np.sqrt(np.mean(np.square(frame, dtype=np.float64)))) if len(frame) else 0.0
+
+class AudioRing:
+    """Fixed-size int16 ring buffer addressed by absolute sample index."""
+
+    def __init__(self, seconds=RING_SECONDS, sample_rate=SAMPLE_RATE):
+        self._buf = np.zeros(int(seconds * sample_rate), dtype=np.int16)
+        self._cond = threading.Condition()
+        self.written = 0  # Total samples ever written
+
+    @property
+    def capacity(self):
+        return len(self._buf)
+
+    def write(self, samples):
+        samples = np.asarray(samples, dtype=np.int16).reshape(-1)
+        n = len(samples)
+        with self._cond:
+            if n >= self.capacity:
+                tail = samples[-self.capacity:]
+                offset = (self.written + n - self.capacity) % self.capacity
+                self._buf[offset:] = tail[:self.capacity - offset]
+                self._buf[:offset] = tail[self.capacity - offset:]
+            else:
+                offset = self.written % self.capacity
+                first = min(n, self.capacity - offset)
+                self._buf[offset:offset + first] = samples[:first]
+                self._buf[:n - first] = samples[first:]
+            self.written += n
+            self._cond.notify_all()
+
+    def read(self, start, end):
+        """Copy of samples [start, end), clipped to what is still buffered."""
+        with self._cond:
+            start = max(start, self.written - self.capacity, 0)
+            end = min(end, self.written)
+            if end <= start:
+                return np.zeros(0, dtype=np.int16)
+            a, b = start % self.capacity, end % self.capacity
+            if a < b:
+                return self._buf[a:b].copy()
+            return np.concatenate((self._buf[a:], self._buf[:b]))
+
+    def wait_for(self, index, timeout=None):
+        """Block until sample `index` has been written; False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.written >= index, timeout)
+
+class Segment:
+    """One detected utterance: int16 samples plus monotonic start/end times."""
+
+    def __init__(self, samples, sample_rate, start_time, end_time, during_playback=False):
+        self.samples = samples
+        self.sample_rate = sample_rate
+        self.start_time = start_time
+        self.end_time = end_time
+        self.during_playback = during_playback
+
+    @property
+    def pcm(self):
+        return self.samples.tobytes()
+
+    @property
+    def duration(self):
+        return len(self.samples) / self.sample_rate
+
+class VoiceActivitySegmenter:
+    """Energy VAD with an adaptive noise floor; feed it consecutive frames, get back utterance spans."""
+
+    def __init__(self, sample_rate=SAMPLE_RATE, pause_threshold=PAUSE_THRESHOLD, min_speech=MIN_SPEECH,
+                 max_phrase=MAX_PHRASE, speech_ratio=SPEECH_RATIO, min_energy=MIN_ENERGY, playback_gain=PLAYBACK_GAIN):
+        self.sample_rate = sample_rate
+        self.pause_samples = int(pause_threshold * sample_rate)
+        self.min_speech_samples = int(min_speech * sample_rate)
+        self.max_phrase_samples = int(max_phrase * sample_rate)
+        self.speech_ratio = speech_ratio
+        self.min_energy = min_energy
+        self.playback_gain = playback_gain
+        self.noise_floor = None
+        self._start = None  # First speech sample of the open utterance
+        self._last_speech = None  # End of its latest speech frame
+        self._run_start = None  # Start of the current run of speech frames before an utterance opens
+
+    def is_speech(self, rms, playback=False):
+        if self.noise_floor is None:
+            return False
+        threshold = max(self.noise_floor * self.speech_ratio, self.min_energy)
+        return rms > (threshold * self.playback_gain if playback else threshold)
+
+    def process(self, frame, position, playback=False):
+        """Feed the frame starting at absolute sample `position`; returns (start, end) when an utterance closes.
+
+        playback=True while Sunday is talking: the threshold is raised and the noise floor held.
+        """
+        rms = frame_rms(frame)
+        end = position + len(frame)
+        if self.noise_floor is None:
+            self.noise_floor = rms
+            return None
+        speech = self.is_speech(rms, playback)
+        if not speech and not playback:
+            self.noise_floor += NOISE_ADAPT * (rms - self.noise_floor)
+
+        if self._start is None:
+            if not speech:
+                self._run_start = None
+                return None
+            if self._run_start is None:
+                self._run_start = position
+            if end - self._run_start >= self.min_speech_samples:
+                self._start, self._last_speech = self._run_start, end
+            return None
+
+        if speech:
+            self._last_speech = end
+        if end - self._last_speech >= self.pause_samples:
+            return self._close(self._last_speech)
+        if end - self._start >= self.max_phrase_samples:
+            return self._close(end)
+        return None
+
+    def _close(self, end):
+        span = (self._start, end)
+        self._start = self._last_speech = self._run_start = None
+        return span
+
+class MicrophoneStream:
+    """Persistent capture into an AudioRing with utterances delivered on a queue.
+
+    start() opens the default input device with sounddevice. Tests and
+    replays can skip it and push() samples instead.
+    """
+
+    def __init__(self, sample_rate=SAMPLE_RATE, device=None, ring_seconds=RING_SECONDS, pre_roll=PRE_ROLL,
+                 **vad_options):
+        self.sample_rate = sample_rate
+        self.device = device
+        self.frame_samples = sample_rate * FRAME_MS // 1000
+        self.pre_roll_samples = int(pre_roll * sample_rate)
+        self.ring = AudioRing(ring_seconds, sample_rate)
+        self.vad = VoiceActivitySegmenter(sample_rate, **vad_options)
+        self.utterances = queue.Queue()
+        self._playback = collections.deque(maxlen=32)  # (start, end or None) sample indices of TTS playback
+        self._lock = threading.Lock()
+        self._stream = None
+        self._running = True
+        self._t0 = None  # Monotonic time of sample 0
+        self.overflows = 0
+        self.segments = 0
+        self._thread = threading.Thread(target=self._segment_loop, name='vad', daemon=True)
+        self._thread.start()
+
+    def start(self):
+        if sd is None:
+            raise RuntimeError("sounddevice (PortAudio) is not available")
+        self._stream = sd.InputStream(samplerate=self.sample_rate, channels=1, dtype='int16', device=self.device,
+                                      blocksize=self.frame_samples, callback=self._on_audio)
+        self._stream.start()
+
+    def stop(self):
+        self._running = False
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+
+    def _on_audio(self, indata, frames, time_info, status):
+        if status.input_overflow:
+            self.overflows += 1
+        self.push(indata[:, 0])
+
+    def push(self, samples):
+        """Append captured samples (int16 mono)."""
+        if self._t0 is None:
+            self._t0 = time.monotonic()
+        self.ring.write(samples)
+
+    def time_of(self, index):
+        return (self._t0 or time.monotonic()) + index / self.sample_rate
+
+    def set_playback(self, active):
+        """Mark the start/end of Sunday's own speech so overlapping segments can be flagged."""
+        with self._lock:
+            now = self.ring.written
+            if active and not (self._playback and self._playback[-1][1] is None):
+                self._playback.append((now, None))
+            elif not active and self._playback and self._playback[-1][1] is None:
+                self._playback[-1] = (self._playback[-1][0], now)
+
+    def _during_playback(self, index):
+        tail = int(ECHO_TAIL * self.sample_rate)
+        with self._lock:
+            return any(start <= index and (end is None or index < end + tail) for start, end in self._playback)
+
+    def next_utterance(self, timeout=None):
+        """The oldest unread Segment, waiting up to timeout seconds; None if there is none."""
+        try:
+            return self.utterances.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def clear(self):
+        """Drop utterances that have not been read yet."""
+        while True:
+            try:
+                self.utterances.get_nowait()
+            except queue.Empty:
+                return
+
+    def recalibrate(self, seconds=1.0):
+        """Re-estimate the noise floor from the last `seconds` of buffered audio (no deaf period)."""
+        end = self.ring.written
+        audio = self.ring.read(end - int(seconds * self.sample_rate), end)
+        frames = [audio[i:i + self.frame_samples] for i in range(0, len(audio) - self.frame_samples + 1,
+                                                                self.frame_samples)]
+        if frames:
+            self.vad.noise_floor = float(np.median([frame_rms(f) for f in frames]))
+
+    def _segment_loop(self):
+        position = 0
+        while self._running:
+            if not self.ring.wait_for(position + self.frame_samples, timeout=0.5):
+                continue
+            while position + self.frame_samples <= self.ring.written:
+                oldest = self.ring.written - self.ring.capacity
+                if position < oldest:
+                    position = oldest  # Fell a whole ring behind; skip what was overwritten
+                frame = self.ring.read(position, position + self.frame_samples)
+                span = self.vad.process(frame, position, self._during_playback(position))
+                position += self.frame_samples
+                if span:
+                    self._emit(*span)
+
+    def _emit(self, start, end):
+        samples = self.ring.read(start - self.pre_roll_samples, end)
+        self.segments += 1
+        self.utterances.put(Segment(samples, self.sample_rate, self.time_of(start), self.time_of(end),
+                                    during_playback=self._during_playback(start)))
@@ -0,0 +1,115 @@
+"""Load test for the SUNDAY static server.
+
+Starts the server in-process on a free port and hammers it with N concurrent
+keep-alive clients, reporting requests/sec and latency percentiles.
+
+    python benchmarks/load_test.py                    # threaded vs single-threaded, 64 clients
+    python benchmarks/load_test.py --clients 100 --mode threaded
+    python benchmarks/load_test.py --url http://127.0.0.1:5000   # test an already running server
+"""
+import argparse
+import http.client
+import os
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from server import make_server  # noqa: E402
+
+DEFAULT_PATHS = ["/index.html", "/assets/poses/tadasana.jpg", "/assets/poses/namaste.png",
+                 "/assets/poses/vrikshasana.jpg"]
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+def client_worker(host, port, paths, requests_per_client, latencies, errors, start_event):
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    start_event.wait()
+    for i in range(requests_per_client):
+        path = paths[i % len(paths)]
+        t0 = time.perf_counter()
+        try:
+            conn.request("GET", path)
+            resp = conn.getresponse()
+            resp.read()
+            if resp.status >= 400:
+                errors.append(resp.status)
+            if resp.will_close:
+                conn.close()
+                conn = http.client.HTTPConnection(host, port, timeout=30)
+        except Exception as e:
+            errors.append(repr(e))
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - t0)
+    conn.close()
+
+def run_load(host, port, clients, requests_per_client, paths):
+    latencies, errors = [], []
+    start_event = threading.Event()
+    threads = [threading.Thread(target=client_worker,
+                                args=(host, port, paths, requests_per_client, latencies, errors, start_event))
+               for _ in range(clients)]
+    for t in threads:
+        t.start()
+    t0 = time.perf_counter()
+    start_event.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'elapsed_s': elapsed,
+        'rps': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'max_ms': (latencies[-1] * 1000) if latencies else 0.0,
+    }
+
+def run_against_local(mode, clients, requests_per_client, paths, workers):
+    os.chdir(ROOT)
+    httpd = make_server(0, threaded=(mode == "threaded"), max_workers=workers, host="127.0.0.1")
+    httpd.RequestHandlerClass.log_message = lambda *args: None  # keep the report readable
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        return run_load("127.0.0.1", httpd.server_address[1], clients, requests_per_client, paths)
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+def print_report(label, r):
+    print(f"{label:<16} {r['requests']:>7} req  {r['errors']:>4} err  {r['rps']:>9.1f} req/s  "
+          f"p50 {r['p50_ms']:>8.2f} ms  p99 {r['p99_ms']:>8.2f} ms  max {r['max_ms']:>8.2f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent load test for the static server")
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=20, help="requests per client")
+    parser.add_argument("--workers", type=int, default=64, help="max workers for the threaded server")
+    parser.add_argument("--mode", choices=["threaded", "single", "both"], default="both")
+    parser.add_argument("--url", help="test an already running server instead of starting one")
+    parser.add_argument("--path", action="append", help="path to request (repeatable)")
+    args = parser.parse_args()
+
+    paths = args.path or DEFAULT_PATHS
+    print(f"{args.clients} clients x {args.requests} requests over {len(paths)} paths")
+
+    if args.url:
+        parts = urlsplit(args.url)
+        print_report(parts.netloc, run_load(parts.hostname, parts.port or 80, args.clients, args.requests, paths))
+    else:
+        modes = ["single", "threaded"] if args.mode == "both" else [args.mode]
+        for mode in modes:
+            print_report(mode, run_against_local(mode, args.clients, args.requests, paths, args.workers))
@@ -0,0 +1,33 @@
+"""Throughput of the vectorized pose scorer in frames per millisecond.
+
+    python benchmarks/scoring_bench.py --frames 100000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pose_scoring import POSE_RULES, score_frames  # noqa: E402
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark pose_scoring.score_frames")
+    parser.add_argument("--frames", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    keypoints = rng.uniform(0, 480, (args.frames, 17, 3))
+    keypoints[..., 2] = rng.uniform(0.2, 1.0, (args.frames, 17))
+
+    for pose in POSE_RULES:
+        timings = []
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            score_frames(keypoints, pose)
+            timings.append(time.perf_counter() - t0)
+        best = min(timings)
+        print(f"{pose:<12} {args.frames} frames in {best * 1000:.1f} ms  ({args.frames / (best * 1000):.0f} frames/ms)")
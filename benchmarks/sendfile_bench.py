@@ -0,0 +1,85 @@
+"""Server CPU time per GB served: os.sendfile vs. copying through Python buffers.
+
+The server runs in a child process (so the client's CPU is not counted) over a
+temporary directory holding one large file, and reports its own CPU time after
+the client has downloaded the file repeatedly.
+
+    python benchmarks/sendfile_bench.py                # 256 MB file, 4 GB per mode
+    python benchmarks/sendfile_bench.py --file-mb 64 --total-gb 1
+"""
+import argparse
+import http.client
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def serve(directory, use_sendfile, conn):
+    from server import make_server, MyHTTPRequestHandler
+
+    os.chdir(directory)
+    MyHTTPRequestHandler.use_sendfile = use_sendfile
+    MyHTTPRequestHandler.log_message = lambda *args: None
+    httpd = make_server(0, host="127.0.0.1", warm=False)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    conn.send(httpd.server_address[1])
+    conn.recv()  # "start": reset the CPU baseline once the client is connected
+    cpu_start = time.process_time()
+    conn.recv()  # "stop"
+    conn.send(time.process_time() - cpu_start)
+    httpd.shutdown()
+
+def download(port, path, total_bytes):
+    client = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    received = 0
+    buf = bytearray(1024 * 1024)
+    while received < total_bytes:
+        client.request("GET", path)
+        resp = client.getresponse()
+        while True:
+            n = resp.readinto(buf)
+            if not n:
+                break
+            received += n
+    client.close()
+    return received
+
+def run_mode(directory, use_sendfile, total_bytes):
+    parent, child = multiprocessing.Pipe()
+    proc = multiprocessing.Process(target=serve, args=(directory, use_sendfile, child))
+    proc.start()
+    port = parent.recv()
+    download(port, "/big.bin", 1)  # Warm the page cache and the connection path
+    parent.send("start")
+    t0 = time.perf_counter()
+    received = download(port, "/big.bin", total_bytes)
+    wall = time.perf_counter() - t0
+    parent.send("stop")
+    cpu = parent.recv()
+    proc.join()
+    gb = received / 1e9
+    return {'gb': gb, 'cpu_s': cpu, 'cpu_s_per_gb': cpu / gb, 'throughput_gbps': gb * 8 / wall}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare server CPU per GB with and without sendfile")
+    parser.add_argument("--file-mb", type=int, default=256)
+    parser.add_argument("--total-gb", type=float, default=4.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, "big.bin"), "wb") as f:
+            chunk = os.urandom(1024 * 1024)
+            for _ in range(args.file_mb):
+                f.write(chunk)
+
+        total_bytes = int(args.total_gb * 1e9)
+        print(f"{args.file_mb} MB file, {args.total_gb} GB per mode")
+        for label, use_sendfile in (("copyfileobj", False), ("sendfile", True)):
+            r = run_mode(directory, use_sendfile, total_bytes)
+            print(f"{label:<12} {r['gb']:.2f} GB  server CPU {r['cpu_s']:.2f} s  "
+                  f"{r['cpu_s_per_gb']:.3f} CPU-s/GB  {r['throughput_gbps']:.2f} Gbit/s")
@@ -0,0 +1,499 @@
+"""Replay benchmark for the voice assistant, with no microphone, browser or network.
+
+A real AIVoiceAssistant is driven end to end through listen_loop and
+process_command. Only the devices are replaced:
+
+  * microphone - a MicrophoneStream fed in real time with ambient noise, plus
+    each fixture's audio (a WAV file, or noise bursts shaped like its words)
+  * recognizer - a FakeBackend that answers with the fixture's transcript
+  * TTS        - a pyttsx3 stand-in that "speaks" for --tts-word seconds a word
+  * browser    - a page on the in-process control channel that acks every command
+
+Fixtures are played one at a time, after Sunday has stopped talking. Each one
+is scored on the intent it dispatched, the latency from the end of its speech
+to process_command (dispatch) and to process_command returning (action), and
+the process CPU time and peak Python allocations while it was handled.
+
+    python benchmarks/voice_bench.py --out voice_baseline.json
+    python benchmarks/voice_bench.py --compare voice_baseline.json --out new.json
+
+Fixture files look like benchmarks/voice_fixtures.json. "wav" (optional) is a
+16-bit PCM recording relative to the fixture file, "alternatives" the
+recognizer's N-best list and "expect" is "intent" or "intent:value", or null
+when nothing should be dispatched. With "echo": true the microphone also picks
+up Sunday's reply to the fixture while she says it, and the recognizer
+transcribes it word for word, as when she talks through speakers.
+"""
+import argparse
+import collections
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import main  # noqa: E402
+from audio_capture import MicrophoneStream, frame_rms, MIN_ENERGY, ECHO_TAIL  # noqa: E402
+from metrics import metrics  # noqa: E402
+from page_control import page_control  # noqa: E402
+from recognizers import FakeBackend  # noqa: E402
+from startup import Startup  # noqa: E402
+from tts_worker import TTSWorker  # noqa: E402
+from wake_word import read_wav  # noqa: E402
+
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'voice_fixtures.json')
+AMBIENT_RMS = 60  # int16 units, well under MIN_ENERGY
+SPEECH_RMS = 3000
+WORD_SECONDS = 0.3  # Length of one synthesized word
+WORD_GAP = 0.06
+SETTLE_TIMEOUT = 15  # Longest a fixture may take to be handled
+READY_TIMEOUT = 30
+IDLE_SECONDS = 1.0  # Quiet period used to measure background CPU
+STAGES = ('capture', 'recognize', 'intent', 'navigate', 'speak', 'wake_to_dispatch')
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    k = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+def wait_until(predicate, timeout, interval=0.01):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(interval)
+    return True
+
+def synthesize(text, sample_rate, seed):
+    """Noise bursts, one per word, loud enough for the VAD; deterministic for a given seed."""
+    rng = np.random.default_rng(seed)
+    word = int(WORD_SECONDS * sample_rate)
+    gap = np.zeros(int(WORD_GAP * sample_rate))
+    envelope = np.hanning(word)
+    parts = []
+    for _ in text.split():
+        parts += [rng.normal(0, SPEECH_RMS * 1.6, word) * envelope, gap]
+    return np.clip(np.concatenate(parts), -32768, 32767).astype(np.int16)
+
+def voiced_length(samples, frame_samples):
+    """Samples up to the end of the last frame above MIN_ENERGY (trailing silence trimmed)."""
+    end = 0
+    for i in range(0, len(samples) - frame_samples + 1, frame_samples):
+        if frame_rms(samples[i:i + frame_samples]) > MIN_ENERGY:
+            end = i + frame_samples
+    return end
+
+class FakeMicrophone:
+    """Pushes audio into a MicrophoneStream at real-time pace, as a sound card would."""
+
+    def __init__(self, stream, seed=0):
+        self.stream = stream
+        self.frame = stream.frame_samples
+        self._rng = np.random.default_rng(seed)
+        self._queue = collections.deque()  # (samples, voiced samples, done Event, [speech end time])
+        self._running = True
+        self._thread = threading.Thread(target=self._pump, name='fake-mic', daemon=True)
+        self._thread.start()
+
+    def play(self, samples):
+        """Queue a recording and block until it has been captured; returns when its speech ended."""
+        item = self.queue(samples)
+        item[2].wait()
+        return item[3][0]
+
+    def queue(self, samples):
+        """Queue a recording without waiting; item[2] is set once it has been captured."""
+        item = (samples, voiced_length(samples, self.frame), threading.Event(), [None])
+        self._queue.append(item)
+        return item
+
+    def stop(self):
+        self._running = False
+        self._thread.join(1)
+
+    def _pump(self):
+        started = time.monotonic()
+        pushed = 0
+        current, offset = None, 0
+        while self._running:
+            if current is None and self._queue:
+                current, offset = self._queue[0], 0
+            if current is None:
+                frame = self._rng.normal(0, AMBIENT_RMS, self.frame).astype(np.int16)
+            else:
+                samples, voiced, done, speech_end = current
+                frame = samples[offset:offset + self.frame]
+                if len(frame) < self.frame:
+                    frame = np.concatenate([frame, self._rng.normal(0, AMBIENT_RMS, self.frame - len(frame))])
+                    frame = frame.astype(np.int16)
+                offset += self.frame
+            delay = started + pushed / self.stream.sample_rate - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self.stream.push(frame)
+            pushed += self.frame
+            if current is not None:
+                if speech_end[0] is None and offset >= voiced:
+                    speech_end[0] = time.monotonic()
+                if offset >= len(samples):
+                    self._queue.popleft()
+                    done.set()
+                    current = None
+
+class FakeEngine:
+    """pyttsx3 stand-in that takes seconds_per_word to say each word and fires the same callbacks."""
+
+    def __init__(self, seconds_per_word):
+        self.seconds_per_word = seconds_per_word
+        self.properties = {'rate': 150, 'volume': 1.0, 'voice': 'fake'}
+        self._callbacks = collections.defaultdict(list)
+        self._texts = []
+        self._stopped = False
+
+    def connect(self, topic, callback):
+        self._callbacks[topic].append(callback)
+
+    def setProperty(self, name, value):
+        self.properties[name] = value
+
+    def getProperty(self, name):
+        return self.properties.get(name)
+
+    def say(self, text):
+        self._texts.append(text)
+
+    def stop(self):
+        self._stopped = True
+
+    def runAndWait(self):
+        self._stopped = False
+        for text in self._texts:
+            for callback in self._callbacks['started-utterance']:
+                callback('utterance')
+            location = 0
+            for word in text.split():
+                if self._stopped:
+                    break
+                for callback in self._callbacks['started-word']:
+                    callback('utterance', location, len(word))
+                location += len(word) + 1
+                time.sleep(self.seconds_per_word)
+        self._texts.clear()
+
+class FakePage:
+    """The open page, as seen over page_control: carries out each command after render_delay and acks it."""
+
+    def __init__(self, render_delay=0.0):
+        self.render_delay = render_delay
+        self.commands = []
+        self._running = True
+        page_control.subscribe()
+        self._thread = threading.Thread(target=self._run, name='fake-page', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        last_id = 0
+        while self._running:
+            commands, last_id = page_control.commands_after(last_id, timeout=0.5)
+            for command in commands:
+                started = time.monotonic()
+                if self.render_delay:
+                    time.sleep(self.render_delay)
+                self.commands.append(command)
+                page_control.ack(command['id'], {'id': command['id'], 'ok': True,
+                                                 'ms': round((time.monotonic() - started) * 1000)})
+
+    def stop(self):
+        self._running = False
+        page_control.unsubscribe()
+
+class RecordingMatcher:
+    """Wraps main.intent_matcher so the benchmark sees which intent each command matched."""
+
+    def __init__(self, matcher):
+        self.matcher = matcher
+        self.last = None
+
+    def best(self, hypotheses):
+        self.last = self.matcher.best(hypotheses)
+        return self.last
+
+class ReplayAssistant(main.AIVoiceAssistant):
+    """AIVoiceAssistant with its devices swapped for the bench's fakes."""
+
+    def __init__(self, bench, startup):
+        self.bench = bench
+        super().__init__(startup)
+
+    def setup_tts(self):
+        self.phrase_cache = None
+        self.tts = TTSWorker(lambda: FakeEngine(self.bench.tts_word), listener=self._on_tts_event)
+
+    def _make_recognizer_backends(self):
+        return [self.bench.backend]
+
+    def _on_tts_event(self, event, utterance):
+        super()._on_tts_event(event, utterance)
+        if event == 'started':
+            self.bench.echo(utterance.text)
+
+    def _load_wake_word_model(self):
+        pass  # Every phrase goes to the recognizer, as without a trained model
+
+    def _start_microphone(self):
+        self.capture = self.bench.mic.stream
+        if not self.capture.ring.wait_for(int(main.CALIBRATION_SECONDS * self.capture.sample_rate), timeout=5):
+            return False
+        self.calibrate_microphone()
+
+    def log_conversation(self, speaker, message):
+        self.bench.log.append((speaker, message))
+        if self.bench.verbose:
+            print(f"  [{speaker}] {message}")
+
+    def process_command(self, command, alternatives=()):
+        self.bench.matcher.last = None
+        started = time.monotonic()
+        super().process_command(command, alternatives)
+        self.bench.dispatches.append((started, time.monotonic(), self.bench.matcher.last))
+
+    def stop(self):
+        """Shut down without os._exit so the benchmark can still report."""
+        if not self.listening:
+            return
+        self.listening = False
+        self.sessions.stop()
+        self.recognition.close()
+        self.tts.close()
+
+class VoiceBench:
+    def __init__(self, fixtures, recognizer_latency=0.0, tts_word=0.02, page_delay=0.0, trace_memory=True,
+                 seed=0, verbose=False):
+        self.fixtures = fixtures
+        self.tts_word = tts_word
+        self.trace_memory = trace_memory
+        self.seed = seed
+        self.verbose = verbose
+        self.log = []
+        self.dispatches = []
+        self._answers = collections.deque()  # N-best lists for the next phrases the recognizer gets
+        self._echo = None  # Captured-event of the fixture's echo, or True while one is still due
+        self._lock = threading.Lock()
+        self.backend = FakeBackend(self._respond, latency=recognizer_latency)
+        self.mic = FakeMicrophone(MicrophoneStream(pause_threshold=1.0, max_phrase=15), seed)
+        self.page = FakePage(page_delay)
+        self.matcher = main.intent_matcher = RecordingMatcher(main.intent_matcher)
+        self.assistant = None
+
+    def _respond(self, audio):
+        with self._lock:
+            if not self._answers:
+                return None  # Stray segment (a VAD split); recognised as nothing
+            return self._answers.popleft()
+
+    def echo(self, text):
+        """Sunday started saying text: if the fixture asks for it, play her words into the microphone."""
+        with self._lock:
+            if self._echo is not True:
+                return
+            self._answers.append([text])
+            self._echo = self.mic.queue(synthesize(text, self.mic.stream.sample_rate, self.seed))[2]
+
+    def start(self):
+        startup = Startup()
+        self.assistant = ReplayAssistant(self, startup)
+        if not startup.wait('listening', READY_TIMEOUT) or startup.failed():
+            raise RuntimeError("assistant did not start:\n" + startup.report())
+        self._quiet()
+        return startup
+
+    def _quiet(self, timeout=SETTLE_TIMEOUT):
+        """Wait for Sunday to stop talking, plus the echo tail, so the next fixture isn't taken for echo."""
+        wait_until(lambda: not self.assistant.tts.busy(), timeout)
+        time.sleep(ECHO_TAIL + 0.05)
+
+    def idle_cpu(self, seconds=IDLE_SECONDS):
+        """Process CPU seconds per second with nothing being said (capture, VAD and the fakes)."""
+        cpu = time.process_time()
+        time.sleep(seconds)
+        return (time.process_time() - cpu) / seconds
+
+    def audio_for(self, index, fixture):
+        if fixture.get('wav'):
+            return read_wav(fixture['wav'])
+        return synthesize(fixture['say'], self.mic.stream.sample_rate, self.seed * 1000 + index)
+
+    def run_fixture(self, index, fixture):
+        samples = self.audio_for(index, fixture)
+        expect = fixture.get('expect')
+        dispatched = len(self.dispatches)
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            memory_before = tracemalloc.get_traced_memory()[0]
+        cpu = time.process_time()
+        with self._lock:
+            self._answers = collections.deque([fixture.get('alternatives') or [fixture['say']]])
+            self._echo = True if fixture.get('echo') else None
+
+        speech_end = self.mic.play(samples)
+        if fixture.get('echo'):
+            wait_until(lambda: isinstance(self._echo, threading.Event) and self._echo.is_set(), SETTLE_TIMEOUT)
+        if expect:
+            wait_until(lambda: len(self.dispatches) > dispatched, SETTLE_TIMEOUT)
+        else:
+            # Nothing should be dispatched: wait until the phrase has been recognised and handled
+            wait_until(lambda: not self._answers and not self.assistant.recognition.in_flight(), SETTLE_TIMEOUT)
+            time.sleep(0.1)
+
+        record = {'id': fixture.get('id', str(index)), 'say': fixture['say'], 'expect': expect,
+                  'audio_s': round(len(samples) / self.mic.stream.sample_rate, 3),
+                  'cpu_ms': round((time.process_time() - cpu) * 1000, 2)}
+        if self.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            record['alloc_peak_kb'] = round((peak - memory_before) / 1024, 1)
+            record['retained_kb'] = round((current - memory_before) / 1024, 1)
+        new = self.dispatches[dispatched:]
+        if new:
+            started, finished, match = new[0]
+            record['matched'] = None if match is None else (
+                match.intent if match.value is None else f"{match.intent}:{match.value}")
+            record['dispatch_ms'] = round((started - speech_end) * 1000, 1)
+            record['action_ms'] = round((finished - speech_end) * 1000, 1)
+        else:
+            record['matched'] = None
+        record['correct'] = record['matched'] == expect and bool(new) == bool(expect)
+        with self._lock:
+            self._echo = None
+        self._quiet()
+        return record
+
+    def run(self, repeat=1):
+        random.seed(self.seed)  # Acknowledgement and completion phrases
+        if self.trace_memory:
+            tracemalloc.start()
+        startup = self.start()
+        idle = self.idle_cpu()
+        records = []
+        started = time.monotonic()
+        for _ in range(repeat):
+            for index, fixture in enumerate(self.fixtures):
+                record = self.run_fixture(index, fixture)
+                mark = "✓" if record['correct'] else "⚠"
+                latency = f"{record['action_ms']:.0f} ms" if 'action_ms' in record else "-"
+                print(f"  {mark} {record['id']:<22} {str(record['matched']):<24} {latency}")
+                records.append(record)
+        elapsed = time.monotonic() - started
+        self.assistant.stop()
+        self.page.stop()
+        self.mic.stop()
+        if self.trace_memory:
+            tracemalloc.stop()
+        return self.report(records, elapsed, idle, startup)
+
+    def report(self, records, elapsed, idle, startup):
+        dispatch = sorted(r['dispatch_ms'] for r in records if 'dispatch_ms' in r)
+        action = sorted(r['action_ms'] for r in records if 'action_ms' in r)
+        summary = {
+            'fixtures': len(records),
+            'intent_accuracy': round(sum(r['correct'] for r in records) / len(records), 4) if records else None,
+            'wake_to_dispatch_p50_ms': percentile(dispatch, 50),
+            'wake_to_dispatch_p95_ms': percentile(dispatch, 95),
+            'wake_to_action_p50_ms': percentile(action, 50),
+            'wake_to_action_p95_ms': percentile(action, 95),
+            'wake_to_action_max_ms': action[-1] if action else None,
+            'commands_per_minute': round(len(action) / elapsed * 60, 2) if elapsed else None,
+            'realtime_factor': round(elapsed / sum(r['audio_s'] for r in records), 2) if records else None,
+            'cpu_ms_per_command': round(sum(r['cpu_ms'] for r in records) / len(records), 2) if records else None,
+            'idle_cpu_ms_per_s': round(idle * 1000, 2),
+            'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            'listening_after_s': round(startup.ready_at('listening'), 3),
+        }
+        if self.trace_memory and records:
+            summary['alloc_peak_kb_per_command'] = round(sum(r['alloc_peak_kb'] for r in records) / len(records), 1)
+        stages = {}
+        for name in STAGES:
+            quantiles = metrics.stage(name).quantiles()
+            if quantiles:
+                stages[name] = {f"p{int(q * 100)}_ms": round(v * 1000, 2) for q, v in quantiles.items()}
+        return {
+            'config': {'recognizer_latency': self.backend.latency, 'tts_word': self.tts_word,
+                       'page_delay': self.page.render_delay, 'trace_memory': self.trace_memory, 'seed': self.seed},
+            'environment': {'python': platform.python_version(), 'machine': platform.machine(),
+                            'revision': git_revision()},
+            'summary': summary,
+            'stages': stages,
+            'fixtures': records,
+        }
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def load_fixtures(path):
+    with open(path, encoding='utf-8') as f:
+        fixtures = json.load(f)['fixtures']
+    base = os.path.dirname(os.path.abspath(path))
+    for fixture in fixtures:
+        if fixture.get('wav'):
+            fixture['wav'] = os.path.join(base, fixture['wav'])
+    return fixtures
+
+def compare(baseline, result):
+    """Print summary metrics side by side with a baseline run."""
+    print(f"{'metric':<28} {'baseline':>12} {'current':>12} {'change':>8}")
+    for key, new in result['summary'].items():
+        old = baseline.get('summary', {}).get(key)
+        change = ""
+        if isinstance(old, (int, float)) and isinstance(new, (int, float)) and old:
+            change = f"{(new - old) / abs(old) * 100:+.1f}%"
+        print(f"{key:<28} {str(old):>12} {str(new):>12} {change:>8}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay voice fixtures through AIVoiceAssistant with fake devices")
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--recognizer-latency", type=float, default=0.0, help="Seconds the fake recognizer takes")
+    parser.add_argument("--tts-word", type=float, default=0.02, help="Seconds the fake TTS takes per word")
+    parser.add_argument("--page-delay", type=float, default=0.0, help="Seconds the fake page takes to render")
+    parser.add_argument("--no-tracemalloc", action="store_true", help="Skip allocation tracking (it slows Python)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="Write the JSON results here")
+    parser.add_argument("--compare", help="Baseline JSON to compare the summary against")
+    parser.add_argument("--verbose", action="store_true", help="Echo the conversation log")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixtures)
+    out = os.path.abspath(args.out) if args.out else None
+    baseline_path = os.path.abspath(args.compare) if args.compare else None
+    main.STATUS_SNAPSHOT_FILE = None
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)  # The assistant's log files land here and are thrown away
+        bench = VoiceBench(fixtures, args.recognizer_latency, args.tts_word, args.page_delay,
+                           not args.no_tracemalloc, args.seed, args.verbose)
+        result = bench.run(args.repeat)
+        os.chdir(ROOT)
+
+    print(json.dumps(result['summary'], indent=2))
+    if out:
+        with open(out, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"✓ Results written to {out}")
+    if baseline_path:
+        with open(baseline_path, encoding='utf-8') as f:
+            compare(json.load(f), result)
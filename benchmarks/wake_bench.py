@@ -0,0 +1,166 @@
+"""False-accept / false-reject rates of the wake-word pre-filter on a labelled fixture set.
+
+Trains a WakeWordDetector on <fixtures>/train the same way
+`python wake_word.py train` does, then scores <fixtures>/held_out with the
+threshold that training picked. Both splits have positive/ and negative/
+16-bit mono WAVs.
+
+The committed set (fixtures/wake_synthetic) is synthetic so that it can ship
+with the repo. A small formant synthesizer says "Sunday", "hey Sunday" and
+near misses ("Monday", "someday", "sundial") plus other assistant words. Each
+take varies pitch, vocal-tract length, tempo, loudness and background noise.
+Real voices are harder than this, so record your own set and pass its
+directory to measure the detector on them.
+
+    python benchmarks/wake_bench.py                       # fixtures/wake_synthetic
+    python benchmarks/wake_bench.py fixtures/wake         # your own recordings
+    python benchmarks/wake_bench.py --generate            # rewrite the synthetic set
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from wake_word import SAMPLE_RATE, WakeWordDetector, load_fixtures, write_wav  # noqa: E402
+
+SYNTHETIC_FIXTURES = os.path.join(ROOT, 'fixtures', 'wake_synthetic')
+
+# Vowels and voiced continuants: formants F1, F2, F3 in Hz (adult male vocal tract)
+FORMANTS = {
+    'a': (730, 1090, 2440), 'i': (270, 2290, 3010), 'u': (300, 870, 2240), 'o': (570, 840, 2410),
+    'e': (530, 1840, 2480), 'uh': (640, 1190, 2390), 'ae': (660, 1720, 2410), 'er': (490, 1350, 1690),
+    'l': (360, 1300, 2700), 'w': (300, 700, 2200), 'y': (280, 2250, 2900), 'r': (420, 1300, 1600),
+}
+NASALS = {'m': (250, 1100, 2200), 'n': (250, 1500, 2500)}
+FRICATIVES = {'s': (4500, 8000), 'sh': (2200, 5000), 'f': (1500, 7500), 'h': (500, 4000), 'th': (1400, 7000)}
+STOPS = {'p': (500, 2000), 't': (3000, 6000), 'k': (1500, 3000), 'b': (300, 1500), 'd': (2000, 5000),
+         'g': (1000, 2500)}
+
+# (phoneme, seconds); a diphthong is ('e>i', seconds)
+WORDS = {
+    'sunday': [('s', 0.12), ('uh', 0.11), ('n', 0.07), ('d', 0.05), ('e>i', 0.2)],
+    'hey sunday': [('h', 0.07), ('e>i', 0.15), ('', 0.06), ('s', 0.12), ('uh', 0.11), ('n', 0.07), ('d', 0.05),
+                   ('e>i', 0.2)],
+    'monday': [('m', 0.08), ('uh', 0.11), ('n', 0.07), ('d', 0.05), ('e>i', 0.2)],
+    'someday': [('s', 0.12), ('uh', 0.11), ('m', 0.08), ('d', 0.05), ('e>i', 0.2)],
+    'sundial': [('s', 0.12), ('uh', 0.11), ('n', 0.07), ('d', 0.05), ('a>i', 0.16), ('uh', 0.06), ('l', 0.1)],
+    'hello': [('h', 0.07), ('e', 0.09), ('l', 0.07), ('o>u', 0.22)],
+    'yoga': [('y', 0.07), ('o>u', 0.16), ('g', 0.05), ('uh', 0.12)],
+    'open': [('o>u', 0.15), ('p', 0.06), ('e', 0.07), ('n', 0.1)],
+    'pause': [('p', 0.06), ('a', 0.2), ('s', 0.14)],
+    'thank you': [('th', 0.08), ('ae', 0.12), ('n', 0.05), ('k', 0.06), ('y', 0.05), ('u', 0.18)],
+    'library': [('l', 0.06), ('a>i', 0.15), ('b', 0.04), ('r', 0.07), ('er', 0.08), ('i', 0.12)],
+}
+POSITIVE_WORDS = ('sunday', 'hey sunday')
+NEAR_MISSES = ('monday', 'someday', 'sundial')  # Negatives that sound most like the wake word
+
+def _band_noise(rng, n, low, high):
+    spectrum = np.fft.rfft(rng.normal(0, 1, n))
+    freqs = np.fft.rfftfreq(n, 1 / SAMPLE_RATE)
+    spectrum[(freqs < low) | (freqs > high)] = 0
+    noise = np.fft.irfft(spectrum, n)
+    return noise / (np.abs(noise).max() + 1e-9)
+
+def _voiced(formants_from, formants_to, seconds, f0, scale, nasal=False):
+    """Harmonics of f0 shaped by formant peaks that glide from one vowel to another."""
+    n = int(seconds * SAMPLE_RATE)
+    t = np.arange(n) / SAMPLE_RATE
+    glide = np.linspace(0, 1, n)[:, np.newaxis]
+    formants = (np.array(formants_from) * (1 - glide) + np.array(formants_to) * glide) * scale
+    out = np.zeros(n)
+    for k in range(1, int(4000 / f0)):
+        freq = k * f0
+        gain = sum(np.exp(-((freq - formants[:, j]) / (60 + 40 * j)) ** 2) / (j + 1) for j in range(3))
+        out += gain * np.sin(2 * np.pi * freq * t) / k ** 0.5
+    out *= 0.35 if nasal else 1.0
+    return out / (np.abs(out).max() + 1e-9) * (0.5 if nasal else 1.0)
+
+def say(word, rng, f0, scale, tempo):
+    """One take of a word from WORDS."""
+    parts = []
+    for phoneme, seconds in WORDS[word]:
+        seconds *= tempo
+        n = int(seconds * SAMPLE_RATE)
+        if not phoneme:
+            parts.append(np.zeros(n))
+        elif '>' in phoneme:
+            start, end = phoneme.split('>')
+            parts.append(_voiced(FORMANTS[start], FORMANTS[end], seconds, f0, scale))
+        elif phoneme in FORMANTS:
+            parts.append(_voiced(FORMANTS[phoneme], FORMANTS[phoneme], seconds, f0, scale) *
+                         (0.6 if phoneme in 'lwyr' else 1.0))
+        elif phoneme in NASALS:
+            parts.append(_voiced(NASALS[phoneme], NASALS[phoneme], seconds, f0, scale, nasal=True))
+        elif phoneme in FRICATIVES:
+            low, high = FRICATIVES[phoneme]
+            parts.append(_band_noise(rng, n, low * scale, min(high * scale, SAMPLE_RATE / 2 - 1)) *
+                         (0.15 if phoneme == 'h' else 0.35) * np.hanning(n))
+        else:  # Stop: closure, then a short burst
+            low, high = STOPS[phoneme]
+            burst = int(0.015 * SAMPLE_RATE)
+            parts += [np.zeros(n - burst), _band_noise(rng, burst, low, high) * 0.4]
+    return np.concatenate(parts)
+
+def take(word, rng):
+    """A take with a random speaker, tempo, level and room noise, padded with silence."""
+    voice = say(word, rng, f0=rng.uniform(95, 230), scale=rng.uniform(0.9, 1.18), tempo=rng.uniform(0.8, 1.25))
+    pad = lambda: np.zeros(int(rng.uniform(0.05, 0.15) * SAMPLE_RATE))
+    samples = np.concatenate([pad(), voice * rng.uniform(4000, 12000), pad()])
+    samples += rng.normal(0, rng.uniform(30, 200), len(samples))
+    return np.clip(samples, -32768, 32767).astype(np.int16)
+
+def generate(root, seed=0):
+    """Write the synthetic fixture set: per split, every word in WORDS said by several speakers.
+
+    Training gets extra near misses so the threshold is set against the
+    phrases most likely to be falsely accepted.
+    """
+    rng = np.random.default_rng(seed)
+    if os.path.isdir(root):
+        shutil.rmtree(root)
+    counts = {}
+    # (takes per positive word, per near miss, per other negative); positives are enrolled as templates
+    for split, takes in (('train', (4, 3, 1)), ('held_out', (5, 2, 2))):
+        for word in WORDS:
+            kind = 'positive' if word in POSITIVE_WORDS else 'negative'
+            directory = os.path.join(root, split, kind)
+            os.makedirs(directory, exist_ok=True)
+            for i in range(takes[0] if kind == 'positive' else takes[1] if word in NEAR_MISSES else takes[2]):
+                write_wav(os.path.join(directory, f"{word.replace(' ', '_')}_{i:02d}.wav"), take(word, rng))
+                counts[split, kind] = counts.get((split, kind), 0) + 1
+    return counts
+
+def evaluate(root):
+    positives, negatives = load_fixtures(os.path.join(root, 'train'))
+    started = time.perf_counter()
+    detector = WakeWordDetector.train(positives, negatives)
+    trained_in = time.perf_counter() - started
+    held_positives, held_negatives = load_fixtures(os.path.join(root, 'held_out'))
+    started = time.perf_counter()
+    result = detector.evaluate(held_positives, held_negatives)
+    phrases = len(held_positives) + len(held_negatives)
+    result.update(train=detector.evaluate(positives, negatives), train_seconds=round(trained_in, 2),
+                  ms_per_phrase=round((time.perf_counter() - started) / max(1, phrases) * 1000, 1))
+    return result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Wake-word false-accept/false-reject rates on a fixture set")
+    parser.add_argument("fixtures", nargs="?", default=SYNTHETIC_FIXTURES,
+                        help="directory with train/ and held_out/ splits")
+    parser.add_argument("--generate", action="store_true", help="(re)write the synthetic fixture set first")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.generate:
+        counts = generate(args.fixtures, args.seed)
+        print(f"✓ Wrote {sum(counts.values())} WAVs to {args.fixtures}")
+    if not os.path.isdir(os.path.join(args.fixtures, 'held_out')):
+        sys.exit(f"no {args.fixtures}/train and held_out splits; run with --generate or record your own")
+    print(json.dumps(evaluate(args.fixtures), indent=2))
@@ -0,0 +1,93 @@
+import datetime
+import email.utils
+import fnmatch
+import hashlib
+import os
+import threading
+
+# First matching rule wins. Patterns are matched against the URL path.
+CACHE_RULES = [
+    ('/assets/*', 'no-cache'),  # Not fingerprinted: a replaced image must show up, so revalidate (ETag/304)
+    ('/vendor/manifest.json', 'no-cache'),
+    ('/vendor/*', 'public, max-age=31536000, immutable'),  # Content-addressed by vendor.py
+    ('*.html', 'no-cache'),  # Always revalidate, but a 304 costs almost nothing
+    ('/', 'no-cache'),
+]
+DEFAULT_CACHE_CONTROL = 'no-cache'
+NO_STORE = 'no-cache, no-store, must-revalidate'  # Errors and directory listings
+
+def cache_control_for(url_path, rules=None):
+    """Return the Cache-Control value for a request path using the first matching rule."""
+    for pattern, value in (rules if rules is not None else CACHE_RULES):
+        if fnmatch.fnmatchcase(url_path, pattern):
+            return value
+    return DEFAULT_CACHE_CONTROL
+
+def format_etag(hexdigest, variant=''):
+    """Build a strong ETag from a content digest; encoded variants get a distinct tag."""
+    return f'"{hexdigest[:20]}-{variant}"' if variant else f'"{hexdigest[:20]}"'
+
+class ETagCache:
+    """Strong ETags computed once per file, recomputed only when mtime or size change."""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def validators(self, fs_path, st=None):
+        """Return (etag, mtime) for a file, hashing its content only on first use or after a change."""
+        st = st or os.stat(fs_path)
+        key = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            entry = self._entries.get(fs_path)
+        if entry and entry[0] == key:
+            return entry[1], st.st_mtime
+
+        digest = hashlib.sha1()
+        with open(fs_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        etag = format_etag(digest.hexdigest())
+        with self._lock:
+            self._entries[fs_path] = (key, etag)
+        return etag, st.st_mtime
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+def _etag_matches(header_value, etag):
+    # If-None-Match uses weak comparison, so W/"x" matches "x"
+    for candidate in header_value.split(','):
+        candidate = candidate.strip()
+        if candidate == '*':
+            return True
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+def is_not_modified(headers, etag, mtime):
+    """True when the request's conditional headers say the client copy is still fresh.
+
+    If-None-Match takes precedence; If-Modified-Since is only consulted without it.
+    """
+    if_none_match = headers.get('If-None-Match')
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+
+    if_modified_since = headers.get('If-Modified-Since')
+    if if_modified_since:
+        try:
+            since = email.utils.parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError, IndexError, OverflowError):
+            return False
+        if since is None:
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=datetime.timezone.utc)
+        return int(mtime) <= since.timestamp()
+    return False
+
+etag_cache = ETagCache()
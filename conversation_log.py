@@ -0,0 +1,144 @@
+"""Background, batched, rotating conversation log.
+
+log() only timestamps the entry and puts it on a queue.SimpleQueue, whose
+put never blocks. The listen and speak threads therefore never wait on the
+disk or the console. One writer thread echoes entries to the console and
+appends them to the file in batches. It flushes when BATCH_SIZE entries are
+pending or FLUSH_INTERVAL seconds after the first one arrived.
+
+The file is rotated once it exceeds MAX_BYTES or is older than MAX_AGE. The
+old file becomes <name>.<YYYYmmdd-HHMMSS><ext>.gz, and the newest
+BACKUP_COUNT of those are kept.
+
+fmt='text' writes the familiar "[time] Speaker: message" lines. fmt='jsonl'
+writes one {"ts", "time", "speaker", "message"} object per line.
+"""
+import atexit
+import glob
+import gzip
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+
+BATCH_SIZE = 64
+FLUSH_INTERVAL = 1.0  # Seconds an entry may wait before it is written
+MAX_BYTES = 1024 * 1024
+MAX_AGE = 7 * 24 * 3600  # Seconds
+BACKUP_COUNT = 5
+FORMATS = ('text', 'jsonl')
+
+def format_text(entry):
+    ts, speaker, message = entry
+    return f"[{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(ts))}] {speaker}: {message}\n"
+
+def format_jsonl(entry):
+    ts, speaker, message = entry
+    return json.dumps({'ts': round(ts, 3), 'time': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(ts)),
+                       'speaker': speaker, 'message': message}, ensure_ascii=False) + '\n'
+
+class ConversationLogger:
+    def __init__(self, path, fmt='text', echo=True, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL,
+                 max_bytes=MAX_BYTES, max_age=MAX_AGE, backup_count=BACKUP_COUNT):
+        if fmt not in FORMATS:
+            raise ValueError(f"unknown log format {fmt!r}; expected one of {FORMATS}")
+        self.path = path
+        self.format = format_jsonl if fmt == 'jsonl' else format_text
+        self.echo = echo
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.backup_count = backup_count
+        self.written = 0
+        self.rotations = 0
+        self._queue = queue.SimpleQueue()
+        self._closed = False
+        self._open()
+        self._thread = threading.Thread(target=self._run, name='conversation-log', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def log(self, speaker, message):
+        """Queue one entry; returns immediately."""
+        self._queue.put((time.time(), speaker, message))
+
+    def close(self, timeout=2.0):
+        """Write everything queued so far and stop the writer thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _open(self):
+        self._file = open(self.path, 'ab')
+        self._size = self._file.tell()
+        # For a file left over from a previous run, age counts from its last write
+        self._opened_at = os.path.getmtime(self.path) if self._size else time.time()
+
+    def _run(self):
+        pending = []
+        deadline = 0.0
+        while True:
+            timeout = max(0.0, deadline - time.monotonic()) if pending else None
+            try:
+                entry = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                entry = False  # Flush interval elapsed
+            if entry is None:
+                break
+            if entry:
+                if not pending:
+                    deadline = time.monotonic() + self.flush_interval
+                pending.append(entry)
+                if self.echo:
+                    print(format_text(entry), end='')
+            if pending and (len(pending) >= self.batch_size or time.monotonic() >= deadline):
+                self._write(pending)
+                pending = []
+        if pending:
+            self._write(pending)
+        self._file.close()
+
+    def _write(self, entries):
+        data = ''.join(self.format(entry) for entry in entries).encode('utf-8')
+        try:
+            if self._file.closed:
+                self._open()  # A failed rotation left it closed
+            self._file.write(data)
+            self._file.flush()
+            self._size += len(data)
+            self.written += len(entries)
+        except Exception as e:  # Never let the writer thread die; later entries would be lost silently
+            print(f"⚠ Conversation log write failed: {e}")
+            return
+        if self._size >= self.max_bytes or (self.max_age and time.time() - self._opened_at >= self.max_age):
+            try:
+                self._rotate()
+            except Exception as e:
+                print(f"⚠ Conversation log rotation failed: {e}")
+                if self._file.closed:
+                    try:
+                        self._open()
+                    except Exception as e:
+                        print(f"⚠ Conversation log reopen failed: {e}")
+
+    def _rotate(self):
+        self._file.close()
+        base, ext = os.path.splitext(self.path)
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        rotated, n = f"{base}.{stamp}{ext}", 1
+        while os.path.exists(rotated + '.gz'):
+            rotated, n = f"{base}.{stamp}-{n}{ext}", n + 1
+        os.replace(self.path, rotated)
+        self._open()
+        with open(rotated, 'rb') as src, gzip.open(rotated + '.gz', 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(rotated)
+        self.rotations += 1
+        backups = sorted(glob.glob(f"{glob.escape(base)}.*{glob.escape(ext)}.gz"), key=os.path.getmtime)
+        for old in backups[:-self.backup_count] if self.backup_count else backups:
+            os.remove(old)
@@ -0,0 +1,191 @@
+"""Guided pose sessions as background timelines.
+
+guide_through_pose used to run on the listen thread, with a fixed
+time.sleep(5-6) after each step. For the ~40 s of a pose the wake word went
+unheard, and the pauses ignored how long each step actually took to say.
+
+A SessionRunner plays one script at a time on its own thread. Each step is
+spoken and followed by a hold. The hold counts from when the step started, and
+it only begins once the step's speech has actually finished (the TTS listener
+calls notify()). Pause, resume, skip and stop arrive as commands from any
+thread and take effect immediately. A step whose speech was cut off by
+barge-in counts as paused. It is repeated after INTERRUPT_RESUME seconds
+unless a command arrives first; a pause then holds it until resume.
+
+Scripts are data (pose_scripts.json):
+
+    {"tadasana": {"title": "Tadasana", "phrases": ["mountain pose", ...], "intro": "...",
+                  "steps": [{"say": "Stand with your feet together", "hold": 6}, ...],
+                  "complete": ["Beautiful! You've completed {title}."]}}
+
+A step may also be a plain string, which gets the script's "hold" (default DEFAULT_HOLD).
+"""
+import json
+import random
+import threading
+import time
+
+SCRIPTS_FILE = 'pose_scripts.json'
+DEFAULT_HOLD = 5.0  # Seconds from the start of a step to the start of the next
+INTERRUPT_RESUME = 10.0  # A step cut off by barge-in is repeated after this unless a command arrives
+SPEECH_TIMEOUT = 30.0  # Longest a step's speech is waited for
+COMPLETION_PHRASES = [
+    "Beautiful! You've completed {title}. How does your body feel?",
+    "Excellent work on {title}! Your practice is growing stronger.",
+    "Lovely! You've mastered the essence of {title}. Well done!",
+]
+
+def load_scripts(path=SCRIPTS_FILE):
+    """Scripts keyed by name, with every step normalised to {'say', 'hold'}."""
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    scripts = {}
+    for name, script in data.items():
+        hold = script.get('hold', DEFAULT_HOLD)
+        steps = [step if isinstance(step, dict) else {'say': step} for step in script['steps']]
+        script = dict(script, steps=[dict(step, hold=step.get('hold', hold)) for step in steps])
+        script.setdefault('title', name.title())
+        script.setdefault('phrases', [name])
+        scripts[name] = script
+    return scripts
+
+class GuidedSession:
+    """One run of a script; state is pending, running, paused, done or cancelled."""
+
+    def __init__(self, name, script):
+        self.name = name
+        self.script = script
+        self.steps = script['steps']
+        self.index = 0  # Step being spoken or held
+        self.state = 'pending'
+        self.started_at = None
+        self.finished_at = None
+        self.finished = threading.Event()
+
+    @property
+    def step(self):
+        return self.steps[self.index] if self.index < len(self.steps) else None
+
+class SessionRunner:
+    """Runs one GuidedSession at a time in the background.
+
+    speak(text) must queue speech and return an object with a `done` Event
+    and a `state` ('cancelled' when cut off), or None. listener(event,
+    session) is called with 'started', 'step', 'paused', 'resumed', 'done'
+    or 'cancelled'.
+    """
+
+    def __init__(self, speak, listener=None):
+        self.speak = speak
+        self.listener = listener
+        self.session = None
+        self._command = None
+        self._cond = threading.Condition()
+
+    def start(self, name, script):
+        """Stop any running session and start a new one; returns it immediately."""
+        self.stop()
+        session = GuidedSession(name, script)
+        with self._cond:
+            self.session = session
+            self._command = None
+        threading.Thread(target=self._run, args=(session,), name=f"session-{name}", daemon=True).start()
+        return session
+
+    def active(self):
+        with self._cond:
+            return self.session is not None and not self.session.finished.is_set()
+
+    def pause(self):
+        return self._control('pause')
+
+    def resume(self):
+        return self._control('resume')
+
+    def skip(self):
+        return self._control('skip')
+
+    def stop(self, timeout=2.0):
+        """Cancel the running session; True if there was one."""
+        session = self.session
+        if not self._control('stop'):
+            return False
+        session.finished.wait(timeout)
+        return True
+
+    def notify(self):
+        """Wake the runner; call when speech finishes or is cancelled."""
+        with self._cond:
+            self._cond.notify_all()
+
+    def _control(self, command):
+        with self._cond:
+            if self.session is None or self.session.finished.is_set():
+                return False
+            self._command = command
+            self._cond.notify_all()
+            return True
+
+    def _wait(self, accept, until=None, deadline=None):
+        """Block until a command in `accept` (returned), until() holds or the deadline passes (None)."""
+        with self._cond:
+            while True:
+                command, self._command = self._command, None
+                if command in accept:
+                    return command
+                if until is not None and until():
+                    return None
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+
+    def _run(self, session):
+        session.state = 'running'
+        session.started_at = time.monotonic()
+        self._notify('started', session)
+        running = {'pause', 'skip', 'stop'}
+        command = None
+        while session.step is not None:
+            step = session.step
+            started = time.monotonic()
+            utterance = self.speak(step['say'])
+            self._notify('step', session)
+            command = self._wait(running, lambda: utterance is None or utterance.done.is_set(),
+                                 started + SPEECH_TIMEOUT)
+            if command is None and utterance is not None and utterance.state == 'cancelled':
+                command = 'interrupted'  # Barge-in cut the step off
+            if command is None:
+                command = self._wait(running, deadline=started + step['hold'])
+            if command in ('pause', 'interrupted'):
+                session.state = 'paused'
+                self._notify('paused', session)
+                deadline = time.monotonic() + INTERRUPT_RESUME if command == 'interrupted' else None
+                accept = {'pause', 'resume', 'skip', 'stop'}
+                command = self._wait(accept, deadline=deadline) or 'resume'
+                while command == 'pause':  # "Sunday, pause" after a barge-in: hold until told to go on
+                    command = self._wait(accept)
+                session.state = 'running'
+                self._notify('resumed', session)
+                if command == 'resume':
+                    continue  # Say the step again from the start
+            if command == 'stop':
+                break
+            session.index += 1
+
+        session.finished_at = time.monotonic()
+        if command == 'stop':
+            session.state = 'cancelled'
+        else:
+            session.state = 'done'
+            phrases = session.script.get('complete') or COMPLETION_PHRASES
+            self.speak(random.choice(phrases).format(title=session.script['title']))
+        session.finished.set()
+        self._notify(session.state, session)
+
+    def _notify(self, event, session):
+        if self.listener:
+            try:
+                self.listener(event, session)
+            except Exception as e:
+                print(f"⚠ Session listener error: {e}")
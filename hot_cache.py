@@ -0,0 +1,194 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+import time
+
+from cache_policy import format_etag
+
+try:
+    import brotli  # Optional: brotli variants are only built when the package is installed
+except ImportError:
+    brotli = None
+
+HOT_EXTENSIONS = ('.html', '.css', '.js', '.mjs', '.json', '.svg', '.webmanifest')
+MAX_HOT_FILE_SIZE = 4 * 1024 * 1024  # Bigger files are streamed from disk as before
+MIN_COMPRESS_SIZE = 1024  # Tiny files are not worth a compressed copy
+REVALIDATE_INTERVAL = 1.0  # Seconds between mtime checks for the same file
+WARM_PATHS = ('index.html', 'assets')  # What the page loads on first view; anything else is cached on first request
+MAX_WARM_BYTES = 16 * 1024 * 1024  # Warming stops once this much source has been loaded
+
+class HotEntry:
+    def __init__(self, key, mtime, content_type, digest, variants):
+        self.key = key
+        self.mtime = mtime
+        self.content_type = content_type
+        self.digest = digest
+        self.variants = variants  # encoding -> bytes; 'identity' is always present
+        self.checked_at = time.monotonic()
+
+    def etag(self, encoding):
+        return format_etag(self.digest, '' if encoding == 'identity' else encoding)
+
+def choose_encoding(accept_encoding, available):
+    """Pick the best available content-coding for an Accept-Encoding header.
+
+    Honours q-values (q=0 means "not acceptable"); prefers br over gzip on ties
+    and falls back to identity when no compressed variant is acceptable.
+    """
+    if not accept_encoding:
+        return 'identity'
+    weights = {}
+    for part in accept_encoding.split(','):
+        fields = part.strip().split(';')
+        coding = fields[0].strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in fields[1:]:
+            name, _, value = param.strip().partition('=')
+            if name.strip() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[coding] = q
+
+    best, best_q = 'identity', 0.0
+    for coding in ('br', 'gzip'):
+        q = weights.get(coding, weights.get('*', 0.0))
+        if coding in available and q > best_q:
+            best, best_q = coding, q
+    return best
+
+class HotFileCache:
+    """In-memory copies of small text files plus their precompressed variants.
+
+    Entries are rebuilt only when the file's mtime or size changes, and the
+    file is stat'ed at most once per REVALIDATE_INTERVAL, so hits never touch
+    file contents on disk.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.rebuilds = 0
+        self.html_transform = None  # Optional bytes -> bytes hook applied to HTML on build
+
+    def set_html_transform(self, transform):
+        """Install a rewrite for HTML files (e.g. vendored asset URLs) and drop stale entries."""
+        with self._lock:
+            self.html_transform = transform
+            self._entries.clear()
+
+    @staticmethod
+    def is_hot(fs_path):
+        return fs_path.lower().endswith(HOT_EXTENSIONS)
+
+    def get(self, fs_path):
+        """Return the HotEntry for fs_path, or None if the file is missing or too large."""
+        with self._lock:
+            entry = self._entries.get(fs_path)
+        now = time.monotonic()
+        if entry and now - entry.checked_at < REVALIDATE_INTERVAL:
+            self._count_hit()
+            return entry
+
+        try:
+            st = os.stat(fs_path)
+        except OSError:
+            self._forget(fs_path)
+            return None
+        if st.st_size > MAX_HOT_FILE_SIZE:
+            self._forget(fs_path)
+            return None
+
+        key = (st.st_mtime_ns, st.st_size)
+        if entry and entry.key == key:
+            entry.checked_at = now
+            self._count_hit()
+            return entry
+
+        with self._lock:
+            self.misses += 1
+        return self._build(fs_path, key, st.st_mtime)
+
+    def _build(self, fs_path, key, mtime):
+        with open(fs_path, 'rb') as f:
+            data = f.read()
+        if self.html_transform and fs_path.lower().endswith('.html'):
+            data = self.html_transform(data)
+        variants = {'identity': data}
+        if len(data) >= MIN_COMPRESS_SIZE:
+            variants['gzip'] = gzip.compress(data, compresslevel=9, mtime=0)
+            if brotli is not None:
+                variants['br'] = brotli.compress(data, quality=11)
+        content_type = mimetypes.guess_type(fs_path)[0] or 'application/octet-stream'
+        if content_type.startswith('text/') or content_type in ('application/javascript', 'application/json'):
+            content_type += '; charset=utf-8'
+        entry = HotEntry(key, mtime, content_type, hashlib.sha1(data).hexdigest(), variants)
+        with self._lock:
+            self._entries[fs_path] = entry
+            self.rebuilds += 1
+        return entry
+
+    def _count_hit(self):
+        with self._lock:
+            self.hits += 1
+
+    def _forget(self, fs_path):
+        with self._lock:
+            self._entries.pop(fs_path, None)
+
+    def warm(self, root, paths=WARM_PATHS, max_bytes=MAX_WARM_BYTES):
+        """Load the hot files the page needs (paths under root) so the first page view is already a hit.
+
+        Only the given files and directories are walked, never the whole
+        tree, and warming stops after max_bytes of source.
+        """
+        count = loaded = 0
+        for path in self._warm_candidates(root, paths):
+            try:
+                st = os.stat(path)
+                if st.st_size > MAX_HOT_FILE_SIZE:
+                    continue
+                if loaded + st.st_size > max_bytes:
+                    break
+                self._build(path, (st.st_mtime_ns, st.st_size), st.st_mtime)
+            except OSError:
+                continue
+            loaded += st.st_size
+            count += 1
+        return count
+
+    def _warm_candidates(self, root, paths):
+        for relative in paths:
+            top = os.path.join(root, relative)
+            if os.path.isfile(top):
+                if self.is_hot(top):
+                    yield top
+                continue
+            for dirpath, dirnames, filenames in os.walk(top):
+                dirnames[:] = sorted(d for d in dirnames if not d.startswith('.') and d != '__pycache__')
+                for name in sorted(filenames):
+                    path = os.path.join(dirpath, name)
+                    if self.is_hot(path):
+                        yield path
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'rebuilds': self.rebuilds,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'bytes': sum(len(v) for e in self._entries.values() for v in e.variants.values()),
+                'brotli': brotli is not None,
+            }
+
+hot_cache = HotFileCache()
@@ -0,0 +1,135 @@
+import os
+import threading
+import urllib.parse
+
+from cache_policy import etag_cache, format_etag
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Without Pillow the original images are served unchanged
+    Image = None
+
+DERIVATIVE_DIR = '.derivatives'  # On-disk cache, relative to the served directory
+DERIVATIVE_PREFIXES = ('/assets/poses/',)
+
+# Longest edge in pixels; None keeps the source dimensions
+IMAGE_SIZES = {
+    'thumb': 320,
+    'medium': 720,
+    'full': None,
+}
+
+SOURCE_FORMATS = {'.jpg': 'jpeg', '.jpeg': 'jpeg', '.png': 'png', '.webp': 'webp'}
+FORMAT_CONTENT_TYPES = {'jpeg': 'image/jpeg', 'png': 'image/png', 'webp': 'image/webp'}
+FORMAT_EXTENSIONS = {'jpeg': '.jpg', 'png': '.png', 'webp': '.webp'}
+
+def select_variant(url_path, query, accept):
+    """Work out which rendition of a pose image the client wants.
+
+    Returns (size, fmt, varies_on_accept) for eligible images, or None when the
+    path is not under DERIVATIVE_PREFIXES or Pillow is unavailable. The size
+    comes from ?variant=thumb|medium|full; the format from ?format=webp|jpeg|png,
+    or WebP when the Accept header advertises it. fmt is None when the source
+    format should be kept, so ('full', None) means "serve the original".
+    """
+    if Image is None or not url_path.startswith(DERIVATIVE_PREFIXES):
+        return None
+    source_format = SOURCE_FORMATS.get(os.path.splitext(url_path)[1].lower())
+    if not source_format:
+        return None
+
+    params = urllib.parse.parse_qs(query)
+    size = params.get('variant', ['full'])[0]
+    if size not in IMAGE_SIZES:
+        size = 'full'
+
+    fmt = params.get('format', [None])[0]
+    if fmt in FORMAT_CONTENT_TYPES:
+        return size, (None if fmt == source_format else fmt), False
+    if 'image/webp' in (accept or '') and source_format != 'webp':
+        return size, 'webp', True
+    return size, None, True
+
+class DerivativeCache:
+    """Resized and re-encoded copies of source images, generated on first request.
+
+    Files are named after the source content hash, so editing a source image
+    produces new derivatives and stale ones are simply never looked up again.
+    """
+
+    def __init__(self):
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self._lock = threading.Lock()  # Counters are bumped from concurrent request threads
+        self.generated = 0
+        self.hits = 0
+        self.failures = 0
+
+    def _lock_for(self, key):
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get(self, fs_path, size, fmt, root):
+        """Return (path, etag, content_type) of a derivative, generating it if needed.
+
+        fmt None keeps the source format. Returns None if rendering fails, in
+        which case the caller should fall back to the original file.
+        """
+        fmt = fmt or SOURCE_FORMATS[os.path.splitext(fs_path)[1].lower()]
+        content_type = FORMAT_CONTENT_TYPES[fmt]
+        etag, _ = etag_cache.validators(fs_path)
+        digest = etag.strip('"')
+        name = f"{digest}-{size}{FORMAT_EXTENSIONS[fmt]}"
+        cache_dir = os.path.join(root, DERIVATIVE_DIR)
+        path = os.path.join(cache_dir, name)
+        variant_etag = format_etag(digest, f"{size}-{fmt}")
+
+        if os.path.exists(path):
+            self._count('hits')
+            return path, variant_etag, content_type
+
+        with self._lock_for(name):
+            if os.path.exists(path):  # Another request finished it while we waited
+                self._count('hits')
+                return path, variant_etag, content_type
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                self._render(fs_path, tmp_path, IMAGE_SIZES[size], fmt)
+                os.replace(tmp_path, path)
+            except Exception as e:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                self._count('failures')
+                print(f"[SERVER] Derivative failed for {fs_path} ({size}, {fmt}): {e}")
+                return None
+        self._count('generated')
+        return path, variant_etag, content_type
+
+    @staticmethod
+    def _render(src, dest, max_edge, fmt):
+        with Image.open(src) as im:
+            im = ImageOps.exif_transpose(im)
+            if max_edge and max(im.size) > max_edge:
+                im.thumbnail((max_edge, max_edge), Image.LANCZOS)
+            if fmt == 'webp':
+                im.save(dest, 'WEBP', quality=80, method=6)
+            elif fmt == 'jpeg':
+                im.convert('RGB').save(dest, 'JPEG', quality=82, optimize=True, progressive=True)
+            else:
+                im.save(dest, 'PNG', optimize=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'generated': self.generated,
+                'hits': self.hits,
+                'failures': self.failures,
+                'pillow': Image is not None,
+            }
+
+derivative_cache = DerivativeCache()
@@ -0,0 +1,202 @@
+"""Table-driven voice command matching.
+
+process_command used to apply two dozen str.replace() fixes in sequence and
+then walk an if/elif chain of substring tests. Substrings don't respect word
+boundaries: "ar" fired inside "warrior", "ai" inside "said", "hi" inside
+"this". The first branch in the chain won even when a later one fit the
+sentence better.
+
+Here every phrase is a sequence of whole words, compiled once into a token
+trie. A command is normalised with a single regex pass, then scanned once,
+leftmost-longest, against the trie. Each intent is scored by how many words
+its phrases covered:
+
+    intent trigger words + words of a matching slot (a section or a pose)
+
+so "describe the pose library" (describe 1 + section 2) beats plain
+navigation (section 2). Ties go to the intent listed first. best() scores
+every recognizer hypothesis (N-best) and discounts later ones by RANK_DECAY.
+
+Adding a command is one Intent(...) line here plus an _intent_<name> method
+on the assistant.
+"""
+import re
+
+RANK_DECAY = 0.8  # Weight of the n-th recognizer alternative is RANK_DECAY ** n
+
+# Common misrecognitions, applied as whole words in one pass (longest first)
+NORMALIZATIONS = {
+    "hassan": "asana",
+    "hasan": "asana",
+    "libra": "library",
+    "option": "asana",
+    "rout": "routine",
+    "assist": "assistant",
+    "santa": "sunday",
+    "sandesh": "sunday",
+    "vr collection": "ar correction",
+    "vr": "ar",
+    "virtual": "assistant",
+    "shut down": "stop",
+    "shutdown": "stop",
+    "go back to home": "home",
+    "activate sunday": "test",
+    "yoga poses": "asana",
+    "posture correction": "ar correction",
+    "camera mode": "ar correction",
+    "workout plan": "routine",
+    "exercise routine": "routine",
+    "help me": "assistant",
+    "talk to ai": "assistant",
+    "tadas": "tadasana",
+}
+
+# Slot values and the phrases that name them
+ENTITIES = {
+    'section': {
+        'dashboard': ['home', 'dashboard', 'main', 'home screen', 'main page'],
+        'pose_library': ['asana', 'asanas', 'pose library', 'library', 'poses', 'yoga pose', 'pose'],
+        'ar_correction': ['ar', 'ar correction', 'correction', 'camera', 'tracking', 'posture'],
+        'routine': ['routine', 'plan', 'workout', 'route', 'schedule', 'exercise'],
+        'assistant': ['assistant', 'chat', 'help', 'ai', 'question'],
+    },
+    # 'pose' values come from the guided-session scripts (pose_scripts.json); see main.py
+}
+
+class Intent:
+    """A command: trigger phrases, plus an optional slot kind from ENTITIES.
+
+    With standalone=True the slot phrase alone is enough ("pose library"
+    navigates); otherwise a trigger phrase is required. With required=True
+    the intent only matches when its slot is filled ("open" alone doesn't
+    say where to go).
+    """
+
+    def __init__(self, name, phrases=(), slot=None, standalone=False, required=False):
+        self.name = name
+        self.phrases = list(phrases)
+        self.slot = slot
+        self.standalone = standalone
+        self.required = required
+
+INTENTS = [
+    Intent('practice', ['practice', "let's do", 'lets do', "let's try"], slot='pose', standalone=True),
+    Intent('navigate', ['open', 'go to', 'take me to', 'show', 'show me', 'start', 'launch', 'switch to'],
+           slot='section', standalone=True, required=True),
+    Intent('describe', ['read', 'tell me about', "what's in", 'what is', 'describe', 'explain'], slot='section'),
+    Intent('guide', ['guide', 'guide me', 'teach', 'teach me', 'how to', 'demonstrate', 'instruct',
+                     'walk me through'], slot='pose'),
+    Intent('status', ['test', 'working', 'status', 'activate', 'you there']),
+    Intent('thanks', ['thank', 'thanks', 'thank you']),
+    Intent('greeting', ['hello', 'hi', 'hey']),
+    Intent('pause', ['pause', 'hold on', 'wait', 'pause session']),
+    Intent('resume', ['resume', 'continue', 'go on', 'carry on', "i'm ready"]),
+    Intent('skip', ['skip', 'next', 'next step', 'skip step', 'skip this']),
+    Intent('end_session', ['stop session', 'end session', 'stop guiding', 'stop the session', 'end the session',
+                           "that's enough"]),
+    Intent('stop', ['stop', 'quit', 'exit', 'goodbye', 'bye']),
+]
+
+_WORD = re.compile(r"[a-z0-9']+")
+
+def tokenize(text):
+    return _WORD.findall(text.lower())
+
+class IntentMatch:
+    def __init__(self, intent, value, score, text, rank=0):
+        self.intent = intent
+        self.value = value  # Slot value ('routine', 'tadasana', ...) or None
+        self.score = score
+        self.text = text  # The normalised hypothesis that matched
+        self.rank = rank  # Index of that hypothesis in the recognizer's N-best list
+
+    def __repr__(self):
+        return f"IntentMatch({self.intent!r}, {self.value!r}, score={self.score:g}, rank={self.rank})"
+
+class IntentMatcher:
+    def __init__(self, intents=INTENTS, entities=ENTITIES, normalizations=NORMALIZATIONS):
+        self.intents = list(intents)
+        self.normalizations = dict(normalizations)
+        keys = sorted(self.normalizations, key=len, reverse=True)
+        self._normalize_re = re.compile(r"\b(?:" + "|".join(map(re.escape, keys)) + r")\b") if keys else None
+        # Token trie; a node's None key holds the labels of the phrase ending there
+        self._trie = {}
+        for order, intent in enumerate(self.intents):
+            for phrase in intent.phrases:
+                self._add(phrase, ('intent', order))
+        for kind, values in entities.items():
+            for value, phrases in values.items():
+                for phrase in phrases:
+                    self._add(phrase, (kind, value))
+
+    def _add(self, phrase, label):
+        node = self._trie
+        for token in tokenize(phrase):
+            node = node.setdefault(token, {})
+        node.setdefault(None, []).append(label)
+
+    def normalize(self, text):
+        text = " ".join(tokenize(text))
+        if self._normalize_re is None:
+            return text
+        return self._normalize_re.sub(lambda m: self.normalizations[m.group(0)], text)
+
+    def scan(self, text):
+        """Leftmost-longest phrase matches in normalised text as (labels, word count)."""
+        tokens = text.split()
+        matches = []
+        i = 0
+        while i < len(tokens):
+            node, longest = self._trie, None
+            for j in range(i, len(tokens)):
+                node = node.get(tokens[j])
+                if node is None:
+                    break
+                if None in node:
+                    longest = (node[None], j + 1)
+            if longest:
+                matches.append((longest[0], longest[1] - i))
+                i = longest[1]
+            else:
+                i += 1
+        return matches
+
+    def match(self, text, rank=0):
+        """Best IntentMatch for one hypothesis, or None if no intent applies."""
+        normalized = self.normalize(text)
+        triggers = [0] * len(self.intents)
+        slots = {}  # kind -> {value: words}
+        for labels, words in self.scan(normalized):
+            for kind, key in labels:
+                if kind == 'intent':
+                    triggers[key] += words
+                else:
+                    values = slots.setdefault(kind, {})
+                    values[key] = values.get(key, 0) + words
+
+        best = None
+        for order, intent in enumerate(self.intents):
+            values = slots.get(intent.slot, {}) if intent.slot else {}
+            value = max(values, key=values.get) if values else None  # First-matched value wins ties
+            if not triggers[order] and not (intent.standalone and value):
+                continue
+            if intent.required and not value:
+                continue
+            score = triggers[order] + (values[value] if value else 0)
+            if best is None or score > best.score:
+                best = IntentMatch(intent.name, value, score, normalized, rank)
+        return best
+
+    def best(self, hypotheses):
+        """Best match across N-best hypotheses (most likely first); None if nothing matched."""
+        best = None
+        for rank, text in enumerate(hypotheses):
+            if not text:
+                continue
+            found = self.match(text, rank)
+            if found is None:
+                continue
+            found.score *= RANK_DECAY ** rank
+            if best is None or found.score > best.score:
+                best = found
+        return best
@@ -1,68 +1,243 @@
 import threading
 import time
+import collections
 import os
 import sys
-from http.server import SimpleHTTPRequestHandler
-import socketserver
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+import webbrowser
+try:
+    from selenium import webdriver
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.common.exceptions import TimeoutException
+except ImportError:  # Selenium is only a fallback now (see BROWSER_MODE)
+    webdriver = None
 import speech_recognition as sr
 import pyttsx3
-import json
 import random
 import subprocess
+from server import make_server
+from startup import Startup, wait_for_port
+from status_bus import status_bus
+from page_control import page_control
+from metrics import metrics
+from conversation_log import ConversationLogger
+from tts_worker import TTSWorker, URGENT, NORMAL
+from phrase_cache import PhraseCache
+from audio_capture import MicrophoneStream
+from wake_word import WakeWordDetector
+import wake_word
+from recognizers import RecognitionPipeline, GoogleBackend, OfflineBackend
+from intents import IntentMatcher, ENTITIES, tokenize
+from guided_session import SessionRunner, load_scripts, SCRIPTS_FILE
+import numpy as np
 
 # Set to your ChromeDriver path if not in PATH; '' if in PATH
 CHROMEDRIVER_PATH = ''  # e.g., r'E:\INFOTHON 2\Hack\chromedriver\chromedriver.exe'
 
 PORT = 5000
 SERVER_URL = f"http://127.0.0.1:{PORT}"
-
-class MyHTTPRequestHandler(SimpleHTTPRequestHandler):
-    def end_headers(self):
-        self.send_header('Cache-Control', 'no-cache, no-store, must-revalidate')
-        self.send_header('Pragma', 'no-cache')
-        self.send_header('Expires', '0')
-        super().end_headers()
-
-    def log_message(self, format, *args):
-        print(f"[SERVER] {self.address_string()} - {format % args}")
-
-class ReusableTCPServer(socketserver.TCPServer):
-    allow_reuse_address = True
+# Status is pushed to the page over /api/status/stream; this file is only a
+# snapshot for external tools. Set to None to skip writing it.
+STATUS_SNAPSHOT_FILE = "sunday_status.json"
+CONVERSATION_LOG_FORMAT = "text"  # or "jsonl" for one JSON object per line
+SPEECH_TIMEOUT = 30  # Longest we wait for one utterance to finish playing
+WAKE_WORD_MODEL = wake_word.DEFAULT_MODEL  # Trained with `python wake_word.py train`; absent = no local filter
+RECOGNIZER_BACKENDS = ("google", "offline")  # Tried in order; "offline" is skipped unless its engine is installed
+OFFLINE_ENGINE = "sphinx"  # sphinx (pocketsphinx), vosk or whisper
+COMMAND_WINDOW = 15  # Seconds after a possible wake word during which phrases skip the local filter
+COMMAND_TIMEOUT = 10  # Seconds to wait for a command after the wake word
+ECHO_WINDOW = 15  # Seconds Sunday's own phrases are remembered for echo checks
+ECHO_OVERLAP = 0.8  # Heard-over-playback text is echo when this share of its words came from her phrase
+WAKE_FILLERS = ("please", "um", "uh", "can you", "could you")  # Leading words that don't make a command on their own
+# "push": open the page in the default browser and steer it over /api/control/stream (page_control.py).
+# "selenium": launch Chrome under WebDriver as before. In push mode Selenium is still the fallback
+# when no page connects.
+BROWSER_MODE = "push"
+PAGE_CONNECT_TIMEOUT = 10  # Seconds to wait for the opened page to subscribe to the control channel
+NAVIGATION_TIMEOUT = 3  # Seconds to wait for the page to report a view as rendered
+PAGE_READY_TIMEOUT = 15  # Seconds to wait for index.html's app to initialise after loading
+CALIBRATION_SECONDS = 1.0  # Ambient noise sampled to calibrate the microphone
+TTS_READY_TIMEOUT = 10  # Seconds to wait for the TTS engine to initialise
+SERVER_READY_TIMEOUT = 10  # Seconds to wait for the web server to accept connections
+CONTINUOUS_CAPTURE = True  # Keep one mic stream open (audio_capture.py); False reopens sr.Microphone per listen
+
+ACKNOWLEDGEMENTS = [
+    "Sure thing!",
+    "I'm on it!",
+    "Right away!",
+    "Absolutely!",
+    "Got it!",
+    "Okay, let's do that!",
+    "I'll take care of that!",
+    "No problem!",
+    "You got it!"
+]
+
+WAKE_RESPONSES = [
+    "Yes, I'm listening! What would you like to do?",
+    "I'm here! How can I assist your practice?",
+    "Hello! What shall we work on together?",
+    "Yes, tell me how I can help!"
+]
+
+# Guided sessions are data: steps, holds, intro and the phrases that name each pose (guided_session.py)
+POSE_SCRIPTS = load_scripts(os.path.join(os.path.dirname(os.path.abspath(__file__)), SCRIPTS_FILE))
+
+# Assistant section -> the page's view key (app.views in index.html)
+SECTION_VIEWS = {
+    'dashboard': 'dashboard',
+    'pose_library': 'asana',
+    'asana': 'asana',
+    'ar_correction': 'ar_correction',
+    'assistant': 'assistant',
+    'routine': 'routine',
+}
+
+# Resolves with the view key once app.navigate() has rendered and painted it
+NAVIGATE_SCRIPT = """
+const view = arguments[0], done = arguments[arguments.length - 1];
+if (!(window.app && window.app.navigate)) { done('no_app'); return; }
+Promise.resolve(window.app.navigate(view)).then(() => done('ready'), e => done('error: ' + e.message));
+"""
+
+# Section -> (spoken after navigating, spoken if navigation failed)
+SECTION_REPLIES = {
+    'dashboard': ("Taking you to the home screen where you can see your progress and daily insights.",
+                  "I'm having trouble navigating to the home screen. Let me try another way."),
+    'pose_library': ("Opening our yoga pose library. You'll find detailed instructions for Tadasana, Downward Dog, Warrior poses, and many more!",
+                     "Let me try to open the pose library another way. Sometimes the connection needs a moment."),
+    'ar_correction': ("Starting the AR posture correction. Make sure you're standing about 6 feet from your camera for the best tracking!",
+                      "I'm setting up the camera correction feature. This might take just a moment."),
+    'routine': ("Opening your personalized routine. I'll show you today's recommended yoga sequence and meal suggestions based on your wellness data.",
+                "Let me load your personalized routine. I'm checking your latest activity and stress levels to give you the best recommendations."),
+    'assistant': ("I'm here to help! Ask me anything about yoga poses, meditation techniques, or request a custom session. What would you like to know?",
+                  "I'm opening the chat interface where we can talk about anything related to yoga and wellness."),
+}
+
+SECTION_DESCRIPTIONS = {
+    'dashboard': "Your dashboard shows your daily progress including posture score, current streak, and calories burned. It's your wellness snapshot!",
+    'pose_library': "The pose library has detailed information about Tadasana for beginners, Downward Dog for intermediates, and Warrior Three for advanced practice. Each pose includes benefits and precautions.",
+    'routine': "Your routine section provides personalized yoga sequences and meal suggestions based on your sleep quality and stress levels from your wearable device.",
+    'assistant': "This is where you can chat with me! I can answer yoga questions, create custom sessions, or explain meditation techniques in detail.",
+    'ar_correction': "The AR correction uses your camera and AI to give real-time feedback on your yoga poses. It checks your alignment and helps you improve your form instantly.",
+}
+
+# Pre-rendered at startup; other fixed prompts are added to the cache the first time they are spoken
+STATIC_PHRASES = ACKNOWLEDGEMENTS + WAKE_RESPONSES + [
+    step['say'] for script in POSE_SCRIPTS.values() for step in script['steps']]
+
+# Pose names come from the scripts, so a new script is recognised without code changes
+intent_matcher = IntentMatcher(entities=dict(ENTITIES, pose={
+    name: script['phrases'] for name, script in POSE_SCRIPTS.items()}))
+
+def command_after_wake_word(text, wake_word):
+    """What follows the wake word in the same phrase ("sunday, open pose library" -> "open pose library").
+
+    Returns None when nothing but punctuation or filler words follow, so the
+    caller asks for the command separately.
+    """
+    position = text.find(wake_word)
+    if position < 0:
+        return None
+    rest = text[position + len(wake_word):].strip(" ,.!?")
+    stripped = True
+    while stripped:
+        stripped = False
+        for filler in WAKE_FILLERS:
+            if rest == filler or rest.startswith(filler + " "):
+                rest = rest[len(filler):].strip(" ,.!?")
+                stripped = True
+    return rest or None
 
 class AIVoiceAssistant:
-    def __init__(self):
-        self.status_file = "sunday_status.json"
-        self.conv_log_file = "conversation_log.txt"
+    def __init__(self, startup=None):
+        self.status_file = STATUS_SNAPSHOT_FILE
+        if self.status_file:
+            status_bus.enable_snapshot(self.status_file)
+        self.conv_log_file = "conversation_log.jsonl" if CONVERSATION_LOG_FORMAT == 'jsonl' else "conversation_log.txt"
+        self.conv_log = ConversationLogger(self.conv_log_file, fmt=CONVERSATION_LOG_FORMAT)
         self.listening = True
         self.wake_word = "sunday"
         self.consecutive_failures = 0
         self.max_failures = 5
+        self.capture = None  # Continuous MicrophoneStream, started by the microphone stage
+        self.microphone = None
+        self.recalibrate_requested = False
+        self.phrase_during_playback = False  # Whether the last captured phrase began while Sunday was talking
+        self.recent_speech = collections.deque(maxlen=16)  # (monotonic time, word set) of phrases she spoke
+        self.wake_detector = None
+        # Seconds from the end of the wake phrase to dispatching its command, per path
+        self.command_latency = {'one-shot': collections.deque(maxlen=100), 'two-step': collections.deque(maxlen=100)}
+        self.navigation_latency = collections.deque(maxlen=100)  # Seconds from request to the view being painted
         
-        # Simple TTS solution from under_ai.py
+        # Simple TTS solution from under_ai.py; the engine itself initialises on the worker thread
+        self.sessions = SessionRunner(self.speak, listener=self._on_session_event)
         self.setup_tts()
         
         self.log_conversation("System", "Sunday AI starting with simple TTS system")
 
         # Initialize speech recognition from under_ai.py
         self.recognizer = sr.Recognizer()
-        self.microphone = sr.Microphone()
-        
         # Optimized settings for better voice recognition from under_ai.py
         self.recognizer.energy_threshold = 3000
         self.recognizer.pause_threshold = 1.0
         self.recognizer.dynamic_energy_threshold = True
-        
+        self.recognition = RecognitionPipeline(self._make_recognizer_backends())
+
+        # Browser setup from under_ai.py style (Selenium fallback only)
+        self.chrome_options = Options() if webdriver else None
+        if self.chrome_options:
+            self._configure_chrome_options()
+        self.driver = None
+
+        # Everything slow starts concurrently; listening waits only for what it needs
+        self.startup = startup or Startup()
+        self.startup.stage('tts', lambda: self.tts.ready.wait(TTS_READY_TIMEOUT))
+        self.startup.stage('wake_word', self._load_wake_word_model)
+        self.startup.stage('microphone', self._start_microphone)
+        self.startup.stage('browser', self.open_browser,
+                           after=['server'] if 'server' in self.startup.stages else (), required=False)
+        self.startup.stage('listening', self._start_listening, after=['tts', 'wake_word', 'microphone'])
+
+        # Per-stage latency histograms, served at /metrics and summarised in the log
+        metrics.measure_overhead()
+        metrics.start_summary(lambda text: self.log_conversation("System", text))
+
+    def _load_wake_word_model(self):
+        # Local wake-word pre-filter: audio that doesn't sound like "Sunday" never leaves the machine
+        if os.path.exists(WAKE_WORD_MODEL):
+            self.wake_detector = WakeWordDetector.load(WAKE_WORD_MODEL)
+            self.log_conversation("System", f"Wake-word pre-filter loaded from {WAKE_WORD_MODEL}")
+
+    def _start_microphone(self):
+        if CONTINUOUS_CAPTURE:
+            capture = None
+            try:
+                capture = MicrophoneStream(pause_threshold=1.0, max_phrase=15)
+                capture.start()
+                # Ready once there is enough ambient audio in the ring to set the noise floor
+                if not capture.ring.wait_for(int(CALIBRATION_SECONDS * capture.sample_rate), timeout=5):
+                    raise RuntimeError("no audio from the input device")
+                self.capture = capture
+                self.log_conversation("System", "Continuous microphone capture started")
+            except Exception as e:
+                self.log_conversation("System", f"Continuous capture unavailable ({e}), listening per phrase")
+                if capture:
+                    capture.stop()
+        if self.capture is None:
+            self.microphone = sr.Microphone()
         # Calibrate microphone from under_ai.py
         self.calibrate_microphone()
 
-        # Browser setup from under_ai.py style
-        self.chrome_options = Options()
+    def _start_listening(self):
+        listen_thread = threading.Thread(target=self.listen_loop, daemon=True)
+        listen_thread.start()
+
+        self.write_status('ready', '', '')
+        self.speak("Hello! I'm Sunday, your yoga assistant. I'm here and ready to help you with your wellness journey. Just say 'Sunday' followed by what you'd like to do!")
+
+    def _configure_chrome_options(self):
         self.chrome_options.add_argument("--use-fake-ui-for-media-stream")
         self.chrome_options.add_argument("--disable-web-security")
         self.chrome_options.add_argument("--no-sandbox")
@@ -70,69 +245,52 @@ class AIVoiceAssistant:
         self.chrome_options.add_argument("--autoplay-policy=no-user-gesture-required")
         self.chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
         self.chrome_options.add_argument("--window-size=1200,800")
-        
-        self.driver = None
-
-        # Start browser from under_ai.py style, but keep server
-        browser_thread = threading.Thread(target=self.open_browser, daemon=True)
-        browser_thread.start()
-
-        # Start listening
-        time.sleep(3)
-        listen_thread = threading.Thread(target=self.listen_loop, daemon=True)
-        listen_thread.start()
-
-        self.write_status('ready', '', '')
-        self.speak("Hello! I'm Sunday, your yoga assistant. I'm here and ready to help you with your wellness journey. Just say 'Sunday' followed by what you'd like to do!")
 
     def setup_tts(self):
-        """Simple TTS setup that just works from under_ai.py"""
+        """Start the TTS worker; it creates the engine once and owns it for the whole session"""
+        self.phrase_cache = PhraseCache(settings={'rate': 150, 'volume': 1.0})
+        self.tts = TTSWorker(self._create_tts_engine, fallback=self._system_tts, listener=self._on_tts_event,
+                             phrase_cache=self.phrase_cache)
+        self.tts.warm(STATIC_PHRASES)
+
+    def _create_tts_engine(self):
+        """Runs on the TTS worker thread; None makes every utterance use _system_tts"""
         try:
-            # Test if we can use pyttsx3
-            self.tts_engine = pyttsx3.init()
-            self.tts_engine.setProperty('rate', 150)
-            self.tts_engine.setProperty('volume', 1.0)
+            engine = pyttsx3.init()
+            engine.setProperty('rate', 150)
+            engine.setProperty('volume', 1.0)
+            self.phrase_cache.set_settings({'rate': 150, 'volume': 1.0, 'voice': engine.getProperty('voice')})
             self.log_conversation("System", "TTS engine configured successfully")
+            return engine
         except Exception as e:
             self.log_conversation("System", f"TTS setup error: {e}")
-            self.tts_engine = None
+            return None
 
-    def speak(self, text):
-        """Simple speaking function that always works from under_ai.py"""
+    def _on_tts_event(self, event, utterance):
+        if event != 'started':
+            self.sessions.notify()
+        if event == 'done' and utterance.first_audio_at:
+            metrics.observe('speak', utterance.first_audio_at - utterance.queued_at)
+        if event == 'started':
+            self.recent_speech.append((time.monotonic(), set(tokenize(utterance.text))))
+            self.write_status('speaking', '', utterance.text)
+        if self.capture:
+            self.capture.set_playback(event == 'started')
+
+    def speak(self, text, priority=NORMAL):
+        """Queue text on the TTS worker; returns an Utterance to wait on, or None if not speaking"""
         if not text or not self.listening:
-            return False
-            
+            return None
+
         self.log_conversation("AI", text)
-        self.write_status('speaking', '', text)
-        
-        try:
-            # Method 1: Try pyttsx3 first
-            if self.tts_engine:
-                def speak_thread():
-                    try:
-                        # Create a new engine for each speech to avoid conflicts
-                        engine = pyttsx3.init()
-                        engine.setProperty('rate', 150)
-                        engine.setProperty('volume', 1.0)
-                        engine.say(text)
-                        engine.runAndWait()
-                    except Exception as e:
-                        print(f"TTS Error: {e}")
-                        self._system_tts(text)
-                
-                # Run in thread to avoid blocking
-                thread = threading.Thread(target=speak_thread, daemon=True)
-                thread.start()
-                return True
-            else:
-                # Method 2: Use system TTS
-                return self._system_tts(text)
-                
-        except Exception as e:
-            self.log_conversation("System", f"Speak error: {e}")
-            # Method 3: Ultimate fallback
-            print(f"🔊 AI: {text}")
-            return False
+        return self.tts.say(text, priority)
+
+    def speak_and_wait(self, text, timeout=SPEECH_TIMEOUT, priority=NORMAL):
+        """Speak and block until the speech has actually finished"""
+        utterance = self.speak(text, priority)
+        if utterance:
+            utterance.wait(timeout)
+        return utterance
 
     def _system_tts(self, text):
         """System-level TTS that always works from under_ai.py"""
@@ -157,58 +315,59 @@ class AIVoiceAssistant:
 
     def calibrate_microphone(self):
         """Calibrate microphone with better settings from under_ai.py"""
+        if self.capture:
+            # The capture noise floor adapts continuously; this just snaps it to the latest ambient audio
+            self.capture.recalibrate(CALIBRATION_SECONDS)
+            self.consecutive_failures = 0
+            return
         try:
             self.log_conversation("System", "Calibrating microphone... Please wait.")
             with self.microphone as source:
-                self.recognizer.adjust_for_ambient_noise(source, duration=3)
+                self.recognizer.adjust_for_ambient_noise(source, duration=CALIBRATION_SECONDS)
             self.log_conversation("System", "Microphone calibrated successfully")
             self.consecutive_failures = 0
         except Exception as e:
             self.log_conversation("System", f"Microphone calibration failed: {e}")
 
     def log_conversation(self, speaker, message):
-        timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
-        log_entry = f"[{timestamp}] {speaker}: {message}\n"
-        with open(self.conv_log_file, 'a', encoding='utf-8') as f:
-            f.write(log_entry)
-        print(log_entry.strip())
+        self.conv_log.log(speaker, message)
 
     def write_status(self, action, user_command='', ai_response=''):
-        try:
-            data = {
-                'action': action,
-                'timestamp': time.time(),
-                'user_command': user_command,
-                'ai_response': ai_response
-            }
-            with open(self.status_file, 'w') as f:
-                json.dump(data, f)
-        except Exception as e:
-            self.log_conversation("System", f"Status write error: {e}")
+        status_bus.publish(action, user_command=user_command, ai_response=ai_response)
 
     def get_acknowledgement(self):
         """Get random acknowledgement phrases from under_ai.py"""
-        acknowledgements = [
-            "Sure thing!",
-            "I'm on it!",
-            "Right away!",
-            "Absolutely!",
-            "Got it!",
-            "Okay, let's do that!",
-            "I'll take care of that!",
-            "No problem!",
-            "You got it!"
-        ]
-        return random.choice(acknowledgements)
+        return random.choice(ACKNOWLEDGEMENTS)
 
     def open_browser(self):
-        """Open browser with extended wait times and better error handling from under_ai.py"""
+        """Get a page connected: an already-open tab, the default browser, or Chrome under Selenium.
+
+        Returns False when no page could be attached, so the startup report shows the stage as not ready.
+        """
+        if BROWSER_MODE == "push":
+            if not page_control.connected():
+                webbrowser.open(SERVER_URL)
+            if page_control.wait_for_page(PAGE_CONNECT_TIMEOUT):
+                self.log_conversation("System", "Page connected to the control channel")
+                self.speak("Perfect! I'm all connected and ready to help you with your yoga practice.")
+                return True
+            self.log_conversation("System", f"No page connected within {PAGE_CONNECT_TIMEOUT}s")
+            if webdriver is None:
+                self.speak(f"Please open {SERVER_URL} in your browser so I can move around the app for you.")
+                return False
+        elif webdriver is None:
+            self.speak("Selenium is not installed, so I can't open the browser. Please open the app yourself.")
+            return False
+        return self.open_selenium_browser()
+
+    def open_selenium_browser(self):
+        """Open browser with extended wait times and better error handling from under_ai.py; True once the app is up"""
         max_retries = 3
         for attempt in range(max_retries):
             try:
                 if not os.path.exists("index.html"):
                     self.speak("I can't find the main application file. Please make sure index.html is in the same folder.")
-                    return
+                    return False
 
                 if CHROMEDRIVER_PATH:
                     from selenium.webdriver.chrome.service import Service
@@ -218,17 +377,15 @@ class AIVoiceAssistant:
                     self.driver = webdriver.Chrome(options=self.chrome_options)
                 self.driver.get(SERVER_URL)
                 
-                # Extended wait for page to load
-                WebDriverWait(self.driver, 15).until(
-                    EC.presence_of_element_located((By.TAG_NAME, "body"))
+                # Wait until the app has rendered its first view rather than a fixed delay
+                WebDriverWait(self.driver, PAGE_READY_TIMEOUT).until(
+                    lambda d: d.execute_script("return !!(window.app && document.body.dataset.view)")
                 )
-                
-                # Additional wait for JavaScript to initialize
-                time.sleep(4)
+                self.driver.set_script_timeout(NAVIGATION_TIMEOUT)
                 
                 self.log_conversation("System", f"Browser ready on attempt {attempt + 1}")
                 self.speak("Perfect! I'm all connected and ready to help you with your yoga practice.")
-                return
+                return True
                 
             except Exception as e:
                 self.log_conversation("System", f"Browser error attempt {attempt + 1}: {e}")
@@ -237,11 +394,15 @@ class AIVoiceAssistant:
                     continue
                 else:
                     self.speak("I'm having trouble connecting to the browser. Please check if Chrome is installed properly.")
+        return False
 
     def listen_for_speech(self, timeout=8, phrase_time_limit=10):
         """Listen for speech with better parameters from under_ai.py"""
+        self.phrase_during_playback = False
+        if self.capture:
+            return self._next_captured_phrase(timeout)
         try:
-            with self.microphone as source:
+            with self.microphone as source, metrics.timer('listen'):
                 self.recognizer.adjust_for_ambient_noise(source, duration=0.5)
                 audio = self.recognizer.listen(source, timeout=timeout, phrase_time_limit=phrase_time_limit)
             return audio
@@ -251,78 +412,144 @@ class AIVoiceAssistant:
             self.log_conversation("System", f"Listen error: {e}")
             return None
 
+    def _next_captured_phrase(self, timeout):
+        """Next buffered utterance as AudioData; phrase_during_playback says if it began over Sunday's voice"""
+        segment = self.capture.next_utterance(timeout=timeout)
+        if segment is None:
+            return None
+        metrics.observe('capture', time.monotonic() - segment.end_time)  # Endpointing delay
+        self.phrase_during_playback = segment.during_playback
+        return sr.AudioData(segment.pcm, segment.sample_rate, 2)
+
+    def is_echo(self, text):
+        """True when recognised text is mostly words Sunday herself said in the last ECHO_WINDOW seconds"""
+        words = tokenize(text)
+        if not words:
+            return False
+        cutoff = time.monotonic() - ECHO_WINDOW
+        for spoken_at, spoken in list(self.recent_speech):
+            if spoken_at >= cutoff and sum(w in spoken for w in words) >= ECHO_OVERLAP * len(words):
+                return True
+        return False
+
+    def might_be_wake_word(self, audio):
+        """Local wake-word check before cloud recognition; always True without a trained model"""
+        if not self.wake_detector:
+            return True
+        raw = audio.get_raw_data(convert_rate=wake_word.SAMPLE_RATE, convert_width=2)
+        return self.wake_detector.detect(np.frombuffer(raw, dtype=np.int16))
+
+    def _make_recognizer_backends(self):
+        backends = []
+        for name in RECOGNIZER_BACKENDS:
+            if name == "google":
+                backends.append(GoogleBackend(self.recognizer, language="en-US"))
+            elif name == "offline":
+                if OfflineBackend.available(OFFLINE_ENGINE):
+                    backends.append(OfflineBackend(self.recognizer, OFFLINE_ENGINE))
+                else:
+                    self.log_conversation("System", f"Offline recognizer '{OFFLINE_ENGINE}' not installed, skipping")
+        return backends
+
     def recognize_audio(self, audio):
-        """Convert audio to text with better error handling from under_ai.py"""
+        """Convert audio to text now, on the calling thread, through the recognizer backends"""
         if not audio:
             return None
-            
-        try:
-            text = self.recognizer.recognize_google(audio, language="en-US").lower().strip()
-            if len(text) > 1:
-                self.log_conversation("System", f"Recognized: {text}")
-                return text
-            return None
-        except sr.UnknownValueError:
-            self.consecutive_failures += 1
+        return self._recognized_text(self.recognition.recognize(audio))
+
+    def _recognized_text(self, result):
+        """Log a Recognition and return its text, or None if nothing usable was heard"""
+        for error in result.errors:
+            self.log_conversation("System", f"Speech recognition error: {error}")
+        metrics.observe('recognize', result.latency)
+        if result.text and len(result.text) > 1:
+            self.log_conversation("System", f"Recognized: {result.text} ({result.backend}, {result.latency * 1000:.0f} ms)")
+            return result.text
+        self.consecutive_failures += 1
+        if not result.failed:
             self.log_conversation("System", "Speech recognition could not understand audio")
-            return None
-        except sr.RequestError as e:
-            self.consecutive_failures += 1
-            self.log_conversation("System", f"Speech recognition error: {e}")
-            # Add a small delay on RequestError to avoid rapid retries
-            time.sleep(1)
-            return None
-        except Exception as e:
-            self.log_conversation("System", f"Recognition error: {e}")
-            return None
+        return None
+
+    def _feed_recognizer(self):
+        """Capture side of the listen loop: submit each phrase for recognition as soon as it ends"""
+        command_window_until = 0
+        while self.listening:
+            if self.recalibrate_requested:
+                self.recalibrate_requested = False
+                self.calibrate_microphone()
+            audio = self.listen_for_speech(timeout=5, phrase_time_limit=15)
+            if not audio:
+                continue
+            now = time.monotonic()
+            if now < command_window_until or self.might_be_wake_word(audio):
+                # A possible wake word lets the command that follows it through without the local check
+                command_window_until = now + COMMAND_WINDOW
+                self.recognition.submit(audio, context=self.phrase_during_playback)
 
     def navigate_section(self, section):
-        """Navigate to section using multiple methods with better feedback from under_ai.py"""
+        """Navigate to section and wait until the page reports it rendered (bounded by NAVIGATION_TIMEOUT)"""
+        view = SECTION_VIEWS.get(section, section)
+        started = time.monotonic()
+        ack = page_control.send('navigate', timeout=NAVIGATION_TIMEOUT, view=view)
+        if ack and ack.get('ok'):
+            self._record_navigation(section, 'push', time.monotonic() - started)
+            return True
+        if ack:
+            self.log_conversation("System", f"Page could not navigate to {section}: {ack.get('error')}")
         if not self.driver:
             self.log_conversation("System", "No browser for navigation")
             return False
-            
+
+        started = time.monotonic()
         try:
-            # Method 1: Direct JavaScript navigation
-            result = self.driver.execute_script(f"""
-                try {{
-                    // Try multiple ways to access the app
-                    if (window.app && window.app.navigate) {{
-                        window.app.navigate('{section}');
-                        return 'success_app_navigate';
-                    }}
-                    if (window.navigate) {{
-                        window.navigate('{section}');
-                        return 'success_window_navigate';
-                    }}
-                    // Try to find and click the navigation button
-                    const buttons = document.querySelectorAll('button, [onclick*="{section}"]');
-                    for (let btn of buttons) {{
-                        if (btn.textContent.toLowerCase().includes('{section}') || 
-                            (btn.onclick && btn.onclick.toString().includes('{section}'))) {{
-                            btn.click();
-                            return 'success_button_click';
-                        }}
-                    }}
-                    return 'no_navigation_method_found';
-                }} catch(e) {{
-                    return 'error: ' + e.message;
-                }}
-            """)
-            
-            self.log_conversation("System", f"Navigation to {section}: {result}")
-            
-            if any(success in str(result) for success in ['success', 'click']):
-                time.sleep(2)
-                return True
-                
-            # Method 2: Try clicking nav buttons directly
-            return self.click_nav_button(section)
-            
+            # Method 1: app.navigate() returns a promise that resolves once the view is painted
+            result = self.driver.execute_async_script(NAVIGATE_SCRIPT, view)
+            method = 'app.navigate'
+            if result != 'ready':
+                self.log_conversation("System", f"Navigation to {section}: {result}")
+                # Method 2: Try clicking nav buttons directly
+                method = 'button'
+                if not self.click_nav_button(section):
+                    return False
+        except TimeoutException:
+            self.log_conversation("System", f"Navigation to {section}: page did not confirm within {NAVIGATION_TIMEOUT}s")
+            return False
         except Exception as e:
             self.log_conversation("System", f"Navigation failed: {e}")
             return False
 
+        self._record_navigation(section, method, time.monotonic() - started)
+        return True
+
+    def _record_navigation(self, section, method, elapsed):
+        metrics.observe('navigate', elapsed)
+        self.navigation_latency.append(elapsed)
+        average = sum(self.navigation_latency) / len(self.navigation_latency)
+        self.log_conversation("System", f"Navigation to {section} ready in {elapsed * 1000:.0f} ms via {method} "
+                                        f"[{average * 1000:.0f} ms avg over {len(self.navigation_latency)}]")
+
+    def select_pose(self, pose_name):
+        """Open the AR correction view on a pose (control channel only); True once the page confirms"""
+        page_pose = POSE_SCRIPTS[pose_name].get('page_pose')
+        if not page_pose:
+            return False
+        ack = page_control.send('select_pose', timeout=NAVIGATION_TIMEOUT, pose=page_pose)
+        if not (ack and ack.get('ok')):
+            return False
+        self.log_conversation("System", f"Page selected {pose_name} in {ack.get('ms', 0)} ms")
+        return True
+
+    def _wait_for_view(self, view):
+        """Block until the page's current view is `view`; False after NAVIGATION_TIMEOUT"""
+        try:
+            WebDriverWait(self.driver, NAVIGATION_TIMEOUT, poll_frequency=0.05).until(
+                lambda d: d.execute_script("return document.body.dataset.view") == view
+            )
+            return True
+        except TimeoutException:
+            self.log_conversation("System", f"View {view} not shown within {NAVIGATION_TIMEOUT}s")
+            return False
+
     def click_nav_button(self, section):
         """Click navigation button directly with better matching from under_ai.py"""
         try:
@@ -334,15 +561,7 @@ class AIVoiceAssistant:
                 'ar_correction': ['ar', 'correction', 'tracking', 'camera', 'posture'],
                 'assistant': ['assistant', 'chat', 'help', 'ai', 'virtual assistant']
             }
-            # Adjust for main.py sections
-            if section == 'pose_library':
-                section = 'asana'
-            elif section == 'ar_correction':
-                section = 'ar_correction'
-            elif section == 'routine':
-                section = 'routine'
-            elif section == 'assistant':
-                section = 'assistant'
+            section = SECTION_VIEWS.get(section, section)
             
             if section not in button_text_map:
                 return False
@@ -355,21 +574,19 @@ class AIVoiceAssistant:
                     if any(keyword in text for keyword in button_text_map[section]):
                         button.click()
                         self.log_conversation("System", f"Clicked button: {text}")
-                        time.sleep(2)
-                        return True
+                        return self._wait_for_view(section)
                 except:
                     continue
             # Fallback to JS for main sections
-            self.driver.execute_script(f"if (typeof app !== 'undefined') {{ app.showSection('{section}'); }}")
-            time.sleep(2)
-            return True
+            self.driver.execute_script("if (typeof app !== 'undefined') { app.navigate(arguments[0]); }", section)
+            return self._wait_for_view(section)
                     
         except Exception as e:
             self.log_conversation("System", f"Button click failed: {e}")
             return False
 
-    def process_command(self, command):
-        """Process voice commands with better understanding and personality from under_ai.py"""
+    def process_command(self, command, alternatives=()):
+        """Match a voice command (plus the recognizer's other hypotheses) to an intent and carry it out"""
         if not command:
             self.speak("I didn't quite catch that. Could you please repeat your command?")
             return
@@ -377,257 +594,191 @@ class AIVoiceAssistant:
         self.log_conversation("User", f"Command: {command}")
         self.write_status('processing', command, '')
 
-        # Normalize command - IMPROVED COMMAND MAPPING from under_ai.py
-        original_command = command.lower()
-        command = original_command
-        
-        # Better command normalization from under_ai.py
-        command_replacements = {
-            "hassan": "asana",
-            "hasan": "asana", 
-            "libra": "library",
-            "option": "asana",
-            "rout": "routine",
-            "assist": "assistant",
-            "santa": "sunday",
-            "sandesh": "sunday",
-            "vr collection": "ar correction",
-            "vr": "ar",
-            "virtual": "assistant",
-            "shut down": "stop",
-            "shutdown": "stop",
-            "go back to home": "home",
-            "activate sunday": "test",
-            "yoga poses": "asana",
-            "posture correction": "ar correction",
-            "camera mode": "ar correction",
-            "workout plan": "routine",
-            "exercise routine": "routine",
-            "help me": "assistant",
-            "talk to ai": "assistant",
-            "tadas": "tadasana",
-            "mountain pose": "tadasana",
-            "downward dog": "adho mukha svanasana",
-            "warrior": "warrior iii"
-        }
-        
-        for wrong, correct in command_replacements.items():
-            command = command.replace(wrong, correct)
+        # One pass over every hypothesis; see intents.py for the phrase tables
+        with metrics.timer('intent'):
+            match = intent_matcher.best([command, *alternatives])
+        if match is None:
+            # If we don't understand, provide helpful suggestions from under_ai.py
+            self.speak("I want to make sure I understand correctly. You can ask me to: open the pose library, start posture correction, show your routine, or chat with the assistant. What would you like to try?")
+            return
+        if match.rank:
+            self.log_conversation("System", f"Using recognizer alternative #{match.rank}: {match.text}")
+        getattr(self, f"_intent_{match.intent}")(match)
+
+    def _intent_navigate(self, match):
+        success_reply, failure_reply = SECTION_REPLIES[match.value]
+        if self.navigate_section(match.value):
+            self.speak(self.get_acknowledgement())
+            self.speak(success_reply)
+        else:
+            self.speak(failure_reply)
 
-        # Command processing - IMPROVED MATCHING WITH PERSONALITY from under_ai.py
-        acknowledgement = self.get_acknowledgement()
-        
-        if any(word in command for word in ['home', 'dashboard', 'main', 'go home', 'home screen']):
-            success = self.navigate_section('dashboard')
-            if success:
-                self.speak(f"{acknowledgement} Taking you to the home screen where you can see your progress and daily insights.")
-            else:
-                self.speak("I'm having trouble navigating to the home screen. Let me try another way.")
-
-        elif any(word in command for word in ['asana', 'pose', 'library', 'poses', 'hassan', 'yoga pose', 'open pose library']):
-            success = self.navigate_section('pose_library')
-            if success:
-                self.speak(f"{acknowledgement} Opening our yoga pose library. You'll find detailed instructions for Tadasana, Downward Dog, Warrior poses, and many more!")
-            else:
-                self.speak("Let me try to open the pose library another way. Sometimes the connection needs a moment.")
-
-        elif any(word in command for word in ['ar', 'correction', 'camera', 'vr', 'tracking', 'posture']):
-            success = self.navigate_section('ar_correction')
-            if success:
-                self.speak(f"{acknowledgement} Starting the AR posture correction. Make sure you're standing about 6 feet from your camera for the best tracking!")
-            else:
-                self.speak("I'm setting up the camera correction feature. This might take just a moment.")
-
-        elif any(word in command for word in ['routine', 'plan', 'workout', 'route', 'schedule', 'exercise']):
-            success = self.navigate_section('routine')
-            if success:
-                self.speak(f"{acknowledgement} Opening your personalized routine. I'll show you today's recommended yoga sequence and meal suggestions based on your wellness data.")
-            else:
-                self.speak("Let me load your personalized routine. I'm checking your latest activity and stress levels to give you the best recommendations.")
-
-        elif any(word in command for word in ['assistant', 'chat', 'help', 'ai', 'virtual', 'question']):
-            success = self.navigate_section('assistant')
-            if success:
-                self.speak(f"{acknowledgement} I'm here to help! Ask me anything about yoga poses, meditation techniques, or request a custom session. What would you like to know?")
-            else:
-                self.speak("I'm opening the chat interface where we can talk about anything related to yoga and wellness.")
-
-        elif any(word in command for word in ['tadasana', 'mountain pose', 'tadas']):
-            self.speak(f"{acknowledgement} Let me guide you through Tadasana, the Mountain Pose.")
-            time.sleep(1)
-            self.guide_through_pose('tadasana')
-
-        elif any(word in command for word in ['downward', 'dog', 'downward dog']):
-            self.speak(f"{acknowledgement} Let me guide you through Downward Facing Dog.")
-            time.sleep(1)
-            self.guide_through_pose('downward dog')
-
-        elif any(word in command for word in ['warrior', 'warrior three', 'warrior iii']):
-            self.speak(f"{acknowledgement} Let me guide you through Warrior Three pose.")
-            time.sleep(1)
-            self.guide_through_pose('warrior iii')
-
-        elif any(word in command for word in ['read', 'tell me about', 'what\'s in', 'describe', 'show me']):
-            if 'dashboard' in command or 'home' in command:
-                self.speak("Your dashboard shows your daily progress including posture score, current streak, and calories burned. It's your wellness snapshot!")
-            elif 'asana' in command or 'pose' in command:
-                self.speak("The pose library has detailed information about Tadasana for beginners, Downward Dog for intermediates, and Warrior Three for advanced practice. Each pose includes benefits and precautions.")
-            elif 'routine' in command:
-                self.speak("Your routine section provides personalized yoga sequences and meal suggestions based on your sleep quality and stress levels from your wearable device.")
-            elif 'assistant' in command or 'chat' in command:
-                self.speak("This is where you can chat with me! I can answer yoga questions, create custom sessions, or explain meditation techniques in detail.")
-            elif 'ar' in command or 'correction' in command:
-                self.speak("The AR correction uses your camera and AI to give real-time feedback on your yoga poses. It checks your alignment and helps you improve your form instantly.")
-            else:
-                self.speak("I'd be happy to describe any section! Just tell me which one - like 'describe the pose library' or 'tell me about the dashboard'.")
-
-        elif any(word in command for word in ['guide', 'teach', 'how to', 'demonstrate', 'instruct']):
-            if 'tadasana' in command or 'mountain' in command:
-                self.guide_through_pose('tadasana')
-            elif 'downward' in command or 'dog' in command:
-                self.guide_through_pose('downward dog')
-            elif 'warrior' in command:
-                self.guide_through_pose('warrior iii')
-            else:
-                self.speak("I can guide you through Tadasana for grounding, Downward Dog for full-body stretch, or Warrior Three for balance. Which would you like to practice?")
-
-        elif any(word in command for word in ['test', 'working', 'status', 'activate', 'you there']):
-            responses = [
-                "I'm here and fully operational! Ready to help you with yoga poses, routines, or answer any wellness questions.",
-                "System check complete! Everything is working perfectly. Your personal yoga assistant is at your service!",
-                "I'm running smoothly! Try saying things like 'Sunday open pose library' or 'Sunday start posture correction'."
-            ]
-            self.speak(random.choice(responses))
-
-        elif any(word in command for word in ['thank', 'thanks']):
-            self.speak("You're very welcome! I'm always happy to help with your yoga practice.")
-
-        elif any(word in command for word in ['hello', 'hi', 'hey']):
-            self.speak("Hello there! I'm Sunday, your yoga and wellness assistant. How can I help you today?")
-
-        elif any(word in command for word in ['stop', 'quit', 'exit', 'shutdown', 'goodbye']):
-            self.speak("Thank you for your practice today! Remember to stay hydrated and listen to your body. Goodbye!")
-            time.sleep(2)
-            self.stop()
+    def _intent_practice(self, match):
+        if match.value is None:
+            self._intent_guide(match)
+            return
+        self.speak(self.get_acknowledgement())
+        self.select_pose(match.value)  # Live posture feedback alongside the spoken steps
+        intro = POSE_SCRIPTS[match.value].get('intro')
+        if intro:
+            self.speak(intro)  # Queued ahead of the first step
+        self.guide_through_pose(match.value)
+
+    def _intent_describe(self, match):
+        self.speak(SECTION_DESCRIPTIONS.get(match.value, "I'd be happy to describe any section! Just tell me which one - like 'describe the pose library' or 'tell me about the dashboard'."))
+
+    def _intent_guide(self, match):
+        if match.value:
+            self.guide_through_pose(match.value)
+        else:
+            self.speak("I can guide you through Tadasana for grounding, Downward Dog for full-body stretch, or Warrior Three for balance. Which would you like to practice?")
+
+    def _intent_status(self, match):
+        responses = [
+            "I'm here and fully operational! Ready to help you with yoga poses, routines, or answer any wellness questions.",
+            "System check complete! Everything is working perfectly. Your personal yoga assistant is at your service!",
+            "I'm running smoothly! Try saying things like 'Sunday open pose library' or 'Sunday start posture correction'."
+        ]
+        self.speak(random.choice(responses))
+
+    def _intent_thanks(self, match):
+        self.speak("You're very welcome! I'm always happy to help with your yoga practice.")
+
+    def _intent_greeting(self, match):
+        self.speak("Hello there! I'm Sunday, your yoga and wellness assistant. How can I help you today?")
 
+    def _intent_pause(self, match):
+        if self.sessions.pause():
+            self.speak("Pausing here. Say 'Sunday, resume' when you're ready.", priority=URGENT)
         else:
-            # If we don't understand, provide helpful suggestions from under_ai.py
-            self.speak("I want to make sure I understand correctly. You can ask me to: open the pose library, start posture correction, show your routine, or chat with the assistant. What would you like to try?")
+            self.speak("There's no guided session running right now.")
 
-    def guide_through_pose(self, pose_name):
-        """Provide guided instructions with more personality from under_ai.py"""
-        if pose_name == 'tadasana':
-            steps = [
-                "Let's begin Mountain Pose. Stand with your feet together, heels slightly apart",
-                "Rest your arms gently alongside your torso, with palms facing forward",
-                "Distribute your weight evenly across both feet, feeling grounded",
-                "Engage your thigh muscles and gently lift your kneecaps",
-                "Lengthen your tailbone toward the floor, creating space in your spine",
-                "Lift the crown of your head toward the ceiling, chin parallel to floor",
-                "Take five deep, calming breaths and feel the stability of the mountain"
-            ]
-        elif pose_name == 'downward dog':
-            steps = [
-                "Let's move into Downward Facing Dog. Start on your hands and knees",
-                "Spread your fingers wide, pressing firmly through your palms",
-                "Tuck your toes and lift your hips up and back, forming an inverted V",
-                "Straighten your legs as much as comfortable, don't force it",
-                "Keep your head between your arms, relaxing your neck",
-                "Press your heels toward the floor, but it's okay if they don't touch",
-                "Hold for five deep breaths, feeling the wonderful stretch"
-            ]
-        elif pose_name == 'warrior iii':
-            steps = [
-                "Now for Warrior Three, a beautiful balancing pose. Start standing with feet together",
-                "Shift your weight onto your right foot, finding your balance point",
-                "Engage your core muscles as you slowly lean forward",
-                "Lift your left leg straight behind you, keeping hips level",
-                "Extend your entire body in one straight line from fingertips to toes",
-                "Find a focal point on the floor to help with balance",
-                "Hold for three to five breaths, then we'll switch sides"
-            ]
+    def _intent_resume(self, match):
+        if not self.sessions.resume():
+            self.speak("There's no guided session to resume. Ask me to guide you through a pose!")
+
+    def _intent_skip(self, match):
+        if not self.sessions.skip():
+            self.speak("There's no guided session running right now.")
+
+    def _intent_end_session(self, match):
+        if self.sessions.stop():
+            self.speak("Okay, we'll stop there. Nice work today!", priority=URGENT)
         else:
+            self.speak("There's no guided session running right now.")
+
+    def _intent_stop(self, match):
+        if self.sessions.active():
+            self._intent_end_session(match)  # "Stop" during a guided pose ends the pose, not Sunday
+            return
+        self.speak_and_wait("Thank you for your practice today! Remember to stay hydrated and listen to your body. Goodbye!")
+        self.stop()
+
+    def guide_through_pose(self, pose_name):
+        """Start a guided session in the background; the listen loop stays free for pause/skip/stop"""
+        script = POSE_SCRIPTS.get(pose_name)
+        if not script:
             self.speak("I can guide you through Mountain Pose for grounding, Downward Dog for energy, or Warrior Three for balance. Which calls to you today?")
             return
+        self.sessions.start(pose_name, script)
 
-        for i, step in enumerate(steps, 1):
-            self.speak(step)
-            # Vary the pause time based on step complexity
-            pause_time = 6 if i in [1, len(steps)] else 5
-            time.sleep(pause_time)
-            
-        completion_phrases = [
-            f"Beautiful! You've completed {pose_name}. How does your body feel?",
-            f"Excellent work on {pose_name}! Your practice is growing stronger.",
-            f"Lovely! You've mastered the essence of {pose_name}. Well done!"
-        ]
-        self.speak(random.choice(completion_phrases))
+    def _on_session_event(self, event, session):
+        if event == 'step':
+            self.write_status('guiding', session.name, f"Step {session.index + 1} of {len(session.steps)}")
+        elif event in ('paused', 'done', 'cancelled'):
+            self.log_conversation("System", f"Guided {session.name}: {event} at step {session.index + 1}")
 
     def listen_loop(self):
         """Main listening loop with improved responsiveness from under_ai.py"""
         self.speak("I'm listening for you. Just say 'Sunday' when you need me!")
+        # Capture and recognition run ahead on their own threads; results arrive here in order
+        threading.Thread(target=self._feed_recognizer, daemon=True).start()
         
         while self.listening:
             try:
-                # Listen for wake word with better parameters from under_ai.py
-                audio = self.listen_for_speech(timeout=5, phrase_time_limit=6)
-                
-                if audio:
-                    text = self.recognize_audio(audio)
+                result = self.recognition.next_result(timeout=5)
+                if result is None:
+                    continue
+                text = self._recognized_text(result)
+                if text and result.context and self.is_echo(text):
+                    # Begun while Sunday was talking and only repeats her words: her own voice
+                    self.log_conversation("System", f"Ignoring echo: {text}")
+                    continue
+                    
+                if text:
+                    self.consecutive_failures = 0  # Reset failure counter
                     
-                    if text:
-                        self.consecutive_failures = 0  # Reset failure counter
+                    if self.wake_word in text:
+                        self.log_conversation("System", f"Wake word detected: {text}")
+                        self.tts.cancel()  # Barge-in: stop talking over the user
+                        heard_at = time.monotonic() - result.latency
                         
-                        if self.wake_word in text:
-                            self.log_conversation("System", f"Wake word detected: {text}")
-                            # More natural response from under_ai.py
-                            responses = [
-                                "Yes, I'm listening! What would you like to do?",
-                                "I'm here! How can I assist your practice?",
-                                "Hello! What shall we work on together?",
-                                "Yes, tell me how I can help!"
-                            ]
-                            self.speak(random.choice(responses))
-                            
-                            # Listen for command with longer timeout from under_ai.py
-                            audio = self.listen_for_speech(timeout=10, phrase_time_limit=15)
-                            
-                            if audio:
-                                command = self.recognize_audio(audio)
-                                if command:
-                                    self.process_command(command)
-                                else:
-                                    self.speak("I didn't catch that clearly. Feel free to try again when you're ready.")
+                        # "Sunday, open pose library": the command came with the wake word
+                        command = command_after_wake_word(text, self.wake_word)
+                        if command:
+                            alternatives = [command_after_wake_word(alt, self.wake_word) for alt in result.alternatives[1:]]
+                            self._record_command_latency('one-shot', time.monotonic() - heard_at)
+                            self.process_command(command, [alt for alt in alternatives if alt])
+                            continue
+                        
+                        # More natural response from under_ai.py
+                        self.speak_and_wait(random.choice(WAKE_RESPONSES), timeout=5, priority=URGENT)
+                        
+                        # The command may already be captured and in recognition
+                        result, command = self._next_command(COMMAND_TIMEOUT)
+                        
+                        if result:
+                            if command:
+                                self._record_command_latency('two-step', time.monotonic() - heard_at)
+                                self.process_command(command, result.alternatives[1:])
                             else:
-                                self.speak("I'm here when you need me. Just say 'Sunday' followed by your request.")
+                                self.speak("I didn't catch that clearly. Feel free to try again when you're ready.")
                         else:
-                            # Heard something but not wake word
-                            if any(word in text for word in ['sunday', 'sandi', 'help', 'assistant']):
-                                self.speak("Did you call me? I heard something similar to Sunday. If you need me, just say 'Sunday' clearly.")
+                            self.speak("I'm here when you need me. Just say 'Sunday' followed by your request.")
                     else:
-                        self.consecutive_failures += 1
-                        if self.consecutive_failures >= self.max_failures:
-                            self.log_conversation("System", "Multiple recognition failures, recalibrating microphone")
-                            self.calibrate_microphone()
-                            self.consecutive_failures = 0
-                else:
-                    self.consecutive_failures += 1
-                    if self.consecutive_failures >= self.max_failures:
-                        self.log_conversation("System", "Multiple recognition failures, recalibrating microphone")
-                        self.calibrate_microphone()
-                        self.consecutive_failures = 0
-                
-                time.sleep(0.5)
+                        # Heard something but not wake word
+                        if any(word in text for word in ['sunday', 'sandi', 'help', 'assistant']):
+                            self.speak("Did you call me? I heard something similar to Sunday. If you need me, just say 'Sunday' clearly.")
+                elif self.consecutive_failures >= self.max_failures:
+                    self.log_conversation("System", "Multiple recognition failures, recalibrating microphone")
+                    self.recalibrate_requested = True  # The capture thread owns the microphone
+                    self.consecutive_failures = 0
                 
             except Exception as e:
                 self.log_conversation("System", f"Listen loop error: {e}")
                 self.consecutive_failures += 1
                 time.sleep(1)
 
+    def _next_command(self, timeout):
+        """(Recognition, text) of the command after a bare wake word, skipping echoes of the wake response"""
+        deadline = time.monotonic() + timeout
+        while True:
+            result = self.recognition.next_result(timeout=max(0, deadline - time.monotonic()))
+            if result is None and self.recognition.in_flight():
+                result = self.recognition.next_result()  # Spoken in time, still being recognised
+            if result is None:
+                return None, None
+            text = self._recognized_text(result)
+            if not (text and result.context and self.is_echo(text)):
+                return result, text
+            self.log_conversation("System", f"Ignoring echo: {text}")
+
+    def _record_command_latency(self, path, seconds):
+        metrics.observe('wake_to_dispatch', seconds)
+        samples = self.command_latency[path]
+        samples.append(seconds)
+        summary = ", ".join(f"{name} {sum(v) / len(v):.2f} s avg over {len(v)}"
+                            for name, v in self.command_latency.items() if v)
+        self.log_conversation("System", f"Command latency ({path}): {seconds:.2f} s [{summary}]")
+
     def stop(self):
         """Clean shutdown from under_ai.py"""
         self.log_conversation("System", "Shutting down")
         self.listening = False
+        self.sessions.stop()
+        if self.capture:
+            self.capture.stop()
+        self.recognition.close()
         
         # Close browser
         if self.driver:
@@ -638,13 +789,13 @@ class AIVoiceAssistant:
         
         self.write_status('stopped', '', '')
         self.log_conversation("System", "Shutdown complete")
+        self.conv_log.close()  # os._exit skips atexit handlers
         os._exit(0)
 
 def run_server():
     os.chdir(os.path.dirname(os.path.abspath(__file__)))
-    Handler = MyHTTPRequestHandler
-    with ReusableTCPServer(("0.0.0.0", PORT), Handler) as httpd:
-        print(f"✓ SUNDAY server running on http://0.0.0.0:{PORT}")
+    with make_server(PORT) as httpd:
+        print(f"✓ SUNDAY server running on http://0.0.0.0:{PORT} ({httpd.max_workers} workers)")
         print("✓ Voice + AR merged—mic tuned!")
         httpd.serve_forever()
 
@@ -653,13 +804,26 @@ if __name__ == "__main__":
     print("Make sure you have Chrome installed and microphone permissions granted.")
     print("Say 'Sunday' clearly to activate the assistant.")
     
-    # Start server thread
-    server_thread = threading.Thread(target=run_server, daemon=True)
-    server_thread.start()
-    time.sleep(2)
+    startup = Startup()
+
+    def start_server():
+        # Start server thread; ready when the port accepts connections
+        server_thread = threading.Thread(target=run_server, daemon=True)
+        server_thread.start()
+        return wait_for_port('127.0.0.1', PORT, SERVER_READY_TIMEOUT)
+    startup.stage('server', start_server)
     
     try:
-        assistant = AIVoiceAssistant()
+        assistant = AIVoiceAssistant(startup)
+        startup.wait('listening')
+        if startup.stages['listening'].ok:
+            print(f"✓ Listening {startup.ready_at('listening'):.2f} s after launch")
+            startup.wait(timeout=PAGE_CONNECT_TIMEOUT + 5)
+        print(startup.report())
+        if startup.failed():
+            print(f"⚠ Not ready: {', '.join(startup.failed())}")
+        if not startup.stages['listening'].ok:
+            assistant.stop()
         # Keep the main thread alive
         while assistant.listening:
             time.sleep(0.5)
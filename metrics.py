@@ -0,0 +1,147 @@
+"""Latency histograms for the voice pipeline, exported in Prometheus text format.
+
+Each stage of a voice command records its duration here. The stages are
+capture (endpointing delay), recognize, intent, navigate, speak (time to first
+audio) and wake_to_dispatch; without continuous capture, listen times the
+whole blocking listen(). A Histogram keeps cumulative Prometheus buckets, which the
+server renders at GET /metrics, plus a bounded window of recent samples for
+the rolling p50/p95/p99 summary that goes to the conversation log.
+
+Recording must stay cheap because it runs on the hot path. observe() is one
+bisect over ~20 bucket bounds and two appends under a lock, with memory bounded
+by WINDOW per stage. `python metrics.py` measures the per-call overhead, which
+is also exported as sunday_metrics_observe_seconds.
+
+    with metrics.timer('intent'):
+        match = intent_matcher.best(hypotheses)
+    metrics.observe('recognize', result.latency)
+"""
+import bisect
+import collections
+import contextlib
+import threading
+import time
+
+# Upper bounds in seconds: 1 ms .. 60 s, roughly x2 apart
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 7.5, 10.0, 15.0, 30.0, 60.0)
+WINDOW = 1024  # Recent samples kept per stage for the rolling quantiles
+QUANTILES = (0.5, 0.95, 0.99)
+METRIC_NAME = 'sunday_stage_seconds'
+SUMMARY_INTERVAL = 60  # Seconds between rolling summaries in the log
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS, window=WINDOW):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.recent = collections.deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += seconds
+            self.count += 1
+            self.recent.append(seconds)
+
+    def quantiles(self, qs=QUANTILES):
+        """Quantiles of the recent window ({q: seconds}), or None if nothing was recorded."""
+        with self._lock:
+            samples = sorted(self.recent)
+        if not samples:
+            return None
+        return {q: samples[min(len(samples) - 1, int(q * len(samples)))] for q in qs}
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+class Metrics:
+    def __init__(self, buckets=BUCKETS, window=WINDOW):
+        self._buckets = buckets
+        self._window = window
+        self._stages = {}
+        self._lock = threading.Lock()
+        self.observe_cost = None  # Seconds per observe(), from measure_overhead()
+
+    def stage(self, name):
+        histogram = self._stages.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._stages.setdefault(name, Histogram(self._buckets, self._window))
+        return histogram
+
+    def observe(self, stage, seconds):
+        self.stage(stage).observe(seconds)
+
+    @contextlib.contextmanager
+    def timer(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage(stage).observe(time.perf_counter() - started)
+
+    def render(self):
+        """All stages in Prometheus text exposition format (version 0.0.4)."""
+        lines = [f"# HELP {METRIC_NAME} Voice pipeline latency per stage.",
+                 f"# TYPE {METRIC_NAME} histogram"]
+        for name, histogram in sorted(self._stages.items()):
+            counts, total, count = histogram.snapshot()
+            cumulative = 0
+            for bound, n in zip(histogram.buckets + (float('inf'),), counts):
+                cumulative += n
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{METRIC_NAME}_bucket{{stage="{name}",le="{le}"}} {cumulative}')
+            lines.append(f'{METRIC_NAME}_sum{{stage="{name}"}} {total!r}')
+            lines.append(f'{METRIC_NAME}_count{{stage="{name}"}} {count}')
+        if self.observe_cost is not None:
+            lines.append("# HELP sunday_metrics_observe_seconds Measured cost of recording one sample.")
+            lines.append("# TYPE sunday_metrics_observe_seconds gauge")
+            lines.append(f"sunday_metrics_observe_seconds {self.observe_cost!r}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """One line per stage with rolling p50/p95/p99 in ms, or '' if nothing was recorded."""
+        parts = []
+        for name, histogram in sorted(self._stages.items()):
+            q = histogram.quantiles()
+            if q:
+                parts.append(f"{name} p50={q[0.5] * 1000:.0f} p95={q[0.95] * 1000:.0f} p99={q[0.99] * 1000:.0f} ms "
+                             f"(n={histogram.count})")
+        return "; ".join(parts)
+
+    def start_summary(self, log, interval=SUMMARY_INTERVAL):
+        """Pass summary() to log(text) every interval seconds while new samples keep arriving."""
+        def loop():
+            last_total = 0
+            while True:
+                time.sleep(interval)
+                total = sum(h.count for h in list(self._stages.values()))
+                if total != last_total:
+                    last_total = total
+                    log(f"Latency {self.summary()}")
+        threading.Thread(target=loop, name='metrics-summary', daemon=True).start()
+
+    def measure_overhead(self, samples=20000):
+        """Time observe() on a scratch histogram; stores and returns seconds per call."""
+        scratch = Histogram(self._buckets, self._window)
+        values = [i * 0.0001 for i in range(samples)]
+        started = time.perf_counter()
+        for value in values:
+            scratch.observe(value)
+        self.observe_cost = (time.perf_counter() - started) / samples
+        return self.observe_cost
+
+metrics = Metrics()
+
+if __name__ == "__main__":
+    per_call = metrics.measure_overhead(200000)
+    timer_started = time.perf_counter()
+    for _ in range(100000):
+        with metrics.timer('overhead'):
+            pass
+    per_timer = (time.perf_counter() - timer_started) / 100000
+    print(f"observe(): {per_call * 1e9:.0f} ns/call, timer(): {per_timer * 1e9:.0f} ns/call")
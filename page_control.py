@@ -0,0 +1,107 @@
+"""Push channel from the assistant to the open page.
+
+The assistant used to steer the UI by starting Chrome under Selenium and
+injecting JavaScript through execute_script. Now the page that is already
+open subscribes to /api/control/stream (Server-Sent Events). send() publishes
+a command such as {'action': 'navigate', 'view': 'asana'} and waits for the
+page to POST /api/control/ack with the same id once it has carried the command
+out. Everything stays inside this process, so a command costs one SSE write
+plus one small POST instead of a WebDriver round trip.
+
+Command ids and history come from a StatusBus. A page that reconnects with
+Last-Event-ID gets only commands younger than COMMAND_TTL, so a stale
+"navigate" isn't replayed minutes later. The page also ignores ids it has
+already handled, so several open tabs each act once and the first ack wins.
+
+Ids restart at 1 with the process, while an open tab keeps its old
+Last-Event-ID. Every command therefore carries this process's boot id. The
+stream treats a Last-Event-ID beyond anything sent as a fresh subscriber,
+and the page forgets the ids it has handled when the boot id changes.
+"""
+import threading
+import time
+import uuid
+
+from status_bus import StatusBus
+
+ACK_TIMEOUT = 2.0  # Seconds send() waits for the page to confirm
+COMMAND_TTL = 5.0  # Older commands are not replayed to a reconnecting page
+HISTORY_SIZE = 64
+
+class PageControl:
+    def __init__(self, history=HISTORY_SIZE):
+        self.bus = StatusBus(history)
+        self.boot = uuid.uuid4().hex[:12]  # Lets a page notice that ids restarted with the process
+        self._cond = threading.Condition()
+        self._waiting = {}  # command id -> [threading.Event, ack payload]
+        self._subscribers = 0
+        self.sent = 0
+        self.acked = 0
+        self.timeouts = 0
+
+    def connected(self):
+        with self._cond:
+            return self._subscribers > 0
+
+    def wait_for_page(self, timeout=None):
+        """Block until at least one page is subscribed; False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._subscribers > 0, timeout)
+
+    def subscribe(self):
+        with self._cond:
+            self._subscribers += 1
+            self._cond.notify_all()
+
+    def unsubscribe(self):
+        with self._cond:
+            self._subscribers -= 1
+
+    def send(self, action, timeout=ACK_TIMEOUT, **fields):
+        """Push a command and wait for its ack.
+
+        Returns the page's ack ({'id', 'ok', ...}), or None when no page is
+        connected or none answered within timeout.
+        """
+        with self._cond:
+            if not self._subscribers:
+                return None
+            command = self.bus.publish(action, boot=self.boot, **fields)
+            waiter = self._waiting[command['id']] = [threading.Event(), None]
+            self.sent += 1
+        answered = waiter[0].wait(timeout)
+        with self._cond:
+            self._waiting.pop(command['id'], None)
+            if not answered:
+                self.timeouts += 1
+        return waiter[1]
+
+    def ack(self, command_id, payload):
+        """Record the page's answer to a command; False if nobody is waiting for it any more."""
+        if payload.get('boot', self.boot) != self.boot:
+            return False  # Answer to a command from before a restart
+        with self._cond:
+            waiter = self._waiting.get(command_id)
+            if waiter is None or waiter[0].is_set():
+                return False
+            waiter[1] = payload
+            waiter[0].set()
+            self.acked += 1
+            return True
+
+    def commands_after(self, last_id, timeout=None):
+        """(commands, new last id) for a stream: commands newer than last_id, minus any already stale.
+
+        A last_id from before a restart (beyond anything sent) starts from now, like a new subscriber.
+        """
+        last_id = min(last_id, self.bus.last_id)
+        events = self.bus.events_after(last_id, timeout)
+        cutoff = time.time() - COMMAND_TTL
+        return [c for c in events if c['timestamp'] >= cutoff], (events[-1]['id'] if events else last_id)
+
+    def stats(self):
+        with self._cond:
+            return {'subscribers': self._subscribers, 'sent': self.sent, 'acked': self.acked,
+                    'timeouts': self.timeouts}
+
+page_control = PageControl()
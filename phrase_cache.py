@@ -0,0 +1,136 @@
+"""Pre-rendered audio for Sunday's fixed phrases.
+
+Most of what the assistant says never changes: acknowledgements, wake
+responses, pose guidance steps and section confirmations. Each such phrase is
+synthesized once with the TTS engine (pyttsx3 save_to_file) into
+.tts_cache/<key>.wav. The key is a hash of the text and the voice settings.
+Playback decodes the file into memory and plays it with sounddevice, so the
+hot path skips the engine entirely.
+
+Text that is not cached yet is spoken live and rendered afterwards, so the
+cache also fills up through use. Without sounddevice/soundfile (or the
+PortAudio library) the cache is disabled and everything is spoken live.
+"""
+import collections
+import hashlib
+import json
+import os
+import threading
+
+try:
+    import sounddevice as sd
+    import soundfile as sf
+except (ImportError, OSError):  # OSError: PortAudio/libsndfile missing
+    sd = sf = None
+
+CACHE_DIR = '.tts_cache'
+MAX_MEMORY_PHRASES = 256  # Decoded phrases kept in memory (a few hundred KB each)
+
+def phrase_key(text, settings):
+    return hashlib.sha256(json.dumps([text, settings], sort_keys=True).encode('utf-8')).hexdigest()[:24]
+
+class PhraseCache:
+    def __init__(self, root=CACHE_DIR, settings=None, max_memory=MAX_MEMORY_PHRASES):
+        self.root = root
+        self.settings = dict(settings or {})
+        self.max_memory = max_memory
+        self.enabled = sd is not None and sf is not None
+        self._audio = collections.OrderedDict()  # key -> (samples, samplerate), LRU
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.renders = 0
+        if self.enabled:
+            os.makedirs(root, exist_ok=True)
+
+    def set_settings(self, settings):
+        """Voice settings are part of the key; changing them switches to a different set of files."""
+        with self._lock:
+            self.settings = dict(settings)
+            self._audio.clear()
+
+    def path_for(self, text):
+        return os.path.join(self.root, phrase_key(text, self.settings) + '.wav')
+
+    def has(self, text):
+        return self.enabled and os.path.exists(self.path_for(text))
+
+    def render(self, engine, texts):
+        """Synthesize the uncached texts with engine; returns how many were added.
+
+        Must run on the thread that owns the engine.
+        """
+        if not self.enabled:
+            return 0
+        jobs = []
+        for text in dict.fromkeys(texts):
+            path = self.path_for(text)
+            if not os.path.exists(path):
+                partial = path[:-len('.wav')] + '.partial.wav'
+                engine.save_to_file(text, partial)
+                jobs.append((partial, path))
+        if not jobs:
+            return 0
+        engine.runAndWait()
+        added = 0
+        for partial, path in jobs:
+            if os.path.exists(partial) and os.path.getsize(partial) > 0:
+                os.replace(partial, path)
+                added += 1
+        self.renders += added
+        return added
+
+    def load(self, text):
+        """Decoded (samples, samplerate) for text, or None if it is not cached."""
+        if not self.enabled:
+            return None
+        key = phrase_key(text, self.settings)
+        with self._lock:
+            audio = self._audio.get(key)
+            if audio is not None:
+                self._audio.move_to_end(key)
+                return audio
+        path = os.path.join(self.root, key + '.wav')
+        if not os.path.exists(path):
+            return None
+        try:
+            audio = sf.read(path, dtype='int16')
+        except Exception as e:
+            print(f"⚠ Unreadable cached phrase {path}: {e}")
+            os.remove(path)
+            return None
+        with self._lock:
+            self._audio[key] = audio
+            while len(self._audio) > self.max_memory:
+                self._audio.popitem(last=False)
+        return audio
+
+    def preload(self, texts):
+        for text in texts:
+            self.load(text)
+
+    def play(self, text, on_start=None):
+        """Play text from the cache, blocking until it ends; False if it isn't cached.
+
+        on_start() is called just before playback begins.
+        """
+        audio = self.load(text)
+        if audio is None:
+            self.misses += 1
+            return False
+        try:
+            if on_start:
+                on_start()
+            sd.play(*audio)
+            sd.wait()
+        except Exception as e:
+            print(f"⚠ Cached playback failed, using live TTS from now on: {e}")
+            self.enabled = False
+            return False
+        self.hits += 1
+        return True
+
+    def stop(self):
+        """Cut off the phrase currently playing (barge-in)."""
+        if self.enabled:
+            sd.stop()
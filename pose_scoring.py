@@ -0,0 +1,188 @@
+"""Vectorized reference implementation of the browser's checkPose / calculateAngle.
+
+Keypoints are NumPy arrays shaped (frames, 17, 3) holding x, y, score in
+MoveNet's keypointIndices order. Every rule is evaluated for all frames at
+once, so scoring a recorded session is a handful of array operations instead
+of a per-frame loop. The thresholds, messages and colors mirror index.html;
+change them in both places.
+"""
+import math
+
+import numpy as np
+
+KEYPOINT_INDICES = {
+    'nose': 0, 'left_eye': 1, 'right_eye': 2, 'left_ear': 3, 'right_ear': 4,
+    'left_shoulder': 5, 'right_shoulder': 6, 'left_elbow': 7, 'right_elbow': 8,
+    'left_wrist': 9, 'right_wrist': 10, 'left_hip': 11, 'right_hip': 12,
+    'left_knee': 13, 'right_knee': 14, 'left_ankle': 15, 'right_ankle': 16
+}
+NUM_KEYPOINTS = 17
+MIN_CONFIDENCE = 0.3  # Minimum score for a keypoint to be considered valid
+
+PENALTIES = {'red': 15, 'yellow': 8}  # Points deducted per correction of each color
+
+# checkPose bails out with this (uncolored, so unpenalized) message if any are missing
+GLOBAL_REQUIRED = ('left_hip', 'right_hip', 'left_shoulder', 'right_shoulder', 'nose')
+VISIBILITY_MESSAGE = "Ensure your full body, including your face and hips, is visible."
+
+# Named three-point joint angles (A, B vertex, C)
+JOINTS = {
+    'left_knee': ('left_hip', 'left_knee', 'left_ankle'),
+    'right_knee': ('right_hip', 'right_knee', 'right_ankle'),
+    'left_elbow': ('left_shoulder', 'left_elbow', 'left_wrist'),
+    'right_elbow': ('right_shoulder', 'right_elbow', 'right_wrist'),
+}
+
+X, Y = 0, 1
+
+class Rule:
+    """One correction from checkPose.
+
+    measure(xy, angles) returns a (frames,) array of the checked quantity and
+    fires(values) the frames where the correction applies. The rule is only
+    evaluated on frames where every keypoint in `requires` is confident.
+    """
+
+    def __init__(self, message, color, affected, requires, measure, fires):
+        self.message = message
+        self.color = color
+        self.affected = affected
+        self.requires = requires
+        self.measure = measure
+        self.fires = fires
+
+    def format_message(self, value):
+        # Math.round semantics (half up) so messages match the browser exactly
+        return self.message.format(value=math.floor(value + 0.5))
+
+def _angle_below(joint, limit, message, color, affected):
+    return Rule(message, color, affected, JOINTS[joint],
+                lambda xy, angles: angles[joint], lambda v: v < limit)
+
+def _abs_diff(a, b, axis, limit, message, color, affected=None):
+    ia, ib = KEYPOINT_INDICES[a], KEYPOINT_INDICES[b]
+    return Rule(message, color, affected or (a, b), (a, b),
+                lambda xy, angles: np.abs(xy[:, ia, axis] - xy[:, ib, axis]), lambda v: v > limit)
+
+def _hands_at_heart(limit, message, color):
+    lw, rw = KEYPOINT_INDICES['left_wrist'], KEYPOINT_INDICES['right_wrist']
+    ls, rs = KEYPOINT_INDICES['left_shoulder'], KEYPOINT_INDICES['right_shoulder']
+
+    def measure(xy, angles):
+        chest_y = (xy[:, ls, Y] + xy[:, rs, Y]) / 2
+        hands_y = (xy[:, lw, Y] + xy[:, rw, Y]) / 2
+        return np.abs(hands_y - chest_y)
+
+    return Rule(message, color, ('left_wrist', 'right_wrist'),
+                ('left_wrist', 'right_wrist', 'left_shoulder', 'right_shoulder'), measure, lambda v: v > limit)
+
+POSE_RULES = {
+    'Tadasana': [
+        _angle_below('left_knee', 165, "Left leg: straighten ({value}°)", 'red', ('left_knee', 'left_ankle')),
+        _angle_below('right_knee', 165, "Right leg: straighten ({value}°)", 'red', ('right_knee', 'right_ankle')),
+        _abs_diff('left_hip', 'right_hip', Y, 40, "Hips: keep level", 'yellow'),
+        _abs_diff('left_shoulder', 'right_shoulder', Y, 40, "Shoulders: relax and level", 'yellow'),
+    ],
+    'Namastey': [
+        _abs_diff('left_ankle', 'right_ankle', X, 30, "Feet: bring closer together", 'yellow'),
+        _abs_diff('left_wrist', 'right_wrist', X, 25, "Hands: press palms together", 'red'),
+        _hands_at_heart(60, "Hands: raise to heart level", 'yellow'),
+        _angle_below('left_knee', 165, "Left leg: straighten ({value}°)", 'yellow', ('left_knee', 'left_ankle')),
+        _angle_below('right_knee', 165, "Right leg: straighten ({value}°)", 'yellow', ('right_knee', 'right_ankle')),
+    ],
+    'Vrikshasana': [
+        _angle_below('left_knee', 165, "Standing leg: straighten ({value}°)", 'red', ('left_knee', 'left_ankle')),
+        _angle_below('right_knee', 80, "Right foot: place higher on thigh", 'yellow', ('right_knee', 'right_ankle')),
+        _abs_diff('left_wrist', 'right_wrist', X, 25, "Hands: press palms together", 'yellow'),
+        _abs_diff('left_hip', 'right_hip', X, 60, "Hips: square forward", 'yellow'),
+    ],
+}
+
+def as_keypoint_array(keypoints):
+    """Validate and convert input to a float array shaped (frames, 17, 3)."""
+    kp = np.asarray(keypoints, dtype=np.float64)
+    if kp.ndim == 2:
+        kp = kp[np.newaxis]
+    if kp.ndim != 3 or kp.shape[1:] != (NUM_KEYPOINTS, 3):
+        raise ValueError(f"expected keypoints shaped (frames, {NUM_KEYPOINTS}, 3), got {kp.shape}")
+    return kp
+
+def calculate_angles(a, b, c):
+    """Angle ABC in degrees for arrays of points shaped (..., 2), B being the vertex.
+
+    Same law-of-cosines formulation as calculateAngle: 180 when A or C sits on
+    B, cosine clamped to [-1, 1].
+    """
+    ab = np.hypot(b[..., 0] - a[..., 0], b[..., 1] - a[..., 1])
+    bc = np.hypot(c[..., 0] - b[..., 0], c[..., 1] - b[..., 1])
+    ac = np.hypot(c[..., 0] - a[..., 0], c[..., 1] - a[..., 1])
+    degenerate = (ab == 0) | (bc == 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cos_angle = (ab ** 2 + bc ** 2 - ac ** 2) / (2 * ab * bc)
+    angles = np.degrees(np.arccos(np.clip(cos_angle, -1.0, 1.0)))
+    return np.where(degenerate, 180.0, angles)
+
+def joint_angles(keypoints):
+    """All JOINTS angles for every frame: {joint: (frames,) degrees}."""
+    kp = as_keypoint_array(keypoints)
+    xy = kp[..., :2]
+    return {name: calculate_angles(*(xy[:, KEYPOINT_INDICES[p]] for p in points))
+            for name, points in JOINTS.items()}
+
+class PoseScores:
+    """Result of scoring a batch of frames against one pose.
+
+    scores      (frames,) 0-100 frame scores (before the page's 30-frame smoothing)
+    visible     (frames,) False where the global visibility check failed
+    fired       (frames, rules) which correction fired on which frame
+    values      (frames, rules) the measured quantity behind each rule
+    angles      {joint: (frames,)} joint angles in degrees
+    """
+
+    def __init__(self, pose_name, rules, scores, visible, fired, values, angles):
+        self.pose_name = pose_name
+        self.rules = rules
+        self.scores = scores
+        self.visible = visible
+        self.fired = fired
+        self.values = values
+        self.angles = angles
+
+    def __len__(self):
+        return len(self.scores)
+
+    def corrections(self, frame):
+        """The correction list checkPose would return for one frame."""
+        if not self.visible[frame]:
+            return [{'message': VISIBILITY_MESSAGE, 'affected': list(GLOBAL_REQUIRED)}]
+        corrections = [{'message': rule.format_message(self.values[frame, i]),
+                        'affected': list(rule.affected), 'color': rule.color}
+                       for i, rule in enumerate(self.rules) if self.fired[frame, i]]
+        if not corrections:
+            corrections.append({'message': f"You are holding {self.pose_name} well! Focus on your breath.",
+                                'color': 'green'})
+        return corrections
+
+def score_frames(keypoints, pose_name):
+    """Score every frame of `keypoints` against `pose_name` in one vectorized pass."""
+    if pose_name not in POSE_RULES:
+        raise ValueError(f"unknown pose {pose_name!r}; expected one of {sorted(POSE_RULES)}")
+    kp = as_keypoint_array(keypoints)
+    xy = kp[..., :2]
+    confident = kp[..., 2] >= MIN_CONFIDENCE  # (frames, 17)
+    angles = joint_angles(kp)
+
+    visible = confident[:, [KEYPOINT_INDICES[n] for n in GLOBAL_REQUIRED]].all(axis=1)
+    rules = POSE_RULES[pose_name]
+    frames = kp.shape[0]
+    fired = np.zeros((frames, len(rules)), dtype=bool)
+    values = np.zeros((frames, len(rules)), dtype=np.float64)
+    penalties = np.array([PENALTIES.get(rule.color, 0) for rule in rules], dtype=np.int64)
+
+    for i, rule in enumerate(rules):
+        has_points = confident[:, [KEYPOINT_INDICES[n] for n in rule.requires]].all(axis=1)
+        values[:, i] = rule.measure(xy, angles)
+        fired[:, i] = visible & has_points & rule.fires(values[:, i])
+
+    scores = np.clip(100 - fired.astype(np.int64) @ penalties, 0, 100)
+    return PoseScores(pose_name, rules, scores, visible, fired, values, angles)
@@ -0,0 +1,226 @@
+"""Speech recognizer backends and an ordered, concurrent recognition stage.
+
+A backend turns one sr.AudioData into text, or into a list of alternative
+transcripts (N-best, most likely first):
+
+    GoogleBackend    recognize_google (network)
+    OfflineBackend   an on-device engine speech_recognition supports (sphinx, vosk, whisper)
+    FakeBackend      deterministic scripted results for tests and replays
+
+RecognitionPipeline runs recognition on a thread pool, so the capture side
+can submit the next phrase while earlier ones are still in flight. Backends
+are tried in order, each under its own timeout. An error or timeout falls
+through to the next backend; "nothing recognised" counts as an answer, not
+a failure. Results come back strictly in submission order, so a command can
+never be handled before the slow phrase that came ahead of it.
+"""
+import collections
+import concurrent.futures
+import hashlib
+import importlib.util
+import json
+import threading
+import time
+
+GOOGLE_TIMEOUT = 6.0  # Seconds
+OFFLINE_TIMEOUT = 10.0
+FAKE_TIMEOUT = 5.0
+PIPELINE_WORKERS = 2
+
+class RecognitionError(Exception):
+    """The backend could not produce an answer (network, quota, missing engine...)."""
+
+class Recognition:
+    """Outcome for one phrase: text (lowercased) or None, which backend answered, and why others didn't.
+
+    alternatives holds every hypothesis the backend returned, text first.
+    context is whatever the caller passed to submit() with the audio.
+    """
+
+    def __init__(self, text, backend=None, latency=0.0, errors=None, alternatives=None):
+        self.text = text
+        self.context = None
+        self.alternatives = alternatives or ([text] if text else [])
+        self.backend = backend
+        self.latency = latency
+        self.errors = errors or []
+
+    @property
+    def failed(self):
+        """Every backend errored or timed out (as opposed to hearing no words)."""
+        return self.backend is None
+
+def audio_key(audio):
+    """Stable id for a phrase's audio (sr.AudioData or raw bytes)."""
+    raw = audio if isinstance(audio, (bytes, bytearray)) else audio.get_raw_data()
+    return hashlib.sha1(raw).hexdigest()[:16]
+
+class RecognizerBackend:
+    name = 'backend'
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+
+    def recognize(self, audio):
+        """Text or a list of alternatives, or None when the audio held no recognisable speech.
+
+        Raises RecognitionError on failure.
+        """
+        raise NotImplementedError
+
+class GoogleBackend(RecognizerBackend):
+    name = 'google'
+
+    def __init__(self, recognizer, language="en-US", timeout=GOOGLE_TIMEOUT):
+        super().__init__(timeout)
+        self.recognizer = recognizer
+        self.language = language
+
+    def recognize(self, audio):
+        import speech_recognition as sr
+        try:
+            response = self.recognizer.recognize_google(audio, language=self.language, show_all=True)
+        except sr.UnknownValueError:
+            return None
+        except sr.RequestError as e:
+            raise RecognitionError(str(e)) from e
+        # show_all gives {'alternative': [{'transcript': ..., 'confidence': ...}, ...]}, or [] for no speech
+        if not response:
+            return None
+        return [alt['transcript'] for alt in response.get('alternative', []) if alt.get('transcript')] or None
+
+class OfflineBackend(RecognizerBackend):
+    """On-device recognition through speech_recognition's recognize_<engine>."""
+
+    ENGINES = {'sphinx': 'pocketsphinx', 'vosk': 'vosk', 'whisper': 'whisper'}
+
+    def __init__(self, recognizer, engine='sphinx', timeout=OFFLINE_TIMEOUT, **options):
+        if engine not in self.ENGINES:
+            raise ValueError(f"unknown offline engine {engine!r}; expected one of {sorted(self.ENGINES)}")
+        super().__init__(timeout)
+        self.recognizer = recognizer
+        self.engine = engine
+        self.options = options
+        self.name = f"offline-{engine}"
+
+    @classmethod
+    def available(cls, engine='sphinx'):
+        return importlib.util.find_spec(cls.ENGINES[engine]) is not None
+
+    def recognize(self, audio):
+        import speech_recognition as sr
+        try:
+            text = getattr(self.recognizer, f"recognize_{self.engine}")(audio, **self.options)
+        except sr.UnknownValueError:
+            return None
+        except sr.RequestError as e:
+            raise RecognitionError(str(e)) from e
+        if self.engine == 'vosk':
+            text = json.loads(text).get('text', '')
+        return text or None
+
+class FakeBackend(RecognizerBackend):
+    """Scripted results: a list consumed in order, a dict keyed by audio_key(), or a callable(audio).
+
+    A script entry may be an Exception, which is raised as a RecognitionError.
+    """
+    name = 'fake'
+
+    def __init__(self, responses, latency=0.0, timeout=FAKE_TIMEOUT):
+        super().__init__(timeout)
+        self.responses = list(responses) if isinstance(responses, (list, tuple)) else responses
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def recognize(self, audio):
+        with self._lock:
+            self.calls += 1
+            if callable(self.responses):
+                result = self.responses(audio)
+            elif isinstance(self.responses, dict):
+                result = self.responses.get(audio_key(audio))
+            else:
+                result = self.responses.pop(0) if self.responses else None
+        if self.latency:
+            time.sleep(self.latency(audio) if callable(self.latency) else self.latency)
+        if isinstance(result, Exception):
+            raise RecognitionError(str(result))
+        return result
+
+class RecognitionPipeline:
+    """Thread-pool recognition with a fallback chain of backends and in-order results."""
+
+    def __init__(self, backends, workers=PIPELINE_WORKERS):
+        if not backends:
+            raise ValueError("at least one recognizer backend is required")
+        self.backends = list(backends)
+        self._stage = concurrent.futures.ThreadPoolExecutor(workers, thread_name_prefix='recognize')
+        # Calls that time out keep their thread until they return, so leave headroom
+        self._calls = concurrent.futures.ThreadPoolExecutor(2 * workers * len(self.backends),
+                                                            thread_name_prefix='recognizer-call')
+        self._pending = collections.deque()
+        self._cond = threading.Condition()
+        self.stats = {b.name: {'answers': 0, 'errors': 0, 'timeouts': 0} for b in self.backends}
+
+    def submit(self, audio, context=None):
+        """Start recognising a phrase; its result is returned by next_result() in submission order.
+
+        context is attached to that result as Recognition.context.
+        """
+        future = self._stage.submit(self._recognize_with_context, audio, context)
+        with self._cond:
+            self._pending.append(future)
+            self._cond.notify_all()
+        return future
+
+    def _recognize_with_context(self, audio, context):
+        result = self.recognize(audio)
+        result.context = context
+        return result
+
+    def recognize(self, audio):
+        """Run the backend chain for one phrase (blocking) and return a Recognition."""
+        started = time.monotonic()
+        errors = []
+        for backend in self.backends:
+            call = self._calls.submit(backend.recognize, audio)
+            try:
+                text = call.result(timeout=backend.timeout)
+            except concurrent.futures.TimeoutError:
+                self.stats[backend.name]['timeouts'] += 1
+                errors.append(f"{backend.name}: no answer within {backend.timeout:g}s")
+                continue
+            except Exception as e:
+                self.stats[backend.name]['errors'] += 1
+                errors.append(f"{backend.name}: {e}")
+                continue
+            self.stats[backend.name]['answers'] += 1
+            alternatives = [text] if isinstance(text, str) else list(text or [])
+            alternatives = [t.lower().strip() for t in alternatives if t and t.strip()]
+            return Recognition(alternatives[0] if alternatives else None, backend.name, time.monotonic() - started,
+                               errors, alternatives)
+        return Recognition(None, None, time.monotonic() - started, errors)
+
+    def next_result(self, timeout=None):
+        """Recognition of the oldest submitted phrase, or None if it isn't ready within timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._pending, timeout):
+                return None
+            head = self._pending[0]
+        try:
+            result = head.result(None if deadline is None else max(0, deadline - time.monotonic()))
+        except concurrent.futures.TimeoutError:
+            return None  # Still in flight; it stays at the head of the queue
+        with self._cond:
+            self._pending.popleft()
+        return result
+
+    def in_flight(self):
+        with self._cond:
+            return len(self._pending)
+
+    def close(self):
+        self._stage.shutdown(wait=False, cancel_futures=True)
+        self._calls.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,226 @@
+"""Re-score recorded practice sessions with the current pose rules.
+
+    python rescore.py sessions/ --pose Tadasana --workers 8 --out rescored.jsonl
+    python rescore.py sessions/ --timelines timelines/
+
+A session is a keypoint recording shaped (frames, 17, 3):
+  *.npy   the bare array (pose given by --pose)
+  *.npz   arrays 'keypoints', optional 'timestamps' (ms) and 'pose'
+  *.json  {"pose": ..., "keypoints": [...], "timestamps": [...]}
+  a session_store directory (e.g. recorded with `server.py --record`)
+
+Sessions are streamed to a process pool one file per task, so memory stays
+flat and throughput scales with cores. Each session yields a JSON line with
+its score summary and milestone events (the page's 70%-for-300-frames rule);
+aggregate stats are printed at the end.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+
+from pose_scoring import POSE_RULES, score_frames
+from session_store import SessionReader, is_session_dir
+
+SESSION_EXTENSIONS = ('.npy', '.npz', '.json')
+SMOOTHING_WINDOW = 30  # scoreHistory length in poseDetectionFrame (~1 s at 30 fps)
+MILESTONE_SCORE = 70
+MILESTONE_FRAMES = 300  # 10 seconds at ~30fps
+MILESTONE_COOLDOWN_MS = 1000
+MAX_MILESTONES = 2
+DEFAULT_FPS = 30
+
+def smoothed_scores(frame_scores, window=SMOOTHING_WINDOW):
+    """Rolling mean over the last `window` frame scores, like the page's scoreHistory average."""
+    scores = np.asarray(frame_scores, dtype=np.float64)
+    if scores.size == 0:
+        return scores
+    csum = np.concatenate(([0.0], np.cumsum(scores)))
+    idx = np.arange(1, scores.size + 1)
+    lo = np.maximum(0, idx - window)
+    return (csum[idx] - csum[lo]) / (idx - lo)
+
+def milestone_events(smoothed, timestamps_ms, hold_frames=MILESTONE_FRAMES, threshold=MILESTONE_SCORE,
+                     cooldown_ms=MILESTONE_COOLDOWN_MS, max_milestones=MAX_MILESTONES):
+    """Frame indices where the page would award a milestone.
+
+    The page counts consecutive frames with smoothed score >= 70, awards a
+    milestone once the count reaches 300 (and 1 s has passed since the last
+    one), resets the count, and stops after two milestones.
+    """
+    above = np.asarray(smoothed) >= threshold
+    edges = np.diff(np.concatenate(([0], above.astype(np.int8), [0])))
+    starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+    events = []
+    last_time = -np.inf
+    for start, end in zip(starts, ends):
+        candidate = start + hold_frames - 1
+        while candidate < end and len(events) < max_milestones:
+            if timestamps_ms[candidate] - last_time <= cooldown_ms:
+                # The counter keeps climbing until the cooldown has passed
+                candidate = int(np.searchsorted(timestamps_ms, last_time + cooldown_ms, side='right'))
+                if candidate >= end:
+                    break
+            events.append(int(candidate))
+            last_time = timestamps_ms[candidate]
+            candidate += hold_frames
+        if len(events) >= max_milestones:
+            break
+    return events
+
+def load_session(path, default_pose=None):
+    """Return (keypoints, timestamps_ms or None, pose) for one recorded session file."""
+    timestamps, pose = None, default_pose
+    if os.path.isdir(path):
+        session = SessionReader(path)
+        keypoints, timestamps = session.keypoints, session.timestamps
+        pose = session.meta.get('pose') or pose
+    elif path.endswith('.npy'):
+        keypoints = np.load(path)
+    elif path.endswith('.npz'):
+        with np.load(path) as data:
+            keypoints = data['keypoints']
+            if 'timestamps' in data:
+                timestamps = data['timestamps']
+            if 'pose' in data:
+                pose = str(data['pose'])
+    else:
+        with open(path) as f:
+            data = json.load(f)
+        keypoints = np.asarray(data['keypoints'], dtype=np.float64)
+        timestamps = data.get('timestamps')
+        pose = data.get('pose', pose)
+    if timestamps is not None:
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+    return keypoints, timestamps, pose
+
+def score_session(keypoints, pose, timestamps_ms=None, fps=DEFAULT_FPS):
+    """Score one session: frame and smoothed timelines, milestones and a summary."""
+    result = score_frames(keypoints, pose)
+    frames = len(result)
+    if timestamps_ms is None or len(timestamps_ms) != frames:
+        timestamps_ms = np.arange(frames) * (1000.0 / fps)
+    smoothed = smoothed_scores(result.scores)
+    milestones = milestone_events(smoothed, timestamps_ms)
+
+    correction_counts = {}
+    for i, count in enumerate(result.fired.sum(axis=0).tolist()):
+        if count:
+            correction_counts[result.rules[i].message.split(' (')[0]] = count
+
+    summary = {
+        'pose': pose,
+        'frames': frames,
+        'duration_s': round(float(timestamps_ms[-1] - timestamps_ms[0]) / 1000, 3) if frames else 0.0,
+        'mean_score': round(float(result.scores.mean()), 2) if frames else 0.0,
+        'mean_smoothed_score': round(float(smoothed.mean()), 2) if frames else 0.0,
+        'pct_frames_above_70': round(float((smoothed >= MILESTONE_SCORE).mean() * 100), 2) if frames else 0.0,
+        'pct_frames_visible': round(float(result.visible.mean() * 100), 2) if frames else 0.0,
+        'milestones': [{'frame': f, 'time_ms': round(float(timestamps_ms[f]), 1)} for f in milestones],
+        'corrections': correction_counts,
+    }
+    return summary, result.scores, smoothed, timestamps_ms
+
+def _score_file(task):
+    """Process-pool worker: score one file, optionally writing its timeline."""
+    path, default_pose, timeline_dir = task
+    started = time.perf_counter()
+    try:
+        keypoints, timestamps, pose = load_session(path, default_pose)
+        if pose not in POSE_RULES:
+            raise ValueError(f"no pose for session (got {pose!r}); pass --pose")
+        summary, frame_scores, smoothed, timestamps = score_session(keypoints, pose, timestamps)
+    except Exception as e:
+        return {'session': path, 'error': f"{type(e).__name__}: {e}"}
+
+    if timeline_dir:
+        name = os.path.basename(os.path.normpath(path))
+        if not os.path.isdir(path):
+            name = os.path.splitext(name)[0]
+        with open(os.path.join(timeline_dir, f"{name}.timeline.json"), 'w') as f:
+            json.dump({
+                'session': path,
+                'time_ms': np.round(timestamps, 1).tolist(),
+                'frame_score': frame_scores.tolist(),
+                'smoothed_score': np.round(smoothed, 2).tolist(),
+            }, f)
+    summary['session'] = path
+    summary['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 2)
+    return summary
+
+def iter_session_files(root):
+    """Yield session files (and session_store directories) under root without listing everything up front."""
+    if os.path.isfile(root) or is_session_dir(root):
+        yield root
+        return
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in [d for d in dirnames if is_session_dir(os.path.join(dirpath, d))]:
+            dirnames.remove(name)
+            yield os.path.join(dirpath, name)
+        for name in sorted(filenames):
+            if name.endswith(SESSION_EXTENSIONS) and not name.endswith('.timeline.json'):
+                yield os.path.join(dirpath, name)
+
+def rescore_directory(root, default_pose=None, workers=None, timeline_dir=None, out=None, chunksize=4):
+    """Score every session under root across a process pool; returns aggregate stats."""
+    if timeline_dir:
+        os.makedirs(timeline_dir, exist_ok=True)
+    tasks = ((path, default_pose, timeline_dir) for path in iter_session_files(root))
+
+    totals = {'sessions': 0, 'errors': 0, 'frames': 0, 'milestones': 0, 'score_sum': 0.0, 'by_pose': {}}
+    started = time.perf_counter()
+    with multiprocessing.Pool(workers) as pool:
+        for summary in pool.imap_unordered(_score_file, tasks, chunksize=chunksize):
+            if out:
+                out.write(json.dumps(summary) + '\n')
+            if 'error' in summary:
+                totals['errors'] += 1
+                continue
+            totals['sessions'] += 1
+            totals['frames'] += summary['frames']
+            totals['milestones'] += len(summary['milestones'])
+            totals['score_sum'] += summary['mean_score'] * summary['frames']
+            pose_stats = totals['by_pose'].setdefault(summary['pose'], {'sessions': 0, 'frames': 0, 'score_sum': 0.0})
+            pose_stats['sessions'] += 1
+            pose_stats['frames'] += summary['frames']
+            pose_stats['score_sum'] += summary['mean_score'] * summary['frames']
+    elapsed = time.perf_counter() - started
+
+    def mean(stats):
+        return round(stats['score_sum'] / stats['frames'], 2) if stats['frames'] else 0.0
+
+    return {
+        'sessions': totals['sessions'],
+        'errors': totals['errors'],
+        'frames': totals['frames'],
+        'milestones': totals['milestones'],
+        'mean_score': mean(totals),
+        'by_pose': {pose: {'sessions': s['sessions'], 'frames': s['frames'], 'mean_score': mean(s)}
+                    for pose, s in sorted(totals['by_pose'].items())},
+        'elapsed_s': round(elapsed, 3),
+        'frames_per_s': round(totals['frames'] / elapsed) if elapsed else 0,
+        'workers': workers or os.cpu_count(),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-score recorded keypoint sessions")
+    parser.add_argument("sessions", help="session file or directory (searched recursively)")
+    parser.add_argument("--pose", choices=sorted(POSE_RULES), help="pose for sessions that don't record one")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--out", help="write one JSON line per session here (default: stdout)")
+    parser.add_argument("--timelines", help="directory for per-session score timelines")
+    args = parser.parse_args()
+
+    out = open(args.out, 'w') if args.out else sys.stdout
+    try:
+        stats = rescore_directory(args.sessions, args.pose, args.workers, args.timelines, out)
+    finally:
+        if args.out:
+            out.close()
+    print(json.dumps(stats, indent=2), file=sys.stderr)
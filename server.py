@@ -1,31 +1,550 @@
 import http.server
 import socketserver
+import threading
+import argparse
 import os
+import sys
+import urllib.parse
+import json
+import io
+import uuid
+import time
+from http import HTTPStatus
+from cache_policy import etag_cache, cache_control_for, is_not_modified, NO_STORE
+from hot_cache import hot_cache, choose_encoding
+from image_variants import select_variant, derivative_cache
+from vendor import make_html_rewriter
+from status_bus import status_bus
+from page_control import page_control
+from metrics import metrics
 
 PORT = 5000
+MAX_WORKERS = 64  # Concurrent connections served at once
+KEEPALIVE_TIMEOUT = 15  # Seconds an idle keep-alive connection is held open
+STATS_PATH = '/__stats'  # JSON counters for the in-memory caches
+SENDFILE_MIN_SIZE = 64 * 1024  # Smaller bodies are cheaper to copy in userspace
+COPY_BUFSIZE = 64 * 1024
+MAX_RANGES = 16  # More ranges than this and the whole file is sent instead
+MAX_BODY_SIZE = 32 * 1024 * 1024  # Largest POST body accepted by the API endpoints
+SSE_HEARTBEAT = 15  # Seconds between keep-alive comments on an idle event stream
+SSE_MAX_DURATION = 300  # Streams are closed after this so EventSource reconnects and frees the worker
+SSE_RETRY_MS = 1000
+LONG_POLL_MAX_WAIT = 30
+
+# POST endpoints -> handler method name
+API_ROUTES = {
+    '/api/score': '_api_score',
+    '/api/telemetry': '_api_telemetry',
+    '/api/control/ack': '_api_control_ack',
+}
+
+# GET endpoints -> handler method name
+GET_ROUTES = {
+    '/api/status': '_api_status',
+    '/api/status/stream': '_api_status_stream',
+    '/api/control/stream': '_api_control_stream',
+    '/metrics': '_metrics',
+}
+
+class FileBody:
+    """An open file plus the pieces of the response body to send from it.
+
+    parts holds (offset, count) slices of the file and literal bytes (the
+    multipart boundaries). do_GET/do_HEAD close it like a normal file.
+    """
+    def __init__(self, file, parts):
+        self.file = file
+        self.parts = parts
+
+    def close(self):
+        self.file.close()
+
+def parse_byte_ranges(header, size):
+    """Parse a Range header into (start, end) pairs with inclusive ends.
+
+    Returns None when the header should be ignored (not bytes=, malformed or
+    too many ranges) and [] when none of the ranges can be satisfied.
+    """
+    units, _, spec = header.partition('=')
+    if units.strip().lower() != 'bytes' or not spec.strip():
+        return None
+    ranges = []
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        first, sep, last = part.partition('-')
+        first, last = first.strip(), last.strip()
+        if not sep or not (first.isdigit() or (not first and last.isdigit())):
+            return None
+        if last and not last.isdigit():
+            return None
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+            if last and end < start:
+                return None
+        else:
+            suffix = int(last)  # bytes=-N: the last N bytes
+            if suffix == 0:
+                continue
+            start, end = max(0, size - suffix), size - 1
+        if start >= size:
+            continue
+        ranges.append((start, min(end, size - 1)))
+    if len(ranges) > MAX_RANGES:
+        return None
+    return ranges
 
 class MyHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
+    # HTTP/1.1 so browsers can reuse one connection for the page and its assets
+    protocol_version = "HTTP/1.1"
+    timeout = KEEPALIVE_TIMEOUT
+    use_sendfile = hasattr(os, 'sendfile')
+
+    def send_response(self, code, message=None):
+        self._response_code = code
+        super().send_response(code, message)
+
+    def _resolve_file(self, fs_path):
+        """Map a translated path to the file that will actually be served, or None."""
+        if os.path.isdir(fs_path):
+            if not self.path.split('?', 1)[0].endswith('/'):
+                return None  # SimpleHTTPRequestHandler redirects these
+            fs_path = os.path.join(fs_path, 'index.html')
+        return fs_path if os.path.isfile(fs_path) else None
+
+    def do_GET(self):
+        if urllib.parse.urlsplit(self.path).path == STATS_PATH:
+            stats = {'hot_cache': hot_cache.stats(), 'derivatives': derivative_cache.stats(),
+                     'page_control': page_control.stats()}
+            if 'telemetry' in sys.modules:  # Only once a client has sent telemetry
+                stats['telemetry'] = sys.modules['telemetry'].telemetry_hub.stats()
+            self._send_json(stats)
+            return
+        handler_name = GET_ROUTES.get(urllib.parse.urlsplit(self.path).path)
+        if handler_name:
+            getattr(self, handler_name)()
+            return
+        super().do_GET()
+
+    def do_POST(self):
+        handler_name = API_ROUTES.get(urllib.parse.urlsplit(self.path).path)
+        if not handler_name:
+            self.close_connection = True  # The unread body would corrupt the next request
+            self.send_error(HTTPStatus.NOT_FOUND, "Unknown endpoint")
+            return
+        getattr(self, handler_name)()
+
+    def _read_body(self, max_size=MAX_BODY_SIZE):
+        """Read the request body, or answer 400/411/413 and return None."""
+        try:
+            length = int(self.headers.get('Content-Length', ''))
+        except ValueError:
+            self.close_connection = True
+            self.send_error(HTTPStatus.LENGTH_REQUIRED)
+            return None
+        if length < 0:  # rfile.read(-1) would hold the worker until the client hangs up
+            self.close_connection = True
+            self.send_error(HTTPStatus.BAD_REQUEST, "Negative Content-Length")
+            return None
+        if length > max_size:
+            self.close_connection = True
+            self.send_error(HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+            return None
+        return self.rfile.read(length)
+
+    def _api_score(self):
+        """POST /api/score {"pose": "Tadasana", "keypoints": [frames][17][x, y, score]}"""
+        body = self._read_body()
+        if body is None:
+            return
+        try:
+            import pose_scoring
+        except ImportError:
+            self._send_json({'error': 'numpy is required for pose scoring'}, HTTPStatus.SERVICE_UNAVAILABLE)
+            return
+        try:
+            payload = json.loads(body)
+            result = pose_scoring.score_frames(payload['keypoints'], payload['pose'])
+        except (ValueError, KeyError, TypeError) as e:
+            self._send_json({'error': str(e)}, HTTPStatus.BAD_REQUEST)
+            return
+
+        response = {
+            'pose': result.pose_name,
+            'frames': len(result),
+            'scores': result.scores.tolist(),
+            'visible': result.visible.tolist(),
+            'angles': {joint: [round(a, 1) for a in angles.tolist()] for joint, angles in result.angles.items()},
+        }
+        if payload.get('corrections', True):
+            response['corrections'] = [result.corrections(i) for i in range(len(result))]
+        self._send_json(response)
+
+    def _api_telemetry(self):
+        """POST /api/telemetry: binary keypoint batch (see telemetry.py), client id in X-Client-Id."""
+        try:
+            import telemetry
+        except ImportError:
+            self.close_connection = True
+            self._send_json({'error': 'numpy is required for telemetry'}, HTTPStatus.SERVICE_UNAVAILABLE)
+            return
+        body = self._read_body(telemetry.HEADER.size + telemetry.MAX_BATCH_FRAMES * telemetry.FRAME_DTYPE.itemsize)
+        if body is None:
+            return
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+        client_id = self.headers.get('X-Client-Id') or query.get('client', [''])[0]
+        try:
+            info = telemetry.telemetry_hub.ingest(client_id, body)
+        except telemetry.TelemetryError as e:
+            self._send_json({'error': str(e)}, HTTPStatus.BAD_REQUEST)
+            return
+        except telemetry.TelemetryBusy as e:
+            self._extra_headers = [('Retry-After', str(e.retry_after))]
+            self._send_json({'error': str(e)}, HTTPStatus.TOO_MANY_REQUESTS)
+            return
+        self._send_json(info, HTTPStatus.ACCEPTED)
+
+    def _api_status(self):
+        """GET /api/status: latest assistant status; ?after=<id>&wait=<s> long-polls for newer events."""
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+        after = query.get('after', [''])[0]
+        if not after.isdigit():
+            self._send_json({'status': status_bus.latest(), 'last_id': status_bus.last_id})
+            return
+        try:
+            wait = min(float(query.get('wait', ['0'])[0]), LONG_POLL_MAX_WAIT)
+        except ValueError:
+            wait = 0
+        events = status_bus.events_after(int(after), timeout=max(wait, 0))
+        self._send_json({'events': events, 'last_id': events[-1]['id'] if events else int(after)})
+
+    def _api_status_stream(self):
+        """GET /api/status/stream: assistant status as Server-Sent Events (resumes from Last-Event-ID)."""
+        last_id = self.headers.get('Last-Event-ID', '')
+        # A fresh subscriber starts with the current status
+        last_id = int(last_id) if last_id.isdigit() else max(0, status_bus.last_id - 1)
+
+        def next_events(last_id):
+            events = status_bus.events_after(last_id, timeout=SSE_HEARTBEAT)
+            return events, (events[-1]['id'] if events else last_id)
+        self._send_event_stream('status', next_events, last_id)
+
+    def _api_control_stream(self):
+        """GET /api/control/stream: assistant commands for the page as Server-Sent Events (see page_control.py)."""
+        last_id = self.headers.get('Last-Event-ID', '')
+        # A fresh subscriber only gets commands sent from now on
+        last_id = int(last_id) if last_id.isdigit() else page_control.bus.last_id
+        page_control.subscribe()
+        try:
+            self._send_event_stream('command', lambda last_id: page_control.commands_after(last_id, SSE_HEARTBEAT),
+                                    last_id)
+        finally:
+            page_control.unsubscribe()
+
+    def _send_event_stream(self, event_type, next_events, last_id):
+        """Serve next_events(last_id) -> (events, last_id) as an SSE stream until SSE_MAX_DURATION."""
+        self.close_connection = True  # No Content-Length: the body ends when the connection does
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.send_header('X-Accel-Buffering', 'no')
+        self.end_headers()
+        deadline = time.monotonic() + SSE_MAX_DURATION
+        try:
+            self.wfile.write(f"retry: {SSE_RETRY_MS}\n\n".encode())
+            self.wfile.flush()
+            while time.monotonic() < deadline:
+                events, last_id = next_events(last_id)
+                if not events:
+                    self.wfile.write(b": ping\n\n")
+                for event in events:
+                    self.wfile.write(f"id: {event['id']}\nevent: {event_type}\ndata: {json.dumps(event)}\n\n".encode())
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Page closed or navigated away
+
+    def _metrics(self):
+        """GET /metrics: voice pipeline latency histograms in Prometheus text format."""
+        body = metrics.render().encode('utf-8')
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', NO_STORE)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _api_control_ack(self):
+        """POST /api/control/ack {"id": <command id>, "ok": true, ...} once the page has carried out a command."""
+        body = self._read_body()
+        if body is None:
+            return
+        try:
+            payload = json.loads(body)
+            command_id = int(payload['id'])
+        except (ValueError, KeyError, TypeError) as e:
+            self._send_json({'error': str(e)}, HTTPStatus.BAD_REQUEST)
+            return
+        self._send_json({'accepted': page_control.ack(command_id, payload)})
+
+    def _send_json(self, payload, status=HTTPStatus.OK):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        for keyword, value in getattr(self, '_extra_headers', None) or ():
+            self.send_header(keyword, value)
+        self._extra_headers = None
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_head(self):
+        self._cache_headers = None
+        fs_path = self._resolve_file(self.translate_path(self.path))
+        if fs_path and hot_cache.is_hot(fs_path):
+            entry = hot_cache.get(fs_path)
+            if entry:
+                return self._send_hot_head(entry)
+        if fs_path:
+            url = urllib.parse.urlsplit(self.path)
+            try:
+                etag, mtime = etag_cache.validators(fs_path)
+            except OSError:
+                return super().send_head()
+            content_type = None
+            self._cache_headers = [('Cache-Control', cache_control_for(url.path)), ('ETag', etag)]
+
+            variant = select_variant(url.path, url.query, self.headers.get('Accept'))
+            if variant:
+                size, fmt, varies_on_accept = variant
+                if varies_on_accept:
+                    self._cache_headers.append(('Vary', 'Accept'))
+                if size != 'full' or fmt:
+                    derived = derivative_cache.get(fs_path, size, fmt, self.directory)
+                    if derived:
+                        fs_path, etag, content_type = derived
+                        self._cache_headers[1] = ('ETag', etag)
+            return self._send_file_head(fs_path, etag, mtime, content_type)
+        return super().send_head()
+
+    def _send_file_head(self, fs_path, etag, mtime, content_type=None):
+        """Send headers for a file on disk (or a 304/416) and return the body to copy.
+
+        Honours Range / If-Range: one range gets a plain 206, several get a
+        multipart/byteranges 206. The returned FileBody is streamed by copyfile.
+        """
+        if is_not_modified(self.headers, etag, mtime):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header('Last-Modified', self.date_time_string(mtime))
+            self.end_headers()
+            return None
+        try:
+            f = open(fs_path, 'rb')
+        except OSError:
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return None
+        try:
+            size = os.fstat(f.fileno()).st_size
+            content_type = content_type or self.guess_type(fs_path)
+            ranges = None
+            range_header = self.headers.get('Range')
+            if range_header and self._if_range_matches(etag, mtime):
+                ranges = parse_byte_ranges(range_header, size)
+
+            if ranges == []:
+                f.close()
+                self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                self.send_header('Content-Range', f'bytes */{size}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return None
+
+            if not ranges:
+                self.send_response(HTTPStatus.OK)
+                self.send_header('Content-type', content_type)
+                self.send_header('Content-Length', str(size))
+                parts = [(0, size)]
+            elif len(ranges) == 1:
+                start, end = ranges[0]
+                self.send_response(HTTPStatus.PARTIAL_CONTENT)
+                self.send_header('Content-type', content_type)
+                self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+                self.send_header('Content-Length', str(end - start + 1))
+                parts = [(start, end - start + 1)]
+            else:
+                boundary = uuid.uuid4().hex
+                parts = []
+                for start, end in ranges:
+                    parts.append((f'\r\n--{boundary}\r\nContent-Type: {content_type}\r\n'
+                                  f'Content-Range: bytes {start}-{end}/{size}\r\n\r\n').encode('latin-1'))
+                    parts.append((start, end - start + 1))
+                parts.append(f'\r\n--{boundary}--\r\n'.encode('latin-1'))
+                self.send_response(HTTPStatus.PARTIAL_CONTENT)
+                self.send_header('Content-type', f'multipart/byteranges; boundary={boundary}')
+                self.send_header('Content-Length', str(sum(len(p) if isinstance(p, bytes) else p[1] for p in parts)))
+            self.send_header('Accept-Ranges', 'bytes')
+            self.send_header('Last-Modified', self.date_time_string(mtime))
+            self.end_headers()
+            return FileBody(f, parts)
+        except:
+            f.close()
+            raise
+
+    def _if_range_matches(self, etag, mtime):
+        """A Range is only honoured if If-Range (when sent) still names the current file."""
+        if_range = self.headers.get('If-Range')
+        if not if_range:
+            return True
+        if_range = if_range.strip()
+        if if_range.startswith('"') or if_range.startswith('W/'):
+            return if_range == etag  # Strong comparison only
+        return if_range == self.date_time_string(mtime)
+
+    def copyfile(self, source, outputfile):
+        if not isinstance(source, FileBody):
+            return super().copyfile(source, outputfile)
+        for part in source.parts:
+            if isinstance(part, bytes):
+                outputfile.write(part)
+                continue
+            offset, count = part
+            if self.use_sendfile and count >= SENDFILE_MIN_SIZE:
+                # Kernel copies file pages straight to the socket, no Python buffers
+                self.connection.sendfile(source.file, offset, count)
+            else:
+                source.file.seek(offset)
+                while count > 0:
+                    chunk = source.file.read(min(COPY_BUFSIZE, count))
+                    if not chunk:
+                        break
+                    outputfile.write(chunk)
+                    count -= len(chunk)
+
+    def _send_hot_head(self, entry):
+        """Serve a file from the in-memory cache, picking a variant by Accept-Encoding."""
+        encoding = choose_encoding(self.headers.get('Accept-Encoding'), entry.variants)
+        etag = entry.etag(encoding)
+        url_path = urllib.parse.urlsplit(self.path).path
+        self._cache_headers = [('Cache-Control', cache_control_for(url_path)), ('ETag', etag),
+                               ('Vary', 'Accept-Encoding')]
+        if is_not_modified(self.headers, etag, entry.mtime):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header('Last-Modified', self.date_time_string(entry.mtime))
+            self.end_headers()
+            return None
+
+        body = entry.variants[encoding]
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', entry.content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if encoding != 'identity':
+            self.send_header('Content-Encoding', encoding)
+        self.send_header('Last-Modified', self.date_time_string(entry.mtime))
+        self.end_headers()
+        return io.BytesIO(body)
+
     def end_headers(self):
-        self.send_header('Cache-Control', 'no-cache, no-store, must-revalidate')
-        self.send_header('Pragma', 'no-cache')
-        self.send_header('Expires', '0')
+        # Policy headers only apply to real file responses; errors and listings are never cached
+        cache_headers = getattr(self, '_cache_headers', None)
+        self._cache_headers = None
+        if cache_headers and getattr(self, '_response_code', None) in (200, 206, 304):
+            for keyword, value in cache_headers:
+                self.send_header(keyword, value)
+        else:
+            self.send_header('Cache-Control', NO_STORE)
+            self.send_header('Pragma', 'no-cache')
+            self.send_header('Expires', '0')
         super().end_headers()
 
     def log_message(self, format, *args):
         print(f"[SERVER] {self.address_string()} - {format % args}")
 
-os.chdir(os.path.dirname(os.path.abspath(__file__)))
-
-Handler = MyHTTPRequestHandler
+class SingleConnectionHandler(MyHTTPRequestHandler):
+    # One connection at a time: an idle keep-alive client would block everyone else
+    protocol_version = "HTTP/1.0"
 
 class ReusableTCPServer(socketserver.TCPServer):
     allow_reuse_address = True
 
-with ReusableTCPServer(("0.0.0.0", PORT), Handler) as httpd:
-    print(f"✓ SUNDAY Yoga Platform server running on http://0.0.0.0:{PORT}")
-    print(f"✓ Access your yoga AR correction system at the URL above")
-    print(f"✓ Camera permissions will be requested when you start AR correction")
-    try:
-        httpd.serve_forever()
-    except KeyboardInterrupt:
-        print("\n✓ Server stopped")
+class ThreadedHTTPServer(socketserver.ThreadingMixIn, ReusableTCPServer):
+    """One thread per connection, capped at max_workers live connections.
+
+    When every worker is busy the accept loop waits for a free slot, so extra
+    clients queue in the listen backlog instead of spawning unbounded threads.
+    """
+    daemon_threads = True
+    block_on_close = False
+    request_queue_size = 128
+
+    def __init__(self, server_address, handler_class, max_workers=MAX_WORKERS):
+        self.max_workers = max_workers
+        self._worker_slots = threading.BoundedSemaphore(max_workers)
+        super().__init__(server_address, handler_class)
+
+    def process_request(self, request, client_address):
+        self._worker_slots.acquire()
+        try:
+            super().process_request(request, client_address)
+        except Exception:
+            self._worker_slots.release()
+            raise
+
+    def process_request_thread(self, request, client_address):
+        try:
+            super().process_request_thread(request, client_address)
+        finally:
+            self._worker_slots.release()
+
+def make_server(port=PORT, threaded=True, max_workers=MAX_WORKERS, host="0.0.0.0", warm=True, vendored=None,
+                record_dir=None):
+    """Build the static server; threaded=False keeps the old one-at-a-time HTTP/1.0 mode.
+
+    Serves the current working directory. With warm=True the hot-file cache is
+    filled before the first request arrives. vendored=None serves the local
+    vendor cache whenever `python vendor.py fetch` has populated it; True/False
+    force it on or off. record_dir, if given, persists incoming keypoint
+    telemetry there as session_store sessions.
+    """
+    rewriter = make_html_rewriter(os.getcwd()) if vendored is not False else None
+    hot_cache.set_html_transform(rewriter)
+    if rewriter:
+        print("✓ Vendored mode: CDN scripts and MoveNet served from ./vendor")
+    elif vendored:
+        print("⚠ Vendored mode requested but vendor/ is empty - run: python vendor.py fetch")
+    if record_dir:
+        from telemetry import telemetry_hub
+        from session_store import SessionStore
+        telemetry_hub.set_sink(SessionStore(record_dir).telemetry_sink)
+        print(f"✓ Recording keypoint telemetry to {record_dir}/")
+    if warm:
+        hot_cache.warm(os.getcwd())
+    if threaded:
+        return ThreadedHTTPServer((host, port), MyHTTPRequestHandler, max_workers=max_workers)
+    return ReusableTCPServer((host, port), SingleConnectionHandler)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SUNDAY Yoga Platform static server")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="max concurrent connections")
+    parser.add_argument("--single-threaded", action="store_true", help="serve one connection at a time")
+    parser.add_argument("--vendored", action=argparse.BooleanOptionalAction, default=None,
+                        help="serve CDN scripts/model from ./vendor (default: when it has been fetched)")
+    parser.add_argument("--record", metavar="DIR", help="store keypoint telemetry as sessions under DIR")
+    args = parser.parse_args()
+
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+    with make_server(args.port, threaded=not args.single_threaded, max_workers=args.workers,
+                     vendored=args.vendored, record_dir=args.record) as httpd:
+        print(f"✓ SUNDAY Yoga Platform server running on http://0.0.0.0:{args.port}")
+        if args.single_threaded:
+            print("✓ Serving in single-threaded mode (HTTP/1.0, no keep-alive)")
+        else:
+            print(f"✓ Serving up to {args.workers} connections concurrently (HTTP/1.1 keep-alive)")
+        print(f"✓ Access your yoga AR correction system at the URL above")
+        print(f"✓ Camera permissions will be requested when you start AR correction")
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            print("\n✓ Server stopped")
@@ -0,0 +1,262 @@
+"""Append-only, memory-mapped columnar storage for keypoint sessions.
+
+A session is a directory:
+
+    meta.json       session id, client, pose, created time
+    timestamps.f8   float64 ms timestamps, one per frame
+    keypoints.f4    float32 frames of 17 x (x, y, score), 204 bytes each
+    time_index.bin  sparse index: (bucket start ms, first frame) per second
+
+Columns are only ever appended to, so a reader can memory-map them while a
+writer is still recording. To find a time, the reader bisects the small
+index, then searches timestamps only inside that one-second bucket. Slices
+come back as memmap views, so nothing is read until it is used.
+"""
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+NUM_KEYPOINTS = 17
+FRAME_SHAPE = (NUM_KEYPOINTS, 3)
+FRAME_BYTES = NUM_KEYPOINTS * 3 * 4
+INDEX_INTERVAL_MS = 1000
+INDEX_DTYPE = np.dtype([('time', '<f8'), ('frame', '<i8')])
+SESSION_GAP_S = 60  # A client silent for longer than this starts a new session
+WRITER_IDLE_S = 30  # A client's writer is closed after this long without frames
+MAX_OPEN_WRITERS = 32  # Past this, the least recently written writer is closed to make room
+
+META_FILE = 'meta.json'
+TIMESTAMPS_FILE = 'timestamps.f8'
+KEYPOINTS_FILE = 'keypoints.f4'
+INDEX_FILE = 'time_index.bin'
+
+def is_session_dir(path):
+    return os.path.isfile(os.path.join(path, META_FILE)) and os.path.isfile(os.path.join(path, TIMESTAMPS_FILE))
+
+def _committed_frames(path):
+    """Frames present in both columns (a crash mid-append can leave one column longer)."""
+    ts_size = os.path.getsize(os.path.join(path, TIMESTAMPS_FILE))
+    kp_size = os.path.getsize(os.path.join(path, KEYPOINTS_FILE))
+    return min(ts_size // 8, kp_size // FRAME_BYTES)
+
+def _read_index(path):
+    """Complete index records only; a crash mid-append can leave a partial one at the end."""
+    index_path = os.path.join(path, INDEX_FILE)
+    return np.fromfile(index_path, dtype=INDEX_DTYPE, count=os.path.getsize(index_path) // INDEX_DTYPE.itemsize)
+
+class SessionWriter:
+    """Appends frames to one session directory."""
+
+    def __init__(self, path, **meta):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        meta_path = os.path.join(path, META_FILE)
+        if not os.path.exists(meta_path):
+            meta = dict(meta, session_id=os.path.basename(os.path.normpath(path)), created=time.time())
+            with open(meta_path + '.tmp', 'w') as f:
+                json.dump(meta, f)
+            os.replace(meta_path + '.tmp', meta_path)
+        for name in (TIMESTAMPS_FILE, KEYPOINTS_FILE, INDEX_FILE):
+            open(os.path.join(path, name), 'ab').close()
+
+        # Drop any half-written tail so both columns line up again
+        self.frames = _committed_frames(path)
+        with open(os.path.join(path, TIMESTAMPS_FILE), 'r+b') as f:
+            f.truncate(self.frames * 8)
+        with open(os.path.join(path, KEYPOINTS_FILE), 'r+b') as f:
+            f.truncate(self.frames * FRAME_BYTES)
+        # ...and the index to its last complete entry for a frame that survived
+        index = _read_index(path)
+        with open(os.path.join(path, INDEX_FILE), 'r+b') as f:
+            f.truncate(int(np.searchsorted(index['frame'], self.frames)) * INDEX_DTYPE.itemsize)
+
+        self.last_timestamp = -np.inf
+        self._last_bucket = None
+        if self.frames:
+            last = np.fromfile(os.path.join(path, TIMESTAMPS_FILE), dtype='<f8', offset=(self.frames - 1) * 8)
+            self.last_timestamp = float(last[0])
+            self._last_bucket = int(self.last_timestamp // INDEX_INTERVAL_MS)
+
+        self._ts = open(os.path.join(path, TIMESTAMPS_FILE), 'ab')
+        self._kp = open(os.path.join(path, KEYPOINTS_FILE), 'ab')
+        self._idx = open(os.path.join(path, INDEX_FILE), 'ab')
+        self._lock = threading.Lock()
+        self.dropped = 0
+        self.last_write = time.monotonic()
+
+    def append(self, timestamps, keypoints):
+        """Append frames; frames older than the newest stored timestamp are dropped.
+
+        Returns the number of frames written.
+        """
+        timestamps = np.asarray(timestamps, dtype='<f8').reshape(-1)
+        keypoints = np.asarray(keypoints, dtype='<f4').reshape((-1,) + FRAME_SHAPE)
+        if len(timestamps) != len(keypoints):
+            raise ValueError(f"{len(timestamps)} timestamps for {len(keypoints)} frames")
+
+        with self._lock:
+            prev_max = np.maximum.accumulate(np.concatenate(([self.last_timestamp], timestamps)))[:-1]
+            in_order = timestamps >= prev_max
+            self.dropped += int((~in_order).sum())
+            timestamps, keypoints = timestamps[in_order], keypoints[in_order]
+            if not len(timestamps):
+                return 0
+
+            # One index entry for the first frame landing in each new one-second bucket
+            buckets = (timestamps // INDEX_INTERVAL_MS).astype(np.int64)
+            previous = np.concatenate(([self._last_bucket if self._last_bucket is not None else -1], buckets[:-1]))
+            new_bucket = buckets != previous
+            index = np.empty(int(new_bucket.sum()), dtype=INDEX_DTYPE)
+            index['time'] = buckets[new_bucket] * INDEX_INTERVAL_MS
+            index['frame'] = self.frames + np.flatnonzero(new_bucket)
+
+            # Keypoints before timestamps: readers count frames by the shorter column
+            self._kp.write(np.ascontiguousarray(keypoints).tobytes())
+            self._kp.flush()
+            self._ts.write(timestamps.tobytes())
+            self._ts.flush()
+            self._idx.write(index.tobytes())
+            self._idx.flush()
+
+            self.frames += len(timestamps)
+            self.last_write = time.monotonic()
+            self.last_timestamp = float(timestamps[-1])
+            self._last_bucket = int(buckets[-1])
+            return len(timestamps)
+
+    def close(self):
+        with self._lock:
+            for f in (self._kp, self._ts, self._idx):
+                f.close()
+
+class SessionReader:
+    """Zero-copy, seekable view of a session directory."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, META_FILE)) as f:
+            self.meta = json.load(f)
+        self.refresh()
+
+    def refresh(self):
+        """Re-map the columns to pick up frames appended since opening."""
+        n = _committed_frames(self.path)
+        if n:
+            self.timestamps = np.memmap(os.path.join(self.path, TIMESTAMPS_FILE), dtype='<f8', mode='r', shape=(n,))
+            self.keypoints = np.memmap(os.path.join(self.path, KEYPOINTS_FILE), dtype='<f4', mode='r',
+                                       shape=(n,) + FRAME_SHAPE)
+        else:
+            self.timestamps = np.zeros(0, dtype='<f8')
+            self.keypoints = np.zeros((0,) + FRAME_SHAPE, dtype='<f4')
+        index = _read_index(self.path)
+        self.index = index[index['frame'] < n]
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    @property
+    def start_time(self):
+        return float(self.timestamps[0]) if len(self) else None
+
+    @property
+    def end_time(self):
+        return float(self.timestamps[-1]) if len(self) else None
+
+    @property
+    def duration_s(self):
+        return (self.end_time - self.start_time) / 1000 if len(self) else 0.0
+
+    def frame_at(self, t_ms):
+        """Index of the first frame with timestamp >= t_ms (len(self) if none)."""
+        n = len(self)
+        i = int(np.searchsorted(self.index['time'], t_ms, side='right')) - 1
+        lo = int(self.index['frame'][i]) if i >= 0 else 0
+        hi = int(self.index['frame'][i + 1]) if i + 1 < len(self.index) else n
+        return lo + int(np.searchsorted(self.timestamps[lo:hi], t_ms, side='left'))
+
+    def seek(self, second):
+        """Frame index `second` seconds after the session start."""
+        if not len(self):
+            return 0
+        return self.frame_at(self.start_time + second * 1000)
+
+    def slice_time(self, t0_ms, t1_ms):
+        """(timestamps, keypoints) memmap views for t0_ms <= t < t1_ms."""
+        a, b = self.frame_at(t0_ms), self.frame_at(t1_ms)
+        return self.timestamps[a:b], self.keypoints[a:b]
+
+    def slice_seconds(self, s0, s1):
+        """Like slice_time but in seconds relative to the session start."""
+        if not len(self):
+            return self.timestamps, self.keypoints
+        return self.slice_time(self.start_time + s0 * 1000, self.start_time + s1 * 1000)
+
+class SessionStore:
+    """Directory of sessions; also usable as the telemetry hub's sink.
+
+    Clients that stop sending (a closed tab) don't hold files open: each sink
+    call closes writers idle for idle_s, and at most max_open stay open. A
+    client whose writer was closed early continues the same session.
+    """
+
+    def __init__(self, root, session_gap_s=SESSION_GAP_S, idle_s=WRITER_IDLE_S, max_open=MAX_OPEN_WRITERS):
+        self.root = root
+        self.session_gap_s = session_gap_s
+        self.idle_s = idle_s
+        self.max_open = max_open
+        os.makedirs(root, exist_ok=True)
+        self._active = {}  # client_id -> SessionWriter
+        self._closed = {}  # client_id -> (session path, monotonic time closed) for writers closed before the gap
+        self._lock = threading.Lock()
+
+    def sessions(self):
+        return sorted(name for name in os.listdir(self.root) if is_session_dir(os.path.join(self.root, name)))
+
+    def reader(self, session_id):
+        return SessionReader(os.path.join(self.root, session_id))
+
+    def create(self, session_id, **meta):
+        return SessionWriter(os.path.join(self.root, session_id), **meta)
+
+    def telemetry_sink(self, client_id, frames):
+        """Append decoded telemetry frames, starting a new session after a long gap."""
+        with self._lock:
+            self._close_idle()
+            writer = self._active.get(client_id)
+            if writer is None and len(self._active) >= self.max_open:
+                self._evict(min(self._active, key=lambda cid: self._active[cid].last_write))
+            if writer is None and client_id in self._closed:
+                writer = self._active[client_id] = SessionWriter(self._closed.pop(client_id)[0])
+            first = float(frames['timestamp'][0])
+            if writer and first - writer.last_timestamp > self.session_gap_s * 1000:
+                writer.close()
+                writer = None
+            if writer is None:
+                started = time.strftime('%Y%m%d-%H%M%S', time.localtime(first / 1000))
+                writer = self._active[client_id] = self.create(f"{client_id}-{started}", client_id=client_id)
+            # Under the lock, so another client's call can't evict this writer mid-append
+            writer.append(frames['timestamp'], frames['keypoints'])
+
+    def _close_idle(self):
+        # Caller holds the lock
+        now = time.monotonic()
+        for client_id in [cid for cid, w in self._active.items() if now - w.last_write > self.idle_s]:
+            self._evict(client_id)
+        for client_id in [cid for cid, (_, closed) in self._closed.items() if now - closed > self.session_gap_s]:
+            del self._closed[client_id]
+
+    def _evict(self, client_id):
+        # Caller holds the lock
+        writer = self._active.pop(client_id)
+        writer.close()
+        self._closed[client_id] = (writer.path, time.monotonic())
+
+    def close(self):
+        with self._lock:
+            for writer in self._active.values():
+                writer.close()
+            self._active.clear()
+            self._closed.clear()
@@ -0,0 +1,121 @@
+"""Readiness-driven startup.
+
+Startup used to be a chain of fixed sleeps: 2 s for the server, 3 s of
+microphone calibration, 3 s before listening and 4 s for the page. Now each
+piece is a stage running on its own thread. A stage starts as soon as the
+stages it depends on are ready, and it finishes only when its own dependency
+is actually usable: the port accepts connections, the TTS engine exists, the
+noise floor has been measured, or the page has subscribed. Independent stages
+overlap, so launch-to-listening takes as long as the slowest real dependency.
+
+    startup = Startup()
+    startup.stage('server', start_server)
+    startup.stage('browser', open_browser, after=['server'], required=False)
+    startup.wait()
+    print(startup.report())
+
+A stage function that returns False (a probe that timed out) or raises has
+failed. Stages that depend on a failed stage are skipped.
+"""
+import socket
+import threading
+import time
+
+PROBE_INTERVAL = 0.05  # Seconds between readiness probes
+
+def wait_for_port(host, port, timeout=10.0, interval=PROBE_INTERVAL):
+    """Poll until a TCP connection to host:port succeeds; False on timeout."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with socket.create_connection((host, port), timeout=max(interval, 0.5)):
+                return True
+        except OSError:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(interval)
+
+class Stage:
+    def __init__(self, name, func, after=(), required=True):
+        self.name = name
+        self.func = func
+        self.after = list(after)
+        self.required = required  # Optional stages are reported but don't count as a failed startup
+        self.started = None
+        self.finished = None
+        self.error = None
+        self.done = threading.Event()
+
+    @property
+    def ok(self):
+        return self.done.is_set() and self.error is None
+
+    @property
+    def duration(self):
+        if self.started is None or self.finished is None:
+            return None
+        return self.finished - self.started
+
+class Startup:
+    def __init__(self):
+        self.t0 = time.monotonic()
+        self.stages = {}
+
+    def stage(self, name, func, after=(), required=True):
+        """Register a stage and start it; its dependencies must already be registered."""
+        missing = [dep for dep in after if dep not in self.stages]
+        if missing:
+            raise KeyError(f"stage {name!r} depends on unknown stage(s) {missing}")
+        stage = self.stages[name] = Stage(name, func, after, required)
+        threading.Thread(target=self._run, args=(stage,), name=f"startup-{name}", daemon=True).start()
+        return stage
+
+    def _run(self, stage):
+        for dep in stage.after:
+            self.stages[dep].done.wait()
+            if not self.stages[dep].ok:
+                stage.error = f"skipped, {dep} failed"
+                stage.done.set()
+                return
+        stage.started = time.monotonic()
+        try:
+            if stage.func() is False:
+                stage.error = "not ready"
+        except Exception as e:
+            stage.error = str(e) or type(e).__name__
+        stage.finished = time.monotonic()
+        stage.done.set()
+
+    def wait(self, name=None, timeout=None):
+        """Wait for one stage (or all of them); True if everything waited on finished."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        stages = [self.stages[name]] if name else list(self.stages.values())
+        for stage in stages:
+            remaining = None if deadline is None else max(0, deadline - time.monotonic())
+            if not stage.done.wait(remaining):
+                return False
+        return True
+
+    def failed(self):
+        """Names of required stages that did not become ready."""
+        return [s.name for s in self.stages.values() if s.required and s.done.is_set() and not s.ok]
+
+    def ready_at(self, name):
+        """Seconds from launch until the stage finished, or None."""
+        stage = self.stages[name]
+        return None if stage.finished is None else stage.finished - self.t0
+
+    def report(self):
+        lines = ["Startup timing (seconds from launch):"]
+        width = max((len(name) for name in self.stages), default=0)
+        for stage in sorted(self.stages.values(), key=lambda s: (s.finished is None, s.finished or 0)):
+            if stage.started is None:
+                lines.append(f"  ⚠ {stage.name:<{width}}  {stage.error or 'not started'}")
+                continue
+            mark = "✓" if stage.ok else "⚠"
+            start, end = stage.started - self.t0, (stage.finished or time.monotonic()) - self.t0
+            line = f"  {mark} {stage.name:<{width}}  {start:6.2f} → {end:6.2f}  ({end - start:.2f})"
+            if stage.error:
+                line += f"  {stage.error}"
+            lines.append(line)
+        return "\n".join(lines)
@@ -0,0 +1,90 @@
+"""In-process publish/subscribe for the voice assistant's status.
+
+The assistant publishes events ({'action', 'user_command', 'ai_response'})
+here instead of rewriting sunday_status.json. The server pushes them to the
+page as Server-Sent Events on /api/status/stream, and long-poll clients can
+use /api/status?after=<id>. Each event gets an increasing id, and the last
+HISTORY_SIZE events are kept so a reconnecting EventSource (Last-Event-ID)
+misses nothing.
+
+The JSON file is now only an optional snapshot of the latest status (see
+enable_snapshot). A background thread writes it with write-then-rename, so
+readers never see a half-written file.
+"""
+import collections
+import json
+import os
+import threading
+import time
+
+HISTORY_SIZE = 256
+SNAPSHOT_INTERVAL = 0.25  # Minimum seconds between snapshot writes
+
+def write_atomic_json(path, data):
+    """Write JSON to path via a temp file and os.replace."""
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+class StatusBus:
+    def __init__(self, history=HISTORY_SIZE):
+        self._events = collections.deque(maxlen=history)
+        self._cond = threading.Condition()
+        self._next_id = 1
+        self._snapshot_thread = None
+
+    @property
+    def last_id(self):
+        with self._cond:
+            return self._next_id - 1
+
+    def publish(self, action, **fields):
+        """Record a status event and wake every waiting subscriber; returns the event."""
+        event = dict(fields, action=action, timestamp=time.time())
+        with self._cond:
+            event['id'] = self._next_id
+            self._next_id += 1
+            self._events.append(event)
+            self._cond.notify_all()
+        return event
+
+    def latest(self):
+        with self._cond:
+            return self._events[-1] if self._events else None
+
+    def events_after(self, last_id, timeout=None):
+        """Events newer than last_id, waiting up to `timeout` seconds for one to arrive.
+
+        An id from before a server restart (larger than anything published)
+        gets the latest event, so the client resynchronises. With nothing
+        published yet it waits like a new subscriber.
+        """
+        with self._cond:
+            if last_id >= self._next_id:
+                if self._events:
+                    return [self._events[-1]]
+                last_id = self._next_id - 1
+            self._cond.wait_for(lambda: self._next_id - 1 > last_id, timeout)
+            return [e for e in self._events if e['id'] > last_id]
+
+    def enable_snapshot(self, path, interval=SNAPSHOT_INTERVAL):
+        """Mirror the latest event to `path` from a background thread (at most every `interval` s)."""
+        if self._snapshot_thread is None:
+            self._snapshot_thread = threading.Thread(target=self._snapshot_loop, args=(path, interval), daemon=True)
+            self._snapshot_thread.start()
+
+    def _snapshot_loop(self, path, interval):
+        written = 0
+        while True:
+            events = self.events_after(written)
+            if not events:
+                continue
+            try:
+                write_atomic_json(path, events[-1])
+            except OSError as e:
+                print(f"⚠ Status snapshot write failed: {e}")
+            written = events[-1]['id']
+            time.sleep(interval)  # Coalesce bursts into one write
+
+status_bus = StatusBus()
@@ -0,0 +1,43 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hot_cache import HotFileCache  # noqa: E402
+
+class WarmTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = self._tmp.name
+        for relative in ('index.html', 'assets/app.js', 'assets/poses/list.json',
+                         'venv/lib/site-packages/pkg/index.html', 'node_modules/lib/lib.js',
+                         'sessions/s1/meta.json', 'notes.css'):
+            path = os.path.join(self.root, relative)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as f:
+                f.write('x' * 2000)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def warmed(self, cache):
+        return sorted(os.path.relpath(path, self.root) for path in cache._entries)
+
+    def test_warms_only_the_page_and_its_assets(self):
+        cache = HotFileCache()
+        self.assertEqual(cache.warm(self.root), 3)
+        self.assertEqual(self.warmed(cache), ['assets/app.js', 'assets/poses/list.json', 'index.html'])
+
+    def test_venv_content_is_not_warmed(self):
+        cache = HotFileCache()
+        cache.warm(self.root)
+        self.assertFalse([path for path in self.warmed(cache) if path.startswith('venv')])
+
+    def test_stops_at_the_byte_cap(self):
+        cache = HotFileCache()
+        self.assertEqual(cache.warm(self.root, max_bytes=4500), 2)
+
+if __name__ == "__main__":
+    unittest.main()
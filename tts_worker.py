@@ -0,0 +1,214 @@
+"""One long-lived text-to-speech worker.
+
+The engine is created once, on the thread that uses it (pyttsx3 engines must
+stay on one thread). Utterances are served from a priority queue: lower
+numbers go first, and equal priorities are FIFO.
+
+  * say() returns an Utterance. Its `done` event is set when the speech has
+    actually finished or been cancelled, so callers can wait for it.
+  * If the same text is already waiting in the queue, it is not queued again;
+    the pending Utterance is returned instead.
+  * cancel() implements barge-in. It drops everything queued and stops the
+    current utterance at the next word boundary.
+
+With a PhraseCache (phrase_cache.py), cached text is played straight from
+memory. Text spoken live is rendered into the cache afterwards at RENDER
+priority, behind every utterance.
+"""
+import itertools
+import queue
+import threading
+import time
+
+URGENT, NORMAL, LOW = 0, 1, 2
+RENDER = 3  # Cache rendering runs only when nothing is waiting to be said
+RENDER_BATCH = 4  # Phrases per render job, so a waiting utterance is never held up for long
+
+class Utterance:
+    """A queued piece of speech; state is queued, speaking, done, cancelled or failed."""
+
+    def __init__(self, text, priority, cacheable=True):
+        self.text = text
+        self.priority = priority
+        self.cacheable = cacheable
+        self.state = 'queued'
+        self.source = None  # 'cache', 'live' or 'fallback' once spoken
+        self.queued_at = time.monotonic()
+        self.started_at = None
+        self.first_audio_at = None  # When sound actually began (cache playback, engine start or fallback)
+        self.finished_at = None
+        self.done = threading.Event()
+
+    def wait(self, timeout=None):
+        """Block until the utterance has finished or was cancelled; False on timeout."""
+        return self.done.wait(timeout)
+
+    def _finish(self, state):
+        self.state = state
+        self.finished_at = time.monotonic()
+        self.done.set()
+
+class _RenderJob:
+    def __init__(self, texts):
+        self.texts = texts
+
+class TTSWorker:
+    """Serves utterances from a priority queue on a single engine-owning thread.
+
+    engine_factory() is called on the worker thread and may return None, in
+    which case every utterance goes to fallback(text). listener(event,
+    utterance) is called with 'started', 'done', 'cancelled' or 'failed'.
+    """
+
+    def __init__(self, engine_factory, fallback=None, listener=None, phrase_cache=None):
+        self.fallback = fallback
+        self.listener = listener
+        self.phrase_cache = phrase_cache
+        self.engine = None
+        self.ready = threading.Event()  # Set once the engine has been created (or failed to be)
+        self._queue = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._pending = {}  # text -> queued Utterance, for coalescing
+        self._current = None
+        self._lock = threading.Lock()
+        self._interrupt = threading.Event()
+        self.spoken = 0
+        self.coalesced = 0
+        self.cancelled = 0
+        self._thread = threading.Thread(target=self._run, args=(engine_factory,), name='tts', daemon=True)
+        self._thread.start()
+
+    def say(self, text, priority=NORMAL, cacheable=True):
+        """Queue text; returns its Utterance (the already-queued one for a duplicate).
+
+        Pass cacheable=False for one-off text that should not be rendered to the phrase cache.
+        """
+        with self._lock:
+            existing = self._pending.get(text)
+            if existing is not None:
+                self.coalesced += 1
+                return existing
+            utterance = self._pending[text] = Utterance(text, priority, cacheable)
+            self._queue.put((priority, next(self._seq), utterance))
+        return utterance
+
+    def cancel(self):
+        """Barge-in: drop every queued utterance and cut the current one short; returns how many."""
+        with self._lock:
+            dropped = list(self._pending.values())
+            self._pending.clear()
+            for utterance in dropped:
+                utterance._finish('cancelled')  # The worker skips finished entries
+            if self._current is not None:
+                self._interrupt.set()
+                if self.phrase_cache:
+                    self.phrase_cache.stop()
+                dropped.append(self._current)
+            self.cancelled += len(dropped)
+        return len(dropped)
+
+    def warm(self, texts):
+        """Render any of texts missing from the phrase cache, then load them into memory."""
+        if self.phrase_cache and self.phrase_cache.enabled:
+            texts = list(texts)
+            for i in range(0, len(texts), RENDER_BATCH):
+                self._queue.put((RENDER, next(self._seq), _RenderJob(texts[i:i + RENDER_BATCH])))
+
+    def busy(self):
+        with self._lock:
+            return self._current is not None or bool(self._pending)
+
+    def close(self, timeout=2.0):
+        self.cancel()
+        self._queue.put((float('inf'), next(self._seq), None))
+        self._thread.join(timeout)
+
+    def _run(self, engine_factory):
+        try:
+            self.engine = engine_factory()
+        except Exception as e:
+            print(f"⚠ TTS engine unavailable: {e}")
+        if self.engine is not None and hasattr(self.engine, 'connect'):
+            self.engine.connect('started-word', self._on_word)
+            self.engine.connect('started-utterance', self._on_utterance_start)
+        self.ready.set()
+
+        while True:
+            _, _, utterance = self._queue.get()
+            if utterance is None:
+                break
+            if isinstance(utterance, _RenderJob):
+                self._render(utterance.texts)
+                continue
+            with self._lock:
+                if utterance.done.is_set():
+                    continue
+                if self._pending.get(utterance.text) is utterance:
+                    del self._pending[utterance.text]
+                self._current = utterance
+                self._interrupt.clear()
+                utterance.state = 'speaking'
+                utterance.started_at = time.monotonic()
+            self._notify('started', utterance)
+
+            state = self._speak(utterance)
+            if self._interrupt.is_set():
+                state = 'cancelled'
+            with self._lock:
+                self._current = None
+                utterance._finish(state)
+                if state == 'done':
+                    self.spoken += 1
+            self._notify(state, utterance)
+            if utterance.source == 'live' and utterance.cacheable and self.phrase_cache and self.phrase_cache.enabled:
+                self._queue.put((RENDER, next(self._seq), _RenderJob([utterance.text])))
+
+    def _speak(self, utterance):
+        text = utterance.text
+        on_start = lambda: self._mark_audio(utterance)
+        if self.phrase_cache and utterance.cacheable and self.phrase_cache.play(text, on_start):
+            utterance.source = 'cache'
+            return 'done'
+        if self.engine is not None:
+            try:
+                self.engine.say(text)
+                self.engine.runAndWait()
+                utterance.source = 'live'
+                return 'done'
+            except Exception as e:
+                print(f"TTS Error: {e}")
+        utterance.source = 'fallback'
+        self._mark_audio(utterance)
+        if self.fallback and self.fallback(text):
+            return 'done'
+        return 'failed'
+
+    def _render(self, texts):
+        if self.engine is None or not hasattr(self.engine, 'save_to_file'):
+            return
+        try:
+            self.phrase_cache.render(self.engine, texts)
+            self.phrase_cache.preload(texts)
+        except Exception as e:
+            print(f"⚠ Phrase rendering failed: {e}")
+
+    def _mark_audio(self, utterance):
+        if utterance.first_audio_at is None:
+            utterance.first_audio_at = time.monotonic()
+
+    def _on_utterance_start(self, name):
+        current = self._current
+        if current is not None:
+            self._mark_audio(current)
+
+    def _on_word(self, name, location, length):
+        # pyttsx3 can only be stopped safely from inside its own callbacks
+        if self._interrupt.is_set():
+            self.engine.stop()
+
+    def _notify(self, event, utterance):
+        if self.listener:
+            try:
+                self.listener(event, utterance)
+            except Exception as e:
+                print(f"⚠ TTS listener error: {e}")
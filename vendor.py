@@ -0,0 +1,137 @@
+"""Local, content-addressed copies of the page's CDN scripts and the MoveNet model.
+
+    python vendor.py fetch      # download everything into vendor/ and write the manifest
+    python vendor.py status     # show what is cached
+
+Each asset is stored as vendor/<sha256 prefix>/<file>, so its URL changes
+whenever its content does and the server can mark /vendor/* immutable. When
+vendor/manifest.json exists the server rewrites index.html to point at these
+copies, so AR Correction starts without touching the network.
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import urllib.parse
+import urllib.request
+
+VENDOR_DIR = 'vendor'
+MANIFEST_NAME = 'manifest.json'
+MOVENET_URL = 'https://tfhub.dev/google/tfjs-model/movenet/singlepose/lightning/4'
+
+VENDOR_ASSETS = [
+    {'url': 'https://cdn.jsdelivr.net/npm/@tensorflow/tfjs@3.13.0/dist/tf.min.js', 'filename': 'tf.min.js'},
+    {'url': 'https://cdn.jsdelivr.net/npm/@tensorflow-models/pose-detection@2.0.0/dist/pose-detection.min.js',
+     'filename': 'pose-detection.min.js'},
+    {'url': 'https://cdnjs.cloudflare.com/ajax/libs/tone/14.8.49/Tone.js', 'filename': 'Tone.js'},
+    {'url': 'https://cdn.tailwindcss.com', 'filename': 'tailwindcss.js'},
+    {'url': MOVENET_URL, 'filename': 'model.json', 'kind': 'tfjs-model'},
+]
+
+def _download(url):
+    request = urllib.request.Request(url, headers={'User-Agent': 'sunday-vendor/1.0'})
+    with urllib.request.urlopen(request, timeout=60) as resp:
+        return resp.read()
+
+def _store(root, files):
+    """Write {filename: bytes} into vendor/<hash>/ atomically; the hash covers every file."""
+    digest = hashlib.sha256()
+    for name in sorted(files):
+        digest.update(name.encode('utf-8'))
+        digest.update(hashlib.sha256(files[name]).digest())
+    key = digest.hexdigest()[:16]
+    dest = os.path.join(root, VENDOR_DIR, key)
+    if not os.path.isdir(dest):
+        staging = tempfile.mkdtemp(dir=os.path.join(root, VENDOR_DIR))
+        for name, data in files.items():
+            with open(os.path.join(staging, name), 'wb') as f:
+                f.write(data)
+        try:
+            os.rename(staging, dest)
+        except OSError:  # Raced with another fetch of the same content
+            shutil.rmtree(staging, ignore_errors=True)
+    return key
+
+def _fetch_tfjs_model(url):
+    """Download a TF Hub tfjs graph model: model.json plus every weight shard it lists."""
+    query = '?tfjs-format=file' if 'tfhub.dev' in url else ''
+    model_json = _download(f"{url}/model.json{query}")
+    files = {'model.json': model_json}
+    for group in json.loads(model_json).get('weightsManifest', []):
+        for path in group['paths']:
+            files[path] = _download(f"{url}/{path}{query}")
+    return files
+
+def fetch_all(root, force=False):
+    """Download every VENDOR_ASSETS entry that is missing (or all with force) and save the manifest."""
+    os.makedirs(os.path.join(root, VENDOR_DIR), exist_ok=True)
+    manifest = load_manifest(root) or {'assets': {}}
+    for asset in VENDOR_ASSETS:
+        url = asset['url']
+        local = manifest['assets'].get(url)
+        if local and not force and os.path.exists(os.path.join(root, local.lstrip('/'))):
+            print(f"✓ cached   {url}")
+            continue
+        try:
+            if asset.get('kind') == 'tfjs-model':
+                files = _fetch_tfjs_model(url)
+            else:
+                files = {asset['filename']: _download(url)}
+        except Exception as e:
+            print(f"✗ failed   {url}: {e}")
+            continue
+        key = _store(root, files)
+        manifest['assets'][url] = f"/{VENDOR_DIR}/{key}/{asset['filename']}"
+        size = sum(len(d) for d in files.values())
+        print(f"✓ fetched  {url} -> {manifest['assets'][url]} ({size / 1024:.0f} KB)")
+
+    manifest['fetched_at'] = time.strftime("%Y-%m-%d %H:%M:%S")
+    manifest_path = os.path.join(root, VENDOR_DIR, MANIFEST_NAME)
+    with open(manifest_path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(manifest_path + '.tmp', manifest_path)
+    return manifest
+
+def load_manifest(root):
+    try:
+        with open(os.path.join(root, VENDOR_DIR, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def rewrite_html(data, manifest):
+    """Point every vendored URL in an HTML document at its local copy."""
+    text = data.decode('utf-8')
+    # Longest first so a URL that prefixes another is never half-replaced
+    for url in sorted(manifest.get('assets', {}), key=len, reverse=True):
+        text = text.replace(url, manifest['assets'][url])
+    return text.encode('utf-8')
+
+def make_html_rewriter(root):
+    """Return a bytes -> bytes rewriter for the current manifest, or None if nothing is vendored."""
+    manifest = load_manifest(root)
+    if not manifest or not manifest.get('assets'):
+        return None
+    return lambda data: rewrite_html(data, manifest)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the local vendor cache")
+    parser.add_argument("command", choices=["fetch", "status"])
+    parser.add_argument("--force", action="store_true", help="re-download even if cached")
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.abspath(__file__))
+    if args.command == "fetch":
+        manifest = fetch_all(root, force=args.force)
+        missing = [a['url'] for a in VENDOR_ASSETS if a['url'] not in manifest['assets']]
+        sys.exit(1 if missing else 0)
+    else:
+        manifest = load_manifest(root) or {'assets': {}}
+        for asset in VENDOR_ASSETS:
+            local = manifest['assets'].get(asset['url'])
+            present = local and os.path.exists(os.path.join(root, local.lstrip('/')))
+            print(f"{'✓' if present else '✗'} {asset['url']}" + (f" -> {local}" if local else ""))
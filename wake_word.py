@@ -0,0 +1,258 @@
+"""On-device wake-word pre-filter.
+
+Each captured utterance used to go to Google just to find out whether it
+said "Sunday". This module matches it locally against a few enrolled
+recordings, and only utterances that look like the wake word go on to the
+cloud recognizer.
+
+Features are 13 MFCCs per 10 ms frame, with the mean subtracted, computed
+with NumPy only. A template matches anywhere inside an utterance
+("hey Sunday, ..."). Matching uses subsequence DTW with steps (1,1), (1,2)
+and (2,1), so the warp stays between half and double speed and each
+template row can be computed as one vectorised operation. The decision
+threshold is set at training time from the enrolled samples.
+
+    python wake_word.py record fixtures/wake/positive --count 8   # say "Sunday" 8 times
+    python wake_word.py record fixtures/wake/negative --count 8   # other speech
+    python wake_word.py train fixtures/wake --out wake_model.npz
+    python wake_word.py eval fixtures/wake_heldout --model wake_model.npz
+
+A fixture set is a directory with positive/ and negative/ 16-bit mono WAVs.
+eval reports the false-accept and false-reject rates.
+benchmarks/wake_bench.py does the same for a train/held_out pair of sets,
+by default the synthetic one committed under fixtures/wake_synthetic. There
+it measures 1/10 false rejects and 1/18 false accepts (a "someday") on the
+held-out split. This is a pre-filter, not a decision: near misses still get
+through now and then, and Google's transcript is what confirms "Sunday".
+Synthetic speech is easier than real voices, so measure your own recordings
+before relying on these numbers.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import wave
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+FRAME_LEN = 400  # 25 ms
+HOP = 160  # 10 ms
+N_FFT = 512
+N_MELS = 26
+N_MFCC = 13
+TRIM_RATIO = 0.05  # Template frames quieter than this fraction of the peak are trimmed off
+THRESHOLD_MARGIN = 1.1  # Slack on the worst enrolled sample when there are no negatives
+FALSE_ACCEPT_WEIGHT = 3  # A training negative accepted costs this many positives rejected
+DEFAULT_MODEL = 'wake_model.npz'
+
+def _mel_filterbank(n_mels=N_MELS, n_fft=N_FFT, sample_rate=SAMPLE_RATE):
+    def hz_to_mel(hz):
+        return 2595 * np.log10(1 + hz / 700)
+
+    def mel_to_hz(mel):
+        return 700 * (10 ** (mel / 2595) - 1)
+
+    mels = np.linspace(hz_to_mel(0), hz_to_mel(sample_rate / 2), n_mels + 2)
+    bins = np.floor((n_fft + 1) * mel_to_hz(mels) / sample_rate).astype(int)
+    bank = np.zeros((n_mels, n_fft // 2 + 1))
+    for m in range(1, n_mels + 1):
+        left, center, right = bins[m - 1], bins[m], bins[m + 1]
+        if center > left:
+            bank[m - 1, left:center] = (np.arange(left, center) - left) / (center - left)
+        if right > center:
+            bank[m - 1, center:right] = (right - np.arange(center, right)) / (right - center)
+    return bank
+
+_MEL_BANK = _mel_filterbank()
+_DCT = np.cos(np.pi / N_MELS * (np.arange(N_MELS) + 0.5)[np.newaxis, :] * np.arange(N_MFCC)[:, np.newaxis])
+_WINDOW = np.hamming(FRAME_LEN)
+
+def _frames(samples):
+    samples = np.asarray(samples, dtype=np.float64)
+    if len(samples) < FRAME_LEN:
+        samples = np.pad(samples, (0, FRAME_LEN - len(samples)))
+    emphasized = np.append(samples[0], samples[1:] - 0.97 * samples[:-1])
+    count = 1 + (len(emphasized) - FRAME_LEN) // HOP
+    idx = np.arange(FRAME_LEN)[np.newaxis, :] + HOP * np.arange(count)[:, np.newaxis]
+    return emphasized[idx]
+
+def mfcc(samples):
+    """(frames, N_MFCC) mean-normalised MFCCs for 16 kHz int16/float samples."""
+    frames = _frames(samples)
+    power = np.abs(np.fft.rfft(frames * _WINDOW, N_FFT)) ** 2 / N_FFT
+    log_mel = np.log(power @ _MEL_BANK.T + 1e-10)
+    features = log_mel @ _DCT.T
+    return features - features.mean(axis=0)
+
+def trim_silence(samples, ratio=TRIM_RATIO):
+    """Drop leading/trailing frames whose energy is below ratio x the loudest frame."""
+    frames = _frames(samples)
+    energy = np.sqrt(np.mean(frames ** 2, axis=1))
+    loud = np.flatnonzero(energy >= energy.max() * ratio)
+    if not len(loud):
+        return np.asarray(samples)
+    return np.asarray(samples)[loud[0] * HOP:loud[-1] * HOP + FRAME_LEN]
+
+def subsequence_dtw(template, query):
+    """Best length-normalised cost of template (n, d) aligned anywhere within query (m, d)."""
+    n, m = len(template), len(query)
+    if m < (n + 1) // 2:
+        return np.inf
+    cost = np.sqrt(((template[:, np.newaxis, :] - query[np.newaxis, :, :]) ** 2).sum(axis=2))
+    prev2 = np.full(m, np.inf)
+    prev = cost[0].copy()  # Free start anywhere in the query
+    for i in range(1, n):
+        best = np.full(m, np.inf)
+        best[1:] = prev[:-1]  # (1,1)
+        best[2:] = np.minimum(best[2:], prev[:-2])  # (1,2)
+        best[1:] = np.minimum(best[1:], prev2[:-1])  # (2,1)
+        prev2, prev = prev, cost[i] + best
+    return float(prev.min() / n)
+
+def read_wav(path):
+    """16-bit PCM WAV as mono int16 at SAMPLE_RATE."""
+    with wave.open(path, 'rb') as w:
+        if w.getsampwidth() != 2:
+            raise ValueError(f"{path}: expected 16-bit PCM")
+        data = np.frombuffer(w.readframes(w.getnframes()), dtype='<i2')
+        channels, rate = w.getnchannels(), w.getframerate()
+    if channels > 1:
+        data = data.reshape(-1, channels).mean(axis=1)
+    if rate != SAMPLE_RATE:
+        positions = np.arange(0, len(data), rate / SAMPLE_RATE)
+        data = np.interp(positions, np.arange(len(data)), data)
+    return data.astype(np.int16)
+
+def write_wav(path, samples, sample_rate=SAMPLE_RATE):
+    with wave.open(path, 'wb') as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(np.asarray(samples, dtype='<i2').tobytes())
+
+def load_fixtures(root):
+    """(positives, negatives) sample lists from root/positive/*.wav and root/negative/*.wav."""
+    def load(kind):
+        return [read_wav(p) for p in sorted(glob.glob(os.path.join(root, kind, '*.wav')))]
+    return load('positive'), load('negative')
+
+class WakeWordDetector:
+    def __init__(self, templates, threshold):
+        self.templates = templates
+        self.threshold = threshold
+        self.checked = 0
+        self.accepted = 0
+
+    @classmethod
+    def train(cls, positives, negatives=()):
+        """Enroll positive samples as templates and pick a threshold.
+
+        With negatives, the threshold minimises false rejects plus
+        FALSE_ACCEPT_WEIGHT x false accepts: near misses such as "Monday" are
+        what the filter is for, and leave-one-out positive scores run higher
+        than a detector with every template sees. Ties go to the more
+        permissive value, since the cloud recognizer still confirms. Without
+        negatives, it is the worst leave-one-out positive score plus
+        THRESHOLD_MARGIN.
+        """
+        if len(positives) < 2:
+            raise ValueError("need at least two positive samples")
+        templates = [mfcc(trim_silence(s)) for s in positives]
+        pos_scores = []
+        for i, sample in enumerate(positives):
+            query = mfcc(sample)
+            pos_scores.append(min(subsequence_dtw(t, query) for j, t in enumerate(templates) if j != i))
+        pos_scores = np.array(pos_scores)
+        if not len(negatives):
+            return cls(templates, float(pos_scores.max() * THRESHOLD_MARGIN))
+
+        detector = cls(templates, 0.0)
+        neg_scores = np.array([detector.score(s) for s in negatives])
+        candidates = np.unique(np.concatenate((pos_scores, neg_scores)))
+        errors = np.array([(pos_scores > c).sum() + FALSE_ACCEPT_WEIGHT * (neg_scores <= c).sum()
+                           for c in candidates])
+        best = np.flatnonzero(errors == errors.min())[-1]
+        # Place the threshold halfway to the next-higher score rather than on a training sample
+        upper = candidates[best + 1] if best + 1 < len(candidates) else candidates[best] * THRESHOLD_MARGIN
+        detector.threshold = float((candidates[best] + upper) / 2)
+        return detector
+
+    def score(self, samples):
+        """Lowest template distance for the utterance (smaller = more wake-word-like)."""
+        query = mfcc(samples)
+        return min(subsequence_dtw(t, query) for t in self.templates)
+
+    def detect(self, samples):
+        self.checked += 1
+        accepted = self.score(samples) <= self.threshold
+        self.accepted += accepted
+        return accepted
+
+    def evaluate(self, positives, negatives):
+        """False-accept / false-reject rates on a labelled fixture set."""
+        false_rejects = sum(self.score(s) > self.threshold for s in positives)
+        false_accepts = sum(self.score(s) <= self.threshold for s in negatives)
+        return {
+            'positives': len(positives),
+            'negatives': len(negatives),
+            'false_rejects': int(false_rejects),
+            'false_accepts': int(false_accepts),
+            'false_reject_rate': round(false_rejects / len(positives), 4) if positives else None,
+            'false_accept_rate': round(false_accepts / len(negatives), 4) if negatives else None,
+            'threshold': round(self.threshold, 4),
+        }
+
+    def save(self, path):
+        np.savez(path, threshold=self.threshold, lengths=[len(t) for t in self.templates],
+                 features=np.concatenate(self.templates))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            splits = np.cumsum(data['lengths'])[:-1]
+            return cls(np.split(data['features'], splits), float(data['threshold']))
+
+def _record(directory, count):
+    from audio_capture import MicrophoneStream
+    os.makedirs(directory, exist_ok=True)
+    capture = MicrophoneStream(pause_threshold=0.6, max_phrase=4)
+    capture.start()
+    existing = len(glob.glob(os.path.join(directory, '*.wav')))
+    try:
+        for i in range(count):
+            print(f"[{i + 1}/{count}] speak now...")
+            segment = capture.next_utterance()
+            path = os.path.join(directory, f"sample_{existing + i:03d}.wav")
+            write_wav(path, segment.samples)
+            print(f"  saved {path} ({segment.duration:.2f} s)")
+    finally:
+        capture.stop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local wake-word pre-filter")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rec = sub.add_parser("record", help="record utterances from the microphone as WAV fixtures")
+    rec.add_argument("directory")
+    rec.add_argument("--count", type=int, default=8)
+    train = sub.add_parser("train", help="enroll fixtures/positive (and negative) samples")
+    train.add_argument("fixtures")
+    train.add_argument("--out", default=DEFAULT_MODEL)
+    ev = sub.add_parser("eval", help="false-accept/false-reject rates on a fixture set")
+    ev.add_argument("fixtures")
+    ev.add_argument("--model", default=DEFAULT_MODEL)
+    args = parser.parse_args()
+
+    if args.command == "record":
+        _record(args.directory, args.count)
+    elif args.command == "train":
+        positives, negatives = load_fixtures(args.fixtures)
+        detector = WakeWordDetector.train(positives, negatives)
+        detector.save(args.out)
+        print(json.dumps(dict(detector.evaluate(positives, negatives), model=args.out, note="training set"), indent=2))
+    else:
+        positives, negatives = load_fixtures(args.fixtures)
+        if not positives and not negatives:
+            sys.exit(f"no WAVs under {args.fixtures}/positive or {args.fixtures}/negative")
+        print(json.dumps(WakeWordDetector.load(args.model).evaluate(positives, negatives), indent=2))